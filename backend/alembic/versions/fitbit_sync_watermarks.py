@@ -0,0 +1,35 @@
+"""Add Fitbit sync watermarks
+
+Revision ID: 8b3d0e6f7a79
+Revises: 7a2c9d5e6f68
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '8b3d0e6f7a79'
+down_revision = '7a2c9d5e6f68'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'fitbitsyncwatermark',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('token_id', sa.Integer(), nullable=False),
+        sa.Column('data_type', sa.String(50), nullable=False),
+        sa.Column('synced_through', sa.Date(), nullable=False),
+        sa.ForeignKeyConstraint(['token_id'], ['fitbittoken.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('token_id', 'data_type', name='uq_fitbitsyncwatermark_token_id_data_type')
+    )
+    op.create_index(op.f('ix_fitbitsyncwatermark_id'), 'fitbitsyncwatermark', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('fitbitsyncwatermark')
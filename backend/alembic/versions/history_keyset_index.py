@@ -0,0 +1,30 @@
+"""Add message (sent_datetime, id) index for keyset pagination
+
+Revision ID: 6f1b8c4d5e57
+Revises: 5e0a7b3c4d46
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '6f1b8c4d5e57'
+down_revision = '5e0a7b3c4d46'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_message_sent_datetime_id',
+            'message',
+            ['sent_datetime', 'id'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_message_sent_datetime_id', table_name='message', postgresql_concurrently=True)
@@ -0,0 +1,58 @@
+"""Add composite indexes for scheduler, history and export queries
+
+Revision ID: 5e0a7b3c4d46
+Revises: 4d9f6a2b3c35
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '5e0a7b3c4d46'
+down_revision = '4d9f6a2b3c35'
+branch_labels = None
+depends_on = None
+
+
+# (name, table, columns, partial index predicate)
+INDEXES = [
+    ('ix_message_participant_id_sent_datetime', 'message', ['participant_id', 'sent_datetime'], None),
+    ('ix_message_participant_id_content_id', 'message', ['participant_id', 'content_id'], None),
+    ('ix_message_twilio_sid', 'message', ['twilio_sid'], None),
+    ('ix_messagecontent_bucket_active', 'messagecontent', ['bucket', 'active'], None),
+    ('ix_fitbitdata_token_id_data_type_date', 'fitbitdata', ['token_id', 'data_type', 'date'], None),
+    ('ix_fitbitdata_unexported', 'fitbitdata', ['token_id', 'date'], 'exported = false'),
+]
+
+
+def upgrade() -> None:
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction; building the
+    # indexes this way keeps the tables writable while they are built
+    with op.get_context().autocommit_block():
+        for name, table, columns, where in INDEXES:
+            op.create_index(
+                name,
+                table,
+                columns,
+                unique=False,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None
+            )
+
+        # Superseded by ix_messagecontent_bucket_active
+        op.drop_index('ix_messagecontent_bucket', table_name='messagecontent', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            'ix_messagecontent_bucket',
+            'messagecontent',
+            ['bucket'],
+            unique=False,
+            postgresql_concurrently=True
+        )
+
+        for name, table, _, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
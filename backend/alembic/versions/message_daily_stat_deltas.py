@@ -0,0 +1,76 @@
+"""Append message statistics changes to a delta table folded into the rollup
+
+Revision ID: 9c4e1f7a8b80
+Revises: 8b3d0e6f7a79
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '9c4e1f7a8b80'
+down_revision = '8b3d0e6f7a79'
+branch_labels = None
+depends_on = None
+
+
+# Kept in sync with app.models.message.MESSAGE_DAILY_STAT_DDL
+APPEND_DELTA_FUNCTION = """
+    CREATE OR REPLACE FUNCTION messagedailystat_bump(sent timestamptz, msg_status text, msg_bucket text, delta integer)
+    RETURNS void AS $$
+    BEGIN
+        INSERT INTO messagedailystatdelta (day, status, bucket, delta, created_at, updated_at)
+        VALUES ((sent AT TIME ZONE 'UTC')::date, msg_status, msg_bucket, delta, now(), now());
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+UPSERT_ROLLUP_FUNCTION = """
+    CREATE OR REPLACE FUNCTION messagedailystat_bump(sent timestamptz, msg_status text, msg_bucket text, delta integer)
+    RETURNS void AS $$
+    BEGIN
+        INSERT INTO messagedailystat (day, status, bucket, count, created_at, updated_at)
+        VALUES ((sent AT TIME ZONE 'UTC')::date, msg_status, msg_bucket, delta, now(), now())
+        ON CONFLICT (day, status, bucket)
+        DO UPDATE SET count = messagedailystat.count + EXCLUDED.count, updated_at = now();
+    END;
+    $$ LANGUAGE plpgsql
+"""
+
+# Same statement as app.services.stats_service.fold_message_daily_stat_deltas
+FOLD_DELTAS = """
+    WITH moved AS (
+        DELETE FROM messagedailystatdelta RETURNING day, status, bucket, delta
+    )
+    INSERT INTO messagedailystat (day, status, bucket, count, created_at, updated_at)
+    SELECT day, status, bucket, sum(delta), now(), now()
+    FROM moved
+    GROUP BY day, status, bucket
+    ORDER BY day, status, bucket
+    ON CONFLICT (day, status, bucket)
+    DO UPDATE SET count = messagedailystat.count + EXCLUDED.count, updated_at = now()
+"""
+
+
+def upgrade() -> None:
+    op.create_table(
+        'messagedailystatdelta',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('bucket', sa.String(50), nullable=False),
+        sa.Column('delta', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_messagedailystatdelta_id'), 'messagedailystatdelta', ['id'], unique=False)
+    op.execute(APPEND_DELTA_FUNCTION)
+
+
+def downgrade() -> None:
+    op.execute("LOCK TABLE message IN SHARE MODE")
+    op.execute(UPSERT_ROLLUP_FUNCTION)
+    op.execute(FOLD_DELTAS)
+    op.drop_table('messagedailystatdelta')
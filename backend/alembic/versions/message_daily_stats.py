@@ -0,0 +1,97 @@
+"""Add trigger-maintained daily message statistics rollup
+
+Revision ID: 7a2c9d5e6f68
+Revises: 6f1b8c4d5e57
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '7a2c9d5e6f68'
+down_revision = '6f1b8c4d5e57'
+branch_labels = None
+depends_on = None
+
+
+# Kept in sync with app.models.message.MESSAGE_DAILY_STAT_DDL
+MESSAGE_DAILY_STAT_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION messagedailystat_bump(sent timestamptz, msg_status text, msg_bucket text, delta integer)
+    RETURNS void AS $$
+    BEGIN
+        INSERT INTO messagedailystat (day, status, bucket, count, created_at, updated_at)
+        VALUES ((sent AT TIME ZONE 'UTC')::date, msg_status, msg_bucket, delta, now(), now())
+        ON CONFLICT (day, status, bucket)
+        DO UPDATE SET count = messagedailystat.count + EXCLUDED.count, updated_at = now();
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION messagedailystat_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM messagedailystat_bump(OLD.sent_datetime, OLD.status, OLD.bucket, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM messagedailystat_bump(NEW.sent_datetime, NEW.status, NEW.bucket, 1);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER message_daily_stat_insert_delete
+    AFTER INSERT OR DELETE ON message
+    FOR EACH ROW EXECUTE FUNCTION messagedailystat_apply()
+    """,
+    """
+    CREATE TRIGGER message_daily_stat_update
+    AFTER UPDATE OF status, bucket, sent_datetime ON message
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.bucket IS DISTINCT FROM NEW.bucket
+          OR OLD.sent_datetime IS DISTINCT FROM NEW.sent_datetime)
+    EXECUTE FUNCTION messagedailystat_apply()
+    """,
+]
+
+
+def upgrade() -> None:
+    op.create_table(
+        'messagedailystat',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('bucket', sa.String(50), nullable=False),
+        sa.Column('count', sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('day', 'status', 'bucket', name='uq_messagedailystat_day_status_bucket')
+    )
+    op.create_index(op.f('ix_messagedailystat_id'), 'messagedailystat', ['id'], unique=False)
+
+    # Block message writes until the triggers are in place so the backfill
+    # and the triggers neither miss nor double-count a row
+    op.execute("LOCK TABLE message IN SHARE MODE")
+    for statement in MESSAGE_DAILY_STAT_DDL:
+        op.execute(statement)
+
+    op.execute(
+        """
+        INSERT INTO messagedailystat (day, status, bucket, count, created_at, updated_at)
+        SELECT (sent_datetime AT TIME ZONE 'UTC')::date, status, bucket, count(*), now(), now()
+        FROM message
+        GROUP BY 1, 2, 3
+        """
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS message_daily_stat_update ON message")
+    op.execute("DROP TRIGGER IF EXISTS message_daily_stat_insert_delete ON message")
+    op.execute("DROP FUNCTION IF EXISTS messagedailystat_apply()")
+    op.execute("DROP FUNCTION IF EXISTS messagedailystat_bump(timestamptz, text, text, integer)")
+    op.drop_table('messagedailystat')
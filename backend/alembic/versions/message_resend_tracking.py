@@ -0,0 +1,50 @@
+"""Track resends per message and persist bulk resend jobs
+
+Revision ID: 0a5f2b8c9d91
+Revises: 9c4e1f7a8b80
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '0a5f2b8c9d91'
+down_revision = '9c4e1f7a8b80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('message', sa.Column('resend_of_id', sa.Integer(), nullable=True))
+    op.create_foreign_key(
+        'message_resend_of_id_fkey', 'message', 'message', ['resend_of_id'], ['id'], ondelete='SET NULL'
+    )
+    op.create_index(op.f('ix_message_resend_of_id'), 'message', ['resend_of_id'], unique=False)
+
+    op.create_table(
+        'messageresendjob',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('job_id', sa.String(32), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('total', sa.Integer(), nullable=False),
+        sa.Column('processed', sa.Integer(), nullable=False),
+        sa.Column('resent', sa.Integer(), nullable=False),
+        sa.Column('failed', sa.Integer(), nullable=False),
+        sa.Column('skipped', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('job_id')
+    )
+    op.create_index(op.f('ix_messageresendjob_id'), 'messageresendjob', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('messageresendjob')
+    op.drop_index(op.f('ix_message_resend_of_id'), table_name='message')
+    op.drop_constraint('message_resend_of_id_fkey', 'message', type_='foreignkey')
+    op.drop_column('message', 'resend_of_id')
@@ -0,0 +1,38 @@
+"""Add per-participant message rotation state
+
+Revision ID: 4d9f6a2b3c35
+Revises: 3c8e5f1a2b24
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision = '4d9f6a2b3c35'
+down_revision = '3c8e5f1a2b24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'messagerotation',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('participant_id', sa.Integer(), nullable=False),
+        sa.Column('bucket', sa.String(50), nullable=False),
+        sa.Column('permutation', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.Column('cursor', sa.Integer(), nullable=False),
+        sa.Column('recent', postgresql.JSON(astext_type=sa.Text()), nullable=False),
+        sa.ForeignKeyConstraint(['participant_id'], ['participant.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('participant_id')
+    )
+    op.create_index(op.f('ix_messagerotation_id'), 'messagerotation', ['id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('messagerotation')
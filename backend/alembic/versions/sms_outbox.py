@@ -0,0 +1,41 @@
+"""Add SMS outbox table
+
+Revision ID: 3c8e5f1a2b24
+Revises: 2b7d4e9f0a13
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '3c8e5f1a2b24'
+down_revision = '2b7d4e9f0a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'smsoutbox',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('updated_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('message_id', sa.Integer(), nullable=False),
+        sa.Column('to_number', sa.String(20), nullable=False),
+        sa.Column('status', sa.String(20), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('available_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('locked_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('locked_by', sa.String(100), nullable=True),
+        sa.Column('last_error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['message_id'], ['message.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('message_id')
+    )
+    op.create_index(op.f('ix_smsoutbox_id'), 'smsoutbox', ['id'], unique=False)
+    op.create_index('ix_smsoutbox_status_available_at', 'smsoutbox', ['status', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_table('smsoutbox')
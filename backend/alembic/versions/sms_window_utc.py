@@ -0,0 +1,58 @@
+"""Add UTC-normalized SMS window columns
+
+Revision ID: 2b7d4e9f0a13
+Revises: 1a1c3b5d6e7f
+Create Date: 2026-10-16 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '2b7d4e9f0a13'
+down_revision = '1a1c3b5d6e7f'
+branch_labels = None
+depends_on = None
+
+
+def utc_minute_of_day_sql(column: str) -> str:
+    # Kept in sync with app.models.participant.utc_minute_of_day_sql
+    return (
+        f"((((CAST(EXTRACT(HOUR FROM {column}) AS INTEGER) * 60"
+        f" + CAST(EXTRACT(MINUTE FROM {column}) AS INTEGER)"
+        f" - COALESCE(timezone_offset, 0)) % 1440) + 1440) % 1440)"
+    )
+
+
+def upgrade() -> None:
+    op.add_column(
+        'participant',
+        sa.Column(
+            'sms_window_start_utc',
+            sa.Integer(),
+            sa.Computed(utc_minute_of_day_sql('sms_window_start'), persisted=True),
+            nullable=True
+        )
+    )
+    op.add_column(
+        'participant',
+        sa.Column(
+            'sms_window_end_utc',
+            sa.Integer(),
+            sa.Computed(utc_minute_of_day_sql('sms_window_end'), persisted=True),
+            nullable=True
+        )
+    )
+    op.create_index(
+        'ix_participant_sms_window_utc',
+        'participant',
+        ['sms_window_start_utc', 'sms_window_end_utc'],
+        unique=False,
+        postgresql_where=sa.text('active')
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_participant_sms_window_utc', table_name='participant')
+    op.drop_column('participant', 'sms_window_end_utc')
+    op.drop_column('participant', 'sms_window_start_utc')
@@ -9,6 +9,7 @@ from app.db import get_db
 from app.models.participant import Participant
 from app.models.fitbit import FitbitToken
 from app.schemas.fitbit import FitbitTokenResponse, FitbitAuthRequest
+from app.services.fitbit_rate_budget import fitbit_rate_budgets
 from app.services.fitbit_service import get_fitbit_auth_url, get_tokens_from_code
 
 router = APIRouter(tags=["fitbit"], prefix="/fitbit")
@@ -94,7 +95,7 @@ async def fitbit_callback(
         )
     
     # Exchange code for tokens
-    token_data = get_tokens_from_code(code)
+    token_data = await get_tokens_from_code(code)
     
     # Check if participant already has tokens
     token_result = await db.execute(
@@ -145,6 +146,35 @@ async def get_fitbit_tokens(
     return tokens
 
 
+@router.get("/rate-budget", response_model=list[dict])
+async def get_fitbit_rate_budget(
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user),
+):
+    """
+    Get the Fitbit API request budget of each connected participant
+    
+    Budgets come from Fitbit's rate limit headers as seen by this server;
+    data deferred by the limit is fetched by the participant's next sync after
+    the reset.
+    """
+    result = await db.execute(
+        select(Participant.id, Participant.pid, FitbitToken.id)
+        .join(FitbitToken, FitbitToken.participant_id == Participant.id)
+        .order_by(Participant.id)
+    )
+    
+    return [
+        {
+            "participant_id": participant_id,
+            "pid": pid,
+            "token_id": token_id,
+            **fitbit_rate_budgets.stats_for(token_id)
+        }
+        for participant_id, pid, token_id in result.all()
+    ]
+
+
 @router.post("/fetch-data", status_code=status.HTTP_202_ACCEPTED)
 async def trigger_fitbit_data_fetch(
     participant_id: Optional[int] = None,
@@ -11,6 +11,7 @@ from app.schemas.message import (
     MessageContentResponse,
     MessageContentUpdate,
 )
+from app.services.content_cache import content_cache
 
 router = APIRouter(tags=["message_content"], prefix="/message-content")
 
@@ -28,6 +29,8 @@ async def create_message_content(
     await db.commit()
     await db.refresh(new_message_content)
     
+    content_cache.invalidate(new_message_content.bucket)
+    
     return new_message_content
 
 
@@ -95,6 +98,7 @@ async def update_message_content(
     
     # Update message content
     update_data = message_content_update.model_dump(exclude_unset=True)
+    previous_bucket = existing_message_content.bucket
     
     await db.execute(
         update(MessageContent)
@@ -108,6 +112,9 @@ async def update_message_content(
     result = await db.execute(select(MessageContent).where(MessageContent.id == message_content_id))
     updated_message_content = result.scalars().first()
     
+    # The template may have moved between buckets
+    content_cache.invalidate(previous_bucket, updated_message_content.bucket)
+    
     return updated_message_content
 
 
@@ -132,6 +139,8 @@ async def delete_message_content(
     await db.execute(delete(MessageContent).where(MessageContent.id == message_content_id))
     await db.commit()
     
+    content_cache.invalidate(existing_message_content.bucket)
+    
     return None
 
 
@@ -144,4 +153,12 @@ async def get_unique_buckets(
     result = await db.execute(select(MessageContent.bucket).distinct())
     buckets = [row[0] for row in result.all()]
     
-    return buckets
\ No newline at end of file
+    return buckets
+
+
+@router.get("/cache/stats", response_model=dict)
+async def get_content_cache_stats(
+    _: dict = Depends(get_current_user),
+):
+    """Get hit/miss counters for this worker's message template cache"""
+    return content_cache.stats()
@@ -4,10 +4,12 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, update, delete
 
 from app.api.auth import get_current_user
+from app.core.pagination import decode_cursor, encode_cursor, estimate_count
 from app.db import get_db
 from app.models.participant import Participant
 from app.schemas.participant import (
     ParticipantCreate,
+    ParticipantPage,
     ParticipantResponse,
     ParticipantUpdate,
 )
@@ -66,6 +68,51 @@ async def get_participants(
     return participants
 
 
+@router.get("/page", response_model=ParticipantPage)
+async def get_participants_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = False,
+    active: Optional[bool] = None,
+    study_group: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user),
+):
+    """
+    Get one page of participants ordered by ID using keyset pagination
+    
+    Pass `next_cursor` back as `cursor` for the next page; it is null on the
+    last page. `include_total` adds a planner estimate of the total.
+    """
+    query = select(Participant)
+    
+    if active is not None:
+        query = query.where(Participant.active == active)
+    
+    if study_group:
+        query = query.where(Participant.study_group == study_group)
+    
+    estimated_total = await estimate_count(db, query, "participant") if include_total else None
+    
+    if cursor:
+        try:
+            (after_id,) = decode_cursor(cursor, 1)
+            query = query.where(Participant.id > int(after_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor")
+    
+    query = query.order_by(Participant.id).limit(limit + 1)
+    result = await db.execute(query)
+    participants = result.scalars().all()
+    
+    next_cursor = None
+    if len(participants) > limit:
+        participants = participants[:limit]
+        next_cursor = encode_cursor([participants[-1].id])
+    
+    return {"items": participants, "next_cursor": next_cursor, "estimated_total": estimated_total}
+
+
 @router.get("/{participant_id}", response_model=ParticipantResponse)
 async def get_participant(
     participant_id: int,
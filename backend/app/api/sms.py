@@ -1,33 +1,35 @@
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
 from fastapi import APIRouter, Depends, HTTPException, Query, status, Form, Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, func
+from sqlalchemy import select, func, tuple_
 
 from app.api.auth import get_current_user
+from app.core.pagination import decode_cursor, encode_cursor, estimate_count
 from app.db import get_db
 from app.models.message import Message
 from app.models.participant import Participant
-from app.schemas.message import MessageResponse
-from app.services.twilio_service import update_message_status
+from app.schemas.message import BulkResendJob, BulkResendRequest, MessagePage, MessageResponse
+from app.services.message_status import status_transitions
+from app.services import stats_service
+from app.services.export_service import EXPORT_MEDIA_TYPES, stream_messages
+from app.services.resend_service import get_bulk_resend_job, start_bulk_resend
+from app.services.status_ingest import parse_status_callback, status_callback_buffer
+from app.services.twilio_service import update_message_status, rate_limiter, sender_pool
 
 router = APIRouter(tags=["sms"], prefix="/sms")
 
 
-@router.get("/history", response_model=List[MessageResponse])
-async def get_message_history(
-    skip: int = 0,
-    limit: int = 100,
+async def filtered_history_query(
+    db: AsyncSession,
     participant_id: Optional[int] = None,
     pid: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
     status: Optional[str] = None,
-    db: AsyncSession = Depends(get_db),
-    _: dict = Depends(get_current_user),
 ):
-    """Get message history with optional filtering"""
+    """Build the message history query for the shared history filters"""
     query = select(Message)
     
     if participant_id:
@@ -42,7 +44,7 @@ async def get_message_history(
         
         if not participant:
             raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
+                status_code=404,
                 detail=f"Participant with PID {pid} not found"
             )
         
@@ -57,6 +59,24 @@ async def get_message_history(
     if status:
         query = query.where(Message.status == status)
     
+    return query
+
+
+@router.get("/history", response_model=List[MessageResponse])
+async def get_message_history(
+    skip: int = 0,
+    limit: int = 100,
+    participant_id: Optional[int] = None,
+    pid: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user),
+):
+    """Get message history with optional filtering"""
+    query = await filtered_history_query(db, participant_id, pid, start_date, end_date, status)
+    
     # Order by sent_datetime descending (newest first)
     query = query.order_by(Message.sent_datetime.desc())
     
@@ -67,50 +87,145 @@ async def get_message_history(
     return messages
 
 
-@router.get("/stats", response_model=dict)
-async def get_message_stats(
+@router.get("/history/page", response_model=MessagePage)
+async def get_message_history_page(
+    cursor: Optional[str] = None,
+    limit: int = Query(100, ge=1, le=1000),
+    include_total: bool = False,
+    participant_id: Optional[int] = None,
+    pid: Optional[str] = None,
     start_date: Optional[datetime] = None,
     end_date: Optional[datetime] = None,
+    status: Optional[str] = None,
     db: AsyncSession = Depends(get_db),
     _: dict = Depends(get_current_user),
 ):
-    """Get statistics about messages sent"""
-    query = select(
-        Message.status,
-        func.count(Message.id).label("count")
-    ).group_by(Message.status)
-    
-    if start_date:
-        query = query.where(Message.sent_datetime >= start_date)
+    """
+    Get one page of message history, newest first, using keyset pagination
     
-    if end_date:
-        query = query.where(Message.sent_datetime <= end_date)
+    Pages are keyed on (sent_datetime, id), so every page costs the same no
+    matter how deep it is. Pass `next_cursor` back as `cursor` for the next
+    page; it is null on the last page. `include_total` adds a planner estimate
+    of the total number of matching messages.
+    """
+    query = await filtered_history_query(db, participant_id, pid, start_date, end_date, status)
     
-    result = await db.execute(query)
-    stats = {status: count for status, count in result.all()}
+    estimated_total = await estimate_count(db, query, "message") if include_total else None
     
-    # Get total participants with messages
-    distinct_participants_query = select(
-        func.count(func.distinct(Message.participant_id))
-    )
+    if cursor:
+        try:
+            sent_datetime, message_id = decode_cursor(cursor, 2)
+            after = (datetime.fromisoformat(sent_datetime), int(message_id))
+        except (ValueError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        query = query.where(tuple_(Message.sent_datetime, Message.id) < tuple_(*after))
     
-    if start_date:
-        distinct_participants_query = distinct_participants_query.where(Message.sent_datetime >= start_date)
+    query = query.order_by(Message.sent_datetime.desc(), Message.id.desc()).limit(limit + 1)
+    result = await db.execute(query)
+    messages = result.scalars().all()
     
-    if end_date:
-        distinct_participants_query = distinct_participants_query.where(Message.sent_datetime <= end_date)
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        last = messages[-1]
+        next_cursor = encode_cursor([last.sent_datetime.isoformat(), last.id])
     
-    distinct_result = await db.execute(distinct_participants_query)
-    distinct_participants = distinct_result.scalar()
+    return {"items": messages, "next_cursor": next_cursor, "estimated_total": estimated_total}
+
+
+@router.get("/export")
+async def export_message_history(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    gzip: bool = False,
+    participant_id: Optional[int] = None,
+    pid: Optional[str] = None,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    status: Optional[str] = None,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user),
+):
+    """
+    Stream the full message history as NDJSON or CSV, oldest first
     
-    # Add to stats
-    stats["distinct_participants"] = distinct_participants
+    Takes the same filters as /history. Rows are streamed from a server-side
+    cursor, so exports of any size use constant memory; `gzip=true` returns a
+    gzip-compressed file.
+    """
+    query = await filtered_history_query(db, participant_id, pid, start_date, end_date, status)
+    
+    filename = f"messages-{datetime.utcnow():%Y%m%d-%H%M%S}.{format}"
+    media_type = EXPORT_MEDIA_TYPES[format]
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    
+    return StreamingResponse(
+        stream_messages(query, format, compress=gzip),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/stats", response_model=dict)
+async def get_message_stats(
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user),
+):
+    """
+    Get statistics about messages sent
     
-    # Get total messages
-    total_messages = sum(stats.get(status, 0) for status in ["delivered", "failed", "sent", "queued", "undelivered"])
-    stats["total_messages"] = total_messages
+    Served from the daily rollup table, so the cost does not depend on how
+    many messages fall in the date range.
+    """
+    return await stats_service.get_message_stats(db, start_date, end_date)
+
+
+@router.get("/pipeline-stats", response_model=dict)
+async def get_pipeline_stats(
+    _: dict = Depends(get_current_user),
+):
+    """Get in-process SMS pipeline statistics for this worker"""
+    return {
+        "rate_limiter": rate_limiter.stats(),
+        "senders": sender_pool.stats(),
+        "status_callbacks": status_callback_buffer.stats(),
+        "status_transitions": status_transitions.stats(),
+    }
+
+
+@router.post("/resend-bulk", response_model=BulkResendJob, status_code=status.HTTP_202_ACCEPTED)
+async def resend_messages_bulk(
+    resend_request: BulkResendRequest,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user),
+):
+    """
+    Start a background job resending failed messages that match a filter
     
-    return stats
+    At most one message is resent per participant and day, and days already
+    resent or with a delivered message are skipped. Poll
+    /resend-bulk/{job_id} (on any server) for progress.
+    """
+    return await start_bulk_resend(resend_request, db)
+
+
+@router.get("/resend-bulk/{job_id}", response_model=BulkResendJob)
+async def get_resend_bulk_job(
+    job_id: str,
+    db: AsyncSession = Depends(get_db),
+    _: dict = Depends(get_current_user),
+):
+    """Get progress and outcome of a bulk resend job"""
+    job = await get_bulk_resend_job(job_id, db)
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Bulk resend job {job_id} not found"
+        )
+    return job
 
 
 @router.post("/resend/{message_id}", response_model=MessageResponse)
@@ -192,11 +307,25 @@ async def status_callback(
     """
     Webhook callback for Twilio message status updates
     This endpoint is public (no auth) since it's called by Twilio
+    
+    When the status callback buffer is running, callbacks are validated and
+    queued for a batched write, and the response returns immediately.
     """
     # Parse form data from Twilio
     form_data = await request.form()
     status_data = dict(form_data)
     
+    if status_callback_buffer.running:
+        status_update = parse_status_callback(message_id, status_data)
+        if status_update is None:
+            return JSONResponse(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                content={"detail": "Missing or unknown MessageStatus"}
+            )
+        
+        if await status_callback_buffer.offer(status_update):
+            return JSONResponse(content={"status": "accepted", "message_id": message_id})
+    
     # Update message status
     updated_message = await update_message_status(message_id, status_data, db)
     
@@ -211,6 +340,7 @@ async def status_callback(
 
 @router.post("/send-scheduled")
 async def trigger_scheduled_messages(
+    concurrency: Optional[int] = Query(None, ge=1, le=100),
     db: AsyncSession = Depends(get_db),
     _: dict = Depends(get_current_user),
 ):
@@ -218,11 +348,11 @@ async def trigger_scheduled_messages(
     Manually trigger the scheduled message sending process
     Normally this would be called by a scheduler/cron job
     """
-    from app.services.scheduler_service import send_scheduled_messages
+    from app.services.scheduler_service import dispatch_scheduled_messages
     
     try:
-        message_count = await send_scheduled_messages(db)
-        return {"status": "success", "messages_sent": message_count}
+        run_result = await dispatch_scheduled_messages(db, concurrency=concurrency)
+        return {"status": "success", "messages_sent": run_result.sent, **run_result.model_dump()}
     except Exception as e:
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -0,0 +1,55 @@
+"""
+Clock - Current UTC time for the scheduling path, replaceable by a virtual clock
+
+Code that stamps or compares scheduling times reads the time through utcnow()
+so simulations can run the scheduler against an accelerated clock.
+"""
+from datetime import datetime, timedelta
+from time import perf_counter
+from typing import Callable, Optional
+
+_clock: Optional[Callable[[], datetime]] = None
+
+
+def utcnow() -> datetime:
+    """
+    Get the current naive UTC time from the installed clock, or the system clock
+    """
+    return _clock() if _clock is not None else datetime.utcnow()
+
+
+def set_clock(clock: Optional[Callable[[], datetime]]) -> None:
+    """
+    Install a clock function (e.g. VirtualClock.now), or None to restore the system clock
+    """
+    global _clock
+    _clock = clock
+
+
+class VirtualClock:
+    """
+    Clock that runs at real speed from the last jump and can jump forward
+
+    Idle time between scheduler ticks is skipped by jumping, while work done
+    during a tick still takes its real duration, so timestamps written during a
+    slow run land as late as they would in production.
+    """
+
+    def __init__(self, start: datetime):
+        self._time = start
+        self._anchor = perf_counter()
+
+    def now(self) -> datetime:
+        return self._time + timedelta(seconds=perf_counter() - self._anchor)
+
+    def jump_to(self, when: datetime) -> datetime:
+        """
+        Move the clock forward to the given time; never moves it backwards
+
+        Returns:
+            The clock's time after the jump
+        """
+        current = self.now()
+        self._time = max(when, current)
+        self._anchor = perf_counter()
+        return self._time
@@ -0,0 +1,58 @@
+"""
+Bounded worker pools for fan-out jobs that need their own database sessions
+"""
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Iterable, TypeVar
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import async_session_maker
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+async def run_worker_pool(
+    items: Iterable[T],
+    handler: Callable[[T, AsyncSession], Awaitable[Any]],
+    concurrency: int,
+) -> None:
+    """
+    Feed items through a queue to a fixed number of asyncio workers
+
+    Each worker opens its own database session and keeps it for the whole run,
+    so at most `concurrency` handlers (and connections) are in flight at once.
+    Exceptions raised by the handler are logged and do not stop the worker.
+
+    Args:
+        items: Work items to process
+        handler: Coroutine called as handler(item, session) for every item
+        concurrency: Maximum number of items processed at the same time
+    """
+    queue: asyncio.Queue = asyncio.Queue()
+    for item in items:
+        queue.put_nowait(item)
+
+    if queue.empty():
+        return
+
+    async def worker(worker_id: int) -> None:
+        async with async_session_maker() as session:
+            while True:
+                try:
+                    item = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+
+                try:
+                    await handler(item, session)
+                except Exception as e:
+                    logger.error(f"Worker {worker_id} failed to process item: {e}")
+                    await session.rollback()
+                finally:
+                    queue.task_done()
+
+    worker_count = max(1, min(concurrency, queue.qsize()))
+    await asyncio.gather(*(worker(i) for i in range(worker_count)))
@@ -63,10 +63,72 @@ class Settings(BaseSettings):
     TWILIO_ACCOUNT_SID: str = os.getenv("TWILIO_ACCOUNT_SID", "")
     TWILIO_AUTH_TOKEN: str = os.getenv("TWILIO_AUTH_TOKEN", "")
     TWILIO_PHONE_NUMBER: str = os.getenv("TWILIO_PHONE_NUMBER", "")
+    # Optional comma-separated sender pool and Messaging Service (either replaces TWILIO_PHONE_NUMBER)
+    TWILIO_PHONE_NUMBERS: str = os.getenv("TWILIO_PHONE_NUMBERS", "")
+    TWILIO_MESSAGING_SERVICE_SID: str = os.getenv("TWILIO_MESSAGING_SERVICE_SID", "")
     EXTERNAL_BASE_URL: str = os.getenv("EXTERNAL_BASE_URL", "http://localhost:8000")
 
+    # Pooled HTTP client used for the Twilio REST API
+    TWILIO_HTTP_MAX_CONNECTIONS: int = int(os.getenv("TWILIO_HTTP_MAX_CONNECTIONS", "20"))
+    TWILIO_HTTP_TIMEOUT: float = float(os.getenv("TWILIO_HTTP_TIMEOUT", "15"))
+
+    # Per-sender send rate limit and backoff when Twilio throttles (429 / 20429)
+    TWILIO_SEND_RATE_PER_SECOND: float = float(os.getenv("TWILIO_SEND_RATE_PER_SECOND", "10"))
+    TWILIO_SEND_BURST: float = float(os.getenv("TWILIO_SEND_BURST", "10"))
+    TWILIO_THROTTLE_MAX_RETRIES: int = int(os.getenv("TWILIO_THROTTLE_MAX_RETRIES", "5"))
+    TWILIO_THROTTLE_BACKOFF_SECONDS: float = float(os.getenv("TWILIO_THROTTLE_BACKOFF_SECONDS", "1"))
+
+    # Number of scheduled SMS sends allowed in flight at once
+    SMS_DISPATCH_CONCURRENCY: int = int(os.getenv("SMS_DISPATCH_CONCURRENCY", "10"))
+
+    # Transactional outbox for outbound SMS
+    SMS_OUTBOX_ENABLED: bool = os.getenv("SMS_OUTBOX_ENABLED", "false").lower() == "true"
+    SMS_OUTBOX_WORKERS: int = int(os.getenv("SMS_OUTBOX_WORKERS", "4"))
+    SMS_OUTBOX_BATCH_SIZE: int = int(os.getenv("SMS_OUTBOX_BATCH_SIZE", "20"))
+    SMS_OUTBOX_POLL_SECONDS: float = float(os.getenv("SMS_OUTBOX_POLL_SECONDS", "1"))
+    SMS_OUTBOX_VISIBILITY_TIMEOUT: int = int(os.getenv("SMS_OUTBOX_VISIBILITY_TIMEOUT", "300"))
+    SMS_OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("SMS_OUTBOX_MAX_ATTEMPTS", "5"))
+    SMS_OUTBOX_RETRY_BASE_SECONDS: int = int(os.getenv("SMS_OUTBOX_RETRY_BASE_SECONDS", "30"))
+
+    # Buffered, batched ingestion of Twilio status callbacks
+    SMS_CALLBACK_BUFFER_ENABLED: bool = os.getenv("SMS_CALLBACK_BUFFER_ENABLED", "false").lower() == "true"
+    SMS_CALLBACK_BUFFER_SIZE: int = int(os.getenv("SMS_CALLBACK_BUFFER_SIZE", "10000"))
+    SMS_CALLBACK_BATCH_SIZE: int = int(os.getenv("SMS_CALLBACK_BATCH_SIZE", "500"))
+    SMS_CALLBACK_FLUSH_SECONDS: float = float(os.getenv("SMS_CALLBACK_FLUSH_SECONDS", "0.5"))
+    SMS_CALLBACK_ENQUEUE_TIMEOUT: float = float(os.getenv("SMS_CALLBACK_ENQUEUE_TIMEOUT", "2"))
+    SMS_CALLBACK_FLUSH_RETRIES: int = int(os.getenv("SMS_CALLBACK_FLUSH_RETRIES", "3"))
+    SMS_CALLBACK_RETRY_BACKOFF_SECONDS: float = float(os.getenv("SMS_CALLBACK_RETRY_BACKOFF_SECONDS", "0.5"))
+
+    # Interval of the leader job folding message statistics deltas into the daily rollup
+    MESSAGE_STATS_FOLD_SECONDS: float = float(os.getenv("MESSAGE_STATS_FOLD_SECONDS", "60"))
+
+    # Safety-net TTL for the in-process message template cache
+    MESSAGE_CONTENT_CACHE_TTL: float = float(os.getenv("MESSAGE_CONTENT_CACHE_TTL", "300"))
+
+    # In-process SMS scheduler driven by the timing wheel
+    SMS_SCHEDULER_ENABLED: bool = os.getenv("SMS_SCHEDULER_ENABLED", "false").lower() == "true"
+    SMS_WHEEL_RELOAD_MINUTES: int = int(os.getenv("SMS_WHEEL_RELOAD_MINUTES", "15"))
+
+    # Leader election for background jobs across workers
+    SCHEDULER_HEARTBEAT_SECONDS: float = float(os.getenv("SCHEDULER_HEARTBEAT_SECONDS", "5"))
+    SCHEDULER_LEADER_RETRY_SECONDS: float = float(os.getenv("SCHEDULER_LEADER_RETRY_SECONDS", "5"))
+    # Time after which Postgres drops the lock of a leader whose host vanished
+    SCHEDULER_LOCK_KEEPALIVE_SECONDS: int = int(os.getenv("SCHEDULER_LOCK_KEEPALIVE_SECONDS", "15"))
+
     FITBIT_CLIENT_ID: str = os.getenv("FITBIT_CLIENT_ID", "")
     FITBIT_CLIENT_SECRET: str = os.getenv("FITBIT_CLIENT_SECRET", "")
+    FITBIT_SYNC_ENABLED: bool = os.getenv("FITBIT_SYNC_ENABLED", "false").lower() == "true"
+    FITBIT_SYNC_INTERVAL_MINUTES: int = int(os.getenv("FITBIT_SYNC_INTERVAL_MINUTES", "60"))
+    FITBIT_SYNC_CONCURRENCY: int = int(os.getenv("FITBIT_SYNC_CONCURRENCY", "5"))
+    FITBIT_SYNC_BACKFILL_DAYS: int = int(os.getenv("FITBIT_SYNC_BACKFILL_DAYS", "7"))
+    FITBIT_SYNC_OPEN_DAYS: int = int(os.getenv("FITBIT_SYNC_OPEN_DAYS", "2"))
+    FITBIT_TOKEN_REFRESH_INTERVAL_MINUTES: int = int(os.getenv("FITBIT_TOKEN_REFRESH_INTERVAL_MINUTES", "10"))
+    FITBIT_TOKEN_REFRESH_AHEAD_MINUTES: int = int(os.getenv("FITBIT_TOKEN_REFRESH_AHEAD_MINUTES", "30"))
+    FITBIT_RATE_LIMIT_PER_HOUR: int = int(os.getenv("FITBIT_RATE_LIMIT_PER_HOUR", "150"))
+    FITBIT_RATE_LIMIT_DEFAULT_RESET_SECONDS: int = int(os.getenv("FITBIT_RATE_LIMIT_DEFAULT_RESET_SECONDS", "3600"))
+    FITBIT_HTTP_MAX_CONNECTIONS: int = int(os.getenv("FITBIT_HTTP_MAX_CONNECTIONS", "10"))
+    FITBIT_HTTP_TIMEOUT: float = float(os.getenv("FITBIT_HTTP_TIMEOUT", "30"))
+    FITBIT_HTTP_KEEPALIVE_SECONDS: float = float(os.getenv("FITBIT_HTTP_KEEPALIVE_SECONDS", "30"))
 
     DROPBOX_ACCESS_TOKEN: str = os.getenv("DROPBOX_ACCESS_TOKEN", "")
     FITBIT_DATA_EXPORT_PATH: str = os.getenv("FITBIT_DATA_EXPORT_PATH", "/fitbit_data")
@@ -0,0 +1,164 @@
+"""
+Leader election for background jobs using a Postgres advisory lock
+
+Only the process holding the lock runs the scheduler jobs, so several uvicorn
+workers or hosts can serve the API without firing the same job more than once.
+"""
+import asyncio
+import logging
+import os
+import socket
+from typing import Awaitable, Callable, Dict, List
+
+from sqlalchemy import text
+
+from app.db import engine
+
+logger = logging.getLogger(__name__)
+
+# Job coroutine factory: receives an event that is set when leadership ends
+LeaderJob = Callable[[asyncio.Event], Awaitable[None]]
+
+
+class LeaderElector:
+    """
+    Elect a single leader across processes with pg_try_advisory_lock
+
+    The lock is session-level and held on a dedicated connection for as long as
+    this process is leader. A heartbeat query on that connection detects a
+    broken session; if the leader process dies, Postgres drops the session and
+    the lock with it, and a standby acquires it on its next attempt. Server-side
+    TCP keepalives on that connection make Postgres notice a leader whose host
+    vanished within keepalive_seconds. Jobs that exit or crash while this
+    process leads are restarted on the next heartbeat, and are cancelled
+    when leadership ends.
+    """
+
+    def __init__(
+        self,
+        lock_key: int,
+        heartbeat_seconds: float = 5.0,
+        retry_seconds: float = 5.0,
+        keepalive_seconds: int = 15
+    ):
+        self.lock_key = lock_key
+        self.heartbeat_seconds = heartbeat_seconds
+        self.retry_seconds = retry_seconds
+        self.keepalive_seconds = keepalive_seconds
+        self.identity = f"{socket.gethostname()}:{os.getpid()}"
+        self.is_leader = False
+
+    async def _wait(self, stop_event: asyncio.Event, seconds: float) -> None:
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _set_keepalive(self, conn) -> None:
+        """
+        Have Postgres probe the lock connection so a dead leader host loses the lock
+        """
+        seconds = max(3, self.keepalive_seconds)
+        settings = {
+            "tcp_keepalives_idle": max(1, seconds // 3),
+            "tcp_keepalives_interval": max(1, seconds // 6),
+            "tcp_keepalives_count": 3,
+            "tcp_user_timeout": seconds * 1000,
+        }
+        try:
+            for name, value in settings.items():
+                await conn.execute(text(f"SET {name} = {int(value)}"))
+            await conn.commit()
+        except Exception as e:
+            # Older servers lack tcp_user_timeout; the lock still works without it
+            logger.warning(f"Could not set keepalive on the scheduler lock connection: {e}")
+            await conn.rollback()
+
+    async def _reset_keepalive(self, conn) -> None:
+        for name in ("tcp_keepalives_idle", "tcp_keepalives_interval", "tcp_keepalives_count", "tcp_user_timeout"):
+            await conn.execute(text(f"RESET {name}"))
+        await conn.commit()
+
+    async def run(self, stop_event: asyncio.Event, jobs: List[LeaderJob]) -> None:
+        """
+        Campaign for leadership until stopped, running the jobs while leader
+
+        Args:
+            stop_event: Set to stop campaigning and shut down any running jobs
+            jobs: Job coroutine factories started on election and stopped when
+                leadership is lost
+        """
+        while not stop_event.is_set():
+            try:
+                async with engine.connect() as conn:
+                    result = await conn.execute(
+                        text("SELECT pg_try_advisory_lock(:key)"), {"key": self.lock_key}
+                    )
+                    acquired = result.scalar()
+                    await conn.commit()
+
+                    if acquired:
+                        await self._lead(conn, stop_event, jobs)
+            except Exception as e:
+                logger.error(f"Leader election error on {self.identity}: {e}")
+                self.is_leader = False
+
+            await self._wait(stop_event, self.retry_seconds)
+
+    def _restart_finished_jobs(self, job_tasks: Dict[asyncio.Task, LeaderJob], leadership_ended: asyncio.Event) -> None:
+        for task, job in list(job_tasks.items()):
+            if not task.done():
+                continue
+
+            error = None if task.cancelled() else task.exception()
+            if error is not None:
+                logger.error(f"Leader job {job.__name__} crashed on {self.identity}, restarting: {error!r}")
+            else:
+                logger.warning(f"Leader job {job.__name__} exited on {self.identity}, restarting")
+
+            del job_tasks[task]
+            job_tasks[asyncio.create_task(job(leadership_ended))] = job
+
+    async def _lead(self, conn, stop_event: asyncio.Event, jobs: List[LeaderJob]) -> None:
+        self.is_leader = True
+        logger.info(f"{self.identity} elected scheduler leader")
+
+        leadership_ended = asyncio.Event()
+        job_tasks: Dict[asyncio.Task, LeaderJob] = {}
+
+        try:
+            await self._set_keepalive(conn)
+            job_tasks = {asyncio.create_task(job(leadership_ended)): job for job in jobs}
+
+            while not stop_event.is_set():
+                await self._wait(stop_event, self.heartbeat_seconds)
+                if stop_event.is_set():
+                    break
+
+                try:
+                    await asyncio.wait_for(conn.execute(text("SELECT 1")), timeout=self.heartbeat_seconds)
+                    await conn.commit()
+                except Exception as e:
+                    logger.error(f"{self.identity} lost scheduler leadership: {e}")
+                    break
+
+                self._restart_finished_jobs(job_tasks, leadership_ended)
+        finally:
+            leadership_ended.set()
+            # The lock may already be gone and a standby elected, so in-flight
+            # runs are stopped rather than allowed to finish
+            for task in job_tasks:
+                task.cancel()
+            await asyncio.gather(*job_tasks, return_exceptions=True)
+            self.is_leader = False
+
+        try:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self.lock_key})
+            await conn.commit()
+            await self._reset_keepalive(conn)
+            logger.info(f"{self.identity} released scheduler leadership")
+        except Exception as e:
+            # Discard the connection instead of returning it to the pool, where
+            # a session that is still alive would keep holding the lock
+            logger.warning(f"{self.identity} could not release the scheduler lock, closing its connection: {e}")
+            await conn.invalidate()
@@ -0,0 +1,68 @@
+"""
+Keyset pagination helpers: opaque cursors and planner-based row estimates
+"""
+import base64
+import json
+from typing import Any, List, Optional
+
+from sqlalchemy import Select, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import AsyncSession
+
+
+def encode_cursor(values: List[Any]) -> str:
+    """
+    Encode the sort key of the last row on a page as an opaque cursor
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, size: int) -> List[Any]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Raises:
+        ValueError: If the cursor is malformed or holds the wrong number of values
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError) as e:
+        raise ValueError("Invalid cursor") from e
+
+    if not isinstance(values, list) or len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+async def estimate_count(db: AsyncSession, query: Select, table_name: str) -> Optional[int]:
+    """
+    Estimate the number of rows a query returns without counting them
+
+    Unfiltered queries use the table's planner statistics (pg_class.reltuples);
+    filtered queries use the row estimate from EXPLAIN. Both are constant time,
+    unlike COUNT(*), but only as accurate as the last ANALYZE.
+
+    Args:
+        db: Database session
+        query: The filtered query, without ordering or limits
+        table_name: Table the query reads from
+
+    Returns:
+        Estimated row count, or None if no statistics are available yet
+    """
+    if query.whereclause is None:
+        result = await db.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:table_name)"),
+            {"table_name": table_name}
+        )
+        estimate = result.scalar()
+        # reltuples is -1 until the table has been vacuumed or analyzed
+        return estimate if estimate is not None and estimate >= 0 else None
+
+    sql = str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+    result = await db.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+    plan = result.scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
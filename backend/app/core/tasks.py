@@ -1,201 +1,262 @@
 """
 Background task implementations (Celery-ready stub)
 
-This module contains stubs for Celery task implementation.
-In a production setting, these would be integrated with Celery
-for background processing and scheduled tasks.
+This module contains the periodic tasks run by the application. The SMS
+scheduler, message statistics fold, Fitbit token refresh and Fitbit sync
+loops run in-process on a single leader elected with a Postgres advisory
+lock (app.core.leader), so they fire once no matter how many workers serve
+the API. SMS outbox workers run in every process, since rows are claimed
+with SKIP LOCKED, as does the status callback flusher, which only drains
+callbacks received by its own process. The remaining stubs are Celery-ready
+and would be integrated with Celery for background processing in a
+production setting.
 """
 
-import random
+import asyncio
 import logging
-from datetime import datetime, time, timedelta
+from datetime import datetime, timedelta
 from typing import List, Optional
 
-from sqlalchemy import select, and_, or_, func
-from sqlalchemy.ext.asyncio import AsyncSession
-
+from app.core.clock import utcnow
+from app.core.config import settings
+from app.core.leader import LeaderElector
 from app.db import async_session_maker
-from app.models.participant import Participant
-from app.models.message import Message, MessageContent
-from app.services.twilio_service import send_sms_message
+from app.services.fitbit_service import refresh_expiring_tokens, sync_fitbit_participants
+from app.services.outbox_service import run_outbox_worker
+from app.services.scheduler_service import dispatch_scheduled_messages
+from app.services.stats_service import fold_message_daily_stat_deltas
+from app.services.status_ingest import status_callback_buffer
+from app.services.timing_wheel import sms_timing_wheel
 
 logger = logging.getLogger(__name__)
 
+# Advisory lock key shared by every process competing to run the schedulers
+SCHEDULER_LOCK_KEY = 0x504D495343484544
 
-async def get_participants_for_messaging() -> List[Participant]:
-    """
-    Get all active participants who should receive a message based on their window time
-    """
-    async with async_session_maker() as session:
-        now = datetime.utcnow()
-        current_time = time(hour=now.hour, minute=now.minute)
-        
-        # Get participants where current time is within their SMS window
-        # and they are active in the study
-        query = select(Participant).where(
-            and_(
-                Participant.active == True,
-                Participant.sms_window_start <= current_time,
-                Participant.sms_window_end >= current_time,
-                # Make sure start date has passed
-                or_(
-                    Participant.start_date <= now.date(),
-                    Participant.start_date == None
-                )
-            )
-        )
-        
-        result = await session.execute(query)
-        participants = result.scalars().all()
-        return participants
+# Background asyncio tasks started with the application
+_background_tasks: List[asyncio.Task] = []
+_stop_event: Optional[asyncio.Event] = None
 
 
-async def select_message_for_participant(
-    participant_id: int,
-    session: AsyncSession
-) -> Optional[MessageContent]:
-    """
-    Select a random message for a participant, ensuring no repetition within a week
-    """
-    # Get participant info for study group/bucket
-    participant_result = await session.execute(
-        select(Participant).where(Participant.id == participant_id)
-    )
-    participant = participant_result.scalars().first()
-    
-    if not participant:
-        logger.error(f"Participant {participant_id} not found")
-        return None
-    
-    study_group = participant.study_group
-    
-    # Get all messages for this study group
-    available_messages_query = select(MessageContent).where(
-        MessageContent.bucket == study_group
-    )
-    
-    available_messages_result = await session.execute(available_messages_query)
-    available_messages = available_messages_result.scalars().all()
-    
-    if not available_messages:
-        logger.error(f"No messages found for study group {study_group}")
-        return None
-    
-    # Get messages sent to this participant in the last week
-    one_week_ago = datetime.utcnow() - timedelta(days=7)
-    
-    recent_messages_query = select(Message).where(
-        and_(
-            Message.participant_id == participant_id,
-            Message.sent_datetime >= one_week_ago
-        )
-    )
-    
-    recent_messages_result = await session.execute(recent_messages_query)
-    recent_messages = recent_messages_result.scalars().all()
-    
-    # Get content IDs that have been used recently
-    recent_content_ids = [msg.content_id for msg in recent_messages if msg.content_id]
-    
-    # Filter out recently used messages
-    eligible_messages = [
-        msg for msg in available_messages 
-        if msg.id not in recent_content_ids
-    ]
-    
-    if not eligible_messages:
-        # If all messages have been used recently, just pick any message
-        logger.warning(f"All messages for {study_group} have been used in the last week. Selecting random message.")
-        return random.choice(available_messages)
-    
-    # Select a random message from eligible ones
-    return random.choice(eligible_messages)
-
-
-async def send_scheduled_messages():
+async def send_scheduled_messages(
+    participant_ids: Optional[List[int]] = None,
+    now: Optional[datetime] = None,
+    skip_messaged_in_window: bool = False
+):
     """
     Celery-ready task to send scheduled messages to eligible participants
     """
     logger.info("Starting scheduled message sending task")
-    
+
     try:
-        # Get participants who should receive messages now
-        participants = await get_participants_for_messaging()
-        logger.info(f"Found {len(participants)} participants eligible for messaging")
-        
         async with async_session_maker() as session:
-            for participant in participants:
-                try:
-                    # Select a message for this participant
-                    message_content = await select_message_for_participant(
-                        participant.id, session
-                    )
-                    
-                    if not message_content:
-                        logger.warning(f"No message could be selected for participant {participant.id}")
-                        continue
-                    
-                    # Format message with participant friendly name if available
-                    formatted_message = message_content.content
-                    if "%F" in formatted_message and participant.friendly_name:
-                        formatted_message = formatted_message.replace("%F", participant.friendly_name)
-                    
-                    # Create message record
-                    message = Message(
-                        participant_id=participant.id,
-                        content_id=message_content.id,
-                        content=formatted_message,
-                        bucket=message_content.bucket,
-                        status="queued",
-                        sent_datetime=datetime.utcnow()
-                    )
-                    
-                    session.add(message)
-                    await session.commit()
-                    await session.refresh(message)
-                    
-                    # Send SMS through Twilio
-                    send_result = await send_sms_message(
-                        participant.phone_number,
-                        formatted_message
-                    )
-                    
-                    # Update message status
-                    if send_result.get("success"):
-                        message.status = "sent"
-                        message.twilio_sid = send_result.get("message_sid")
-                    else:
-                        message.status = "failed"
-                        message.error = send_result.get("error")
-                    
-                    await session.commit()
-                    
-                    logger.info(f"Sent message to participant {participant.id}: {formatted_message[:30]}...")
-                    
-                except Exception as e:
-                    logger.error(f"Error sending message to participant {participant.id}: {str(e)}")
-                    # Continue to next participant even if one fails
-        
+            run_result = await dispatch_scheduled_messages(
+                session,
+                participant_ids=participant_ids,
+                now=now,
+                skip_messaged_in_window=skip_messaged_in_window
+            )
         logger.info("Finished scheduled message sending task")
-    
+        return run_result
+
     except Exception as e:
         logger.error(f"Error in scheduled message task: {str(e)}")
 
 
+async def run_sms_scheduler(stop_event: asyncio.Event):
+    """
+    Long-running loop that fires participants as their SMS window slot arrives
+
+    The timing wheel is loaded on the first tick and then picks up
+    participants created or changed through any worker on every tick; it is
+    also reloaded periodically as a safety net. The first tick catches up on
+    windows that opened before the loop started (restart or leader failover)
+    and are still open, for participants not yet messaged in that window.
+    Later ticks do the same for participants changed since the previous
+    tick, whose slot may have passed before the change was seen.
+    """
+    reload_interval = timedelta(minutes=settings.SMS_WHEEL_RELOAD_MINUTES)
+    loaded = False
+    caught_up = False
+
+    while not stop_event.is_set():
+        now = utcnow()
+
+        try:
+            async with async_session_maker() as session:
+                # Loaded inside the retry loop so a database blip at start does not end the job
+                if not loaded or now - sms_timing_wheel.loaded_at >= reload_interval:
+                    await sms_timing_wheel.load(session)
+                    loaded = True
+                changed_participant_ids = await sms_timing_wheel.apply_changes(session)
+
+            if not caught_up:
+                # Also covers the current minute's slot, which is consumed without firing
+                run_result = await send_scheduled_messages(now=now, skip_messaged_in_window=True)
+                if run_result is None:
+                    raise RuntimeError("catch-up run failed, retrying next minute")
+                sms_timing_wheel.advance(now)
+                caught_up = True
+                logger.info(f"Caught up on {run_result.eligible} participants with open SMS windows")
+            else:
+                due_participant_ids = sms_timing_wheel.advance(now)
+                if due_participant_ids:
+                    logger.info(f"{len(due_participant_ids)} participants due at {now:%H:%M} UTC")
+                    await send_scheduled_messages(participant_ids=due_participant_ids, now=now)
+
+                changed_participant_ids = sorted(set(changed_participant_ids) - set(due_participant_ids))
+                if changed_participant_ids:
+                    await send_scheduled_messages(
+                        participant_ids=changed_participant_ids,
+                        now=now,
+                        skip_messaged_in_window=True
+                    )
+        except Exception as e:
+            logger.error(f"Error in SMS scheduler tick: {e}")
+
+        # Sleep until the start of the next minute, waking early on shutdown
+        seconds_to_next_minute = 60 - now.second - now.microsecond / 1_000_000
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=seconds_to_next_minute)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_message_stats_fold(stop_event: asyncio.Event):
+    """
+    Long-running loop that folds message statistics deltas into the daily rollup
+    """
+    while not stop_event.is_set():
+        try:
+            async with async_session_maker() as session:
+                folded = await fold_message_daily_stat_deltas(session)
+            if folded:
+                logger.debug(f"Folded message statistics deltas into {folded} rollup rows")
+        except Exception as e:
+            logger.error(f"Error folding message statistics: {e}")
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.MESSAGE_STATS_FOLD_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_fitbit_sync(stop_event: asyncio.Event):
+    """
+    Long-running loop that syncs Fitbit data on a fixed interval
+
+    When a sync defers requests because a user's rate limit is spent, the
+    next sync runs as soon as the earliest budget resets, if that comes
+    before the regular interval.
+    """
+    interval_seconds = settings.FITBIT_SYNC_INTERVAL_MINUTES * 60
+
+    while not stop_event.is_set():
+        run = await sync_fitbit_data()
+
+        wait_seconds = interval_seconds
+        if run is not None and run.resume_at is not None:
+            until_reset = max((run.resume_at - utcnow()).total_seconds(), 1.0)
+            if until_reset < interval_seconds:
+                wait_seconds = until_reset
+                logger.info(f"Next Fitbit sync in {wait_seconds:.0f}s, when deferred requests can be sent")
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=wait_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+async def run_fitbit_token_refresh(stop_event: asyncio.Event):
+    """
+    Long-running loop that refreshes expiring Fitbit tokens ahead of the syncs
+    """
+    interval_seconds = settings.FITBIT_TOKEN_REFRESH_INTERVAL_MINUTES * 60
+
+    while not stop_event.is_set():
+        await refresh_fitbit_tokens()
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=interval_seconds)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_background_tasks():
+    """
+    Start outbox workers, the status callback flusher and campaign for scheduler leadership on the running event loop
+    """
+    global _stop_event
+    _stop_event = asyncio.Event()
+
+    if settings.SMS_OUTBOX_ENABLED:
+        for worker_number in range(settings.SMS_OUTBOX_WORKERS):
+            _background_tasks.append(asyncio.create_task(run_outbox_worker(worker_number, _stop_event)))
+        logger.info(f"Started {settings.SMS_OUTBOX_WORKERS} SMS outbox workers")
+
+    if settings.SMS_CALLBACK_BUFFER_ENABLED:
+        _background_tasks.append(asyncio.create_task(status_callback_buffer.run(_stop_event)))
+
+    # The stats fold always runs, since every message write appends deltas
+    jobs = [run_message_stats_fold]
+    if settings.SMS_SCHEDULER_ENABLED:
+        jobs.append(run_sms_scheduler)
+    if settings.FITBIT_SYNC_ENABLED:
+        jobs.append(run_fitbit_token_refresh)
+        jobs.append(run_fitbit_sync)
+
+    elector = LeaderElector(
+        SCHEDULER_LOCK_KEY,
+        heartbeat_seconds=settings.SCHEDULER_HEARTBEAT_SECONDS,
+        retry_seconds=settings.SCHEDULER_LEADER_RETRY_SECONDS,
+        keepalive_seconds=settings.SCHEDULER_LOCK_KEEPALIVE_SECONDS
+    )
+    _background_tasks.append(asyncio.create_task(elector.run(_stop_event, jobs)))
+    logger.info(f"Scheduler leader election started for {len(jobs)} job(s)")
+
+
+async def stop_background_tasks():
+    """
+    Signal background loops to stop and wait for them to finish
+    """
+    if _stop_event is not None:
+        _stop_event.set()
+
+    if _background_tasks:
+        await asyncio.gather(*_background_tasks, return_exceptions=True)
+        _background_tasks.clear()
+
+
 async def refresh_fitbit_tokens():
     """
     Celery-ready task to refresh Fitbit tokens that are about to expire
     """
-    # This would be implemented when Fitbit integration is fully set up
-    pass
+    try:
+        async with async_session_maker() as session:
+            counts = await refresh_expiring_tokens(
+                session,
+                ahead=timedelta(minutes=settings.FITBIT_TOKEN_REFRESH_AHEAD_MINUTES)
+            )
+        logger.info(
+            f"Fitbit token refresh: {counts['refreshed']} of {counts['due']} refreshed, "
+            f"{counts['failed']} failed"
+        )
+        return counts
+    except Exception as e:
+        logger.error(f"Error in Fitbit token refresh task: {e}")
 
 
 async def sync_fitbit_data():
     """
     Celery-ready task to sync Fitbit data for all active participants
     """
-    # This would be implemented when Fitbit integration is fully set up
-    pass
+    try:
+        async with async_session_maker() as session:
+            run = await sync_fitbit_participants(session)
+        logger.info(f"Synced {run.fetched} Fitbit data points for {run.participants} participants")
+        return run
+    except Exception as e:
+        logger.error(f"Error in Fitbit sync task: {e}")
 
 
 async def export_fitbit_data_to_dropbox():
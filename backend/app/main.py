@@ -7,6 +7,9 @@ import logging
 import app.models
 from app.db import Base, engine
 from app.core.config import settings
+from app.core.tasks import start_background_tasks, stop_background_tasks
+from app.services.fitbit_service import close_client as close_fitbit_client
+from app.services.twilio_service import close_transport
 import asyncio
 
 # Import API routes after models
@@ -37,6 +40,14 @@ def create_app() -> FastAPI:
     @app.on_event("startup")
     async def startup_event():
         await init_db()
+        start_background_tasks()
+    
+    # Stop background loops and close pooled outbound HTTP connections on shutdown
+    @app.on_event("shutdown")
+    async def shutdown_event():
+        await stop_background_tasks()
+        await close_transport()
+        await close_fitbit_client()
     
     # Set up CORS middleware
     if settings.BACKEND_CORS_ORIGINS:
@@ -2,5 +2,13 @@
 # Import models to ensure they are registered with SQLAlchemy
 
 from app.models.participant import Participant
-from app.models.message import Message, MessageContent
-from app.models.fitbit import FitbitToken, FitbitData
+from app.models.message import (
+    Message,
+    MessageContent,
+    MessageDailyStat,
+    MessageDailyStatDelta,
+    MessageResendJob,
+    MessageRotation,
+    SmsOutbox,
+)
+from app.models.fitbit import FitbitToken, FitbitData, FitbitSyncWatermark
@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import String, DateTime, ForeignKey, JSON
+from sqlalchemy import String, Date, DateTime, ForeignKey, JSON, Index, UniqueConstraint, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -20,6 +20,7 @@ class FitbitToken(Base, BaseMixin):
     # Relationships
     participant = relationship("Participant", back_populates="fitbit_token")
     data_points = relationship("FitbitData", back_populates="token", cascade="all, delete-orphan")
+    sync_watermarks = relationship("FitbitSyncWatermark", back_populates="token", cascade="all, delete-orphan")
 
 
 class FitbitData(Base, BaseMixin):
@@ -34,3 +35,30 @@ class FitbitData(Base, BaseMixin):
     
     # Relationships
     token = relationship("FitbitToken", back_populates="data_points")
+    
+    __table_args__ = (
+        # One participant's data of one type for a date
+        Index("ix_fitbitdata_token_id_data_type_date", "token_id", "data_type", "date"),
+        # Rows still waiting for the Dropbox export
+        Index("ix_fitbitdata_unexported", "token_id", "date", postgresql_where=text("exported = false")),
+    )
+
+
+class FitbitSyncWatermark(Base, BaseMixin):
+    """
+    Last day of one participant's data of one type that no longer needs fetching
+    
+    Syncs fetch each data type from the day after its watermark onwards, so
+    catching up after downtime costs a few date-range requests instead of one
+    request per missed day.
+    """
+    token_id: Mapped[int] = mapped_column(ForeignKey("fitbittoken.id"))
+    data_type: Mapped[str] = mapped_column(String(50))
+    synced_through: Mapped[date] = mapped_column(Date)
+    
+    # Relationships
+    token = relationship("FitbitToken", back_populates="sync_watermarks")
+    
+    __table_args__ = (
+        UniqueConstraint("token_id", "data_type", name="uq_fitbitsyncwatermark_token_id_data_type"),
+    )
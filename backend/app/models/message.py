@@ -1,7 +1,7 @@
-from datetime import datetime
+from datetime import date, datetime
 from typing import Optional
 
-from sqlalchemy import String, Text, DateTime, ForeignKey, Integer
+from sqlalchemy import DDL, BigInteger, Date, String, Text, DateTime, ForeignKey, Integer, Index, JSON, UniqueConstraint, event
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
@@ -13,11 +13,16 @@ class MessageContent(Base, BaseMixin):
     Pre-defined message content that can be sent to participants
     """
     content: Mapped[str] = mapped_column(Text)
-    bucket: Mapped[str] = mapped_column(String(50), index=True)
+    bucket: Mapped[str] = mapped_column(String(50))
     active: Mapped[bool] = mapped_column(default=True)
     
     # Relationships
     messages = relationship("Message", back_populates="message_content")
+    
+    __table_args__ = (
+        # Active templates per bucket (template cache, content API filters)
+        Index("ix_messagecontent_bucket_active", "bucket", "active"),
+    )
 
 
 class Message(Base, BaseMixin):
@@ -40,6 +45,154 @@ class Message(Base, BaseMixin):
     twilio_sid: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     
+    # Failed message this one resends, so the same failure is not resent twice
+    resend_of_id: Mapped[Optional[int]] = mapped_column(
+        ForeignKey("message.id", ondelete="SET NULL"), nullable=True, index=True
+    )
+    
     # Relationships
     participant = relationship("Participant", back_populates="messages")
     message_content = relationship("MessageContent", back_populates="messages")
+    
+    __table_args__ = (
+        # Per-participant history ordered by send time
+        Index("ix_message_participant_id_sent_datetime", "participant_id", "sent_datetime"),
+        # Keyset pagination of the full history, newest first
+        Index("ix_message_sent_datetime_id", "sent_datetime", "id"),
+        # Per-participant template history (rotation bootstrap)
+        Index("ix_message_participant_id_content_id", "participant_id", "content_id"),
+        Index("ix_message_twilio_sid", "twilio_sid"),
+    )
+
+
+class SmsOutbox(Base, BaseMixin):
+    """
+    Transactional outbox of SMS deliveries, claimed and sent by outbox workers
+    """
+    message_id: Mapped[int] = mapped_column(ForeignKey("message.id", ondelete="CASCADE"), unique=True)
+    to_number: Mapped[str] = mapped_column(String(20))
+    
+    # Delivery state: pending, processing, done, failed, unknown (no answer from Twilio)
+    status: Mapped[str] = mapped_column(String(20), default="pending")
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    available_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.utcnow)
+    locked_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    locked_by: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    last_error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    
+    # Relationships
+    message = relationship("Message")
+    
+    __table_args__ = (
+        Index("ix_smsoutbox_status_available_at", "status", "available_at"),
+    )
+
+
+class MessageResendJob(Base, BaseMixin):
+    """
+    Progress and outcome of a bulk resend job, shared by every worker process
+    """
+    job_id: Mapped[str] = mapped_column(String(32), unique=True)
+    status: Mapped[str] = mapped_column(String(20), default="pending")  # pending, running, completed, failed
+    total: Mapped[int] = mapped_column(Integer, default=0)
+    processed: Mapped[int] = mapped_column(Integer, default=0)
+    resent: Mapped[int] = mapped_column(Integer, default=0)
+    failed: Mapped[int] = mapped_column(Integer, default=0)
+    skipped: Mapped[int] = mapped_column(Integer, default=0)
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+
+
+class MessageRotation(Base, BaseMixin):
+    """
+    Per-participant rotation through the active templates of their bucket
+    
+    `permutation` is a shuffled order of content ids and `cursor` the index of
+    the next one to send; ids before the cursor were sent in the current cycle.
+    `recent` holds [content_id, ISO timestamp] pairs for sends in the last 7 days.
+    """
+    participant_id: Mapped[int] = mapped_column(ForeignKey("participant.id", ondelete="CASCADE"), unique=True)
+    bucket: Mapped[str] = mapped_column(String(50))
+    permutation: Mapped[list] = mapped_column(JSON, default=list)
+    cursor: Mapped[int] = mapped_column(Integer, default=0)
+    recent: Mapped[list] = mapped_column(JSON, default=list)
+
+
+class MessageDailyStat(Base, BaseMixin):
+    """
+    Message counts per UTC day of sent_datetime, status and bucket
+    
+    Triggers on the message table (see MESSAGE_DAILY_STAT_DDL) append count
+    changes to MessageDailyStatDelta, which a periodic job folds into these
+    rows, so statistics over any date range sum a few rollup rows instead of
+    scanning message history.
+    """
+    day: Mapped[date] = mapped_column(Date)
+    status: Mapped[str] = mapped_column(String(20))
+    bucket: Mapped[str] = mapped_column(String(50))
+    count: Mapped[int] = mapped_column(BigInteger, default=0)
+    
+    __table_args__ = (
+        UniqueConstraint("day", "status", "bucket", name="uq_messagedailystat_day_status_bucket"),
+    )
+
+
+class MessageDailyStatDelta(Base, BaseMixin):
+    """
+    Append-only count changes not yet folded into MessageDailyStat
+    
+    Message writes only ever insert here, so concurrent senders and status
+    flushes never contend for (or deadlock on) the same hot rollup row.
+    """
+    day: Mapped[date] = mapped_column(Date)
+    status: Mapped[str] = mapped_column(String(20))
+    bucket: Mapped[str] = mapped_column(String(50))
+    delta: Mapped[int] = mapped_column(Integer)
+
+
+# Triggers appending a messagedailystatdelta row for every insert, delete and
+# change of status, bucket or sent_datetime on message. Also applied by the
+# message_daily_stats and message_daily_stat_deltas migrations.
+MESSAGE_DAILY_STAT_DDL = [
+    """
+    CREATE OR REPLACE FUNCTION messagedailystat_bump(sent timestamptz, msg_status text, msg_bucket text, delta integer)
+    RETURNS void AS $$
+    BEGIN
+        INSERT INTO messagedailystatdelta (day, status, bucket, delta, created_at, updated_at)
+        VALUES ((sent AT TIME ZONE 'UTC')::date, msg_status, msg_bucket, delta, now(), now());
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE OR REPLACE FUNCTION messagedailystat_apply() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            PERFORM messagedailystat_bump(OLD.sent_datetime, OLD.status, OLD.bucket, -1);
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            PERFORM messagedailystat_bump(NEW.sent_datetime, NEW.status, NEW.bucket, 1);
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER message_daily_stat_insert_delete
+    AFTER INSERT OR DELETE ON message
+    FOR EACH ROW EXECUTE FUNCTION messagedailystat_apply()
+    """,
+    """
+    CREATE TRIGGER message_daily_stat_update
+    AFTER UPDATE OF status, bucket, sent_datetime ON message
+    FOR EACH ROW
+    WHEN (OLD.status IS DISTINCT FROM NEW.status
+          OR OLD.bucket IS DISTINCT FROM NEW.bucket
+          OR OLD.sent_datetime IS DISTINCT FROM NEW.sent_datetime)
+    EXECUTE FUNCTION messagedailystat_apply()
+    """,
+]
+
+for statement in MESSAGE_DAILY_STAT_DDL:
+    event.listen(Message.__table__, "after_create", DDL(statement))
+
@@ -1,13 +1,24 @@
 from datetime import date, time
 from typing import Optional
 
-from sqlalchemy import String, Boolean, Date, Time, Integer
+from sqlalchemy import String, Boolean, Date, Time, Integer, Computed, Index, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db import Base
 from app.models.base import BaseMixin
 
 
+def utc_minute_of_day_sql(column: str) -> str:
+    """
+    SQL expression for the UTC minute of day (0-1439) of a participant-local time column
+    """
+    return (
+        f"((((CAST(EXTRACT(HOUR FROM {column}) AS INTEGER) * 60"
+        f" + CAST(EXTRACT(MINUTE FROM {column}) AS INTEGER)"
+        f" - COALESCE(timezone_offset, 0)) % 1440) + 1440) % 1440)"
+    )
+
+
 class Participant(Base, BaseMixin):
     """
     Participant model for storing participant data
@@ -28,6 +39,18 @@ class Participant(Base, BaseMixin):
     # Timezone offset in minutes from UTC
     timezone_offset: Mapped[Optional[int]] = mapped_column(Integer, default=0, nullable=True)
     
+    # SMS window normalized to UTC minute of day, maintained by the database
+    sms_window_start_utc: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        Computed(utc_minute_of_day_sql("sms_window_start"), persisted=True),
+        nullable=True
+    )
+    sms_window_end_utc: Mapped[Optional[int]] = mapped_column(
+        Integer,
+        Computed(utc_minute_of_day_sql("sms_window_end"), persisted=True),
+        nullable=True
+    )
+    
     # Status flags
     active: Mapped[bool] = mapped_column(Boolean, default=True)
     fitbit_connected: Mapped[bool] = mapped_column(Boolean, default=False)
@@ -36,3 +59,12 @@ class Participant(Base, BaseMixin):
     # Relationships
     messages = relationship("Message", back_populates="participant", cascade="all, delete-orphan")
     fitbit_token = relationship("FitbitToken", back_populates="participant", uselist=False, cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        Index(
+            "ix_participant_sms_window_utc",
+            "sms_window_start_utc",
+            "sms_window_end_utc",
+            postgresql_where=text("active"),
+        ),
+    )
@@ -123,4 +123,27 @@ class FitbitSleepData(BaseModel):
     efficiency: Optional[int] = None
     start_time: Optional[datetime] = None
     end_time: Optional[datetime] = None
-    levels: Optional[Dict[str, Any]] = None
\ No newline at end of file
+    levels: Optional[Dict[str, Any]] = None
+
+# Outcome of syncing one participant's Fitbit data
+class FitbitParticipantSyncResult(BaseModel):
+    participant_id: int
+    pid: str
+    status: str = "synced"  # synced, partial, deferred, skipped, error
+    fetched: int = 0  # Data points saved
+    deferred: int = 0  # Fetches postponed until the user's rate limit resets
+    deferred_until: Optional[datetime] = None  # When the deferred fetches can be sent (UTC)
+    errors: List[str] = []  # One entry per failed data type or a participant-level error
+    duration_seconds: float = 0.0
+
+
+# Outcome of one Fitbit sync across all connected participants
+class FitbitSyncRun(BaseModel):
+    participants: int = 0
+    fetched: int = 0
+    skipped: int = 0
+    deferred: int = 0  # Participants with fetches postponed by the rate limit
+    errored: int = 0  # Participants with at least one error
+    resume_at: Optional[datetime] = None  # Earliest time deferred fetches can be sent (UTC)
+    duration_seconds: float = 0.0
+    results: List[FitbitParticipantSyncResult] = []
@@ -1,6 +1,6 @@
 from datetime import datetime
-from typing import Optional
-from pydantic import BaseModel
+from typing import List, Literal, Optional
+from pydantic import BaseModel, Field
 
 
 # Shared properties
@@ -46,6 +46,13 @@ class MessageInDB(MessageInDBBase):
     pass
 
 
+# Keyset-paginated message history
+class MessagePage(BaseModel):
+    items: List[MessageResponse]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to get the next page
+    estimated_total: Optional[int] = None  # Planner estimate, only when requested
+
+
 # Message content model (templates)
 class MessageContentBase(BaseModel):
     content: str
@@ -82,4 +89,44 @@ class MessageContentResponse(MessageContentInDBBase):
 
 # Properties stored in DB but not returned to client
 class MessageContentInDB(MessageContentInDBBase):
-    pass
\ No newline at end of file
+    pass
+
+
+# Outcome of a single scheduled message run
+class ScheduledRunResult(BaseModel):
+    eligible: int = 0
+    sent: int = 0
+    failed: int = 0
+    skipped: int = 0
+    segments: int = 0  # Billed SMS segments of the messages handed to Twilio
+    duration_seconds: float = 0.0
+
+
+# Statuses of messages that did not reach the participant and may be resent
+UndeliveredStatus = Literal["failed", "undelivered", "canceled"]
+
+
+# Filter for a bulk resend job
+class BulkResendRequest(BaseModel):
+    start_date: Optional[datetime] = None
+    end_date: Optional[datetime] = None
+    statuses: List[UndeliveredStatus] = Field(default_factory=lambda: ["failed", "undelivered"], min_length=1)
+    bucket: Optional[str] = None
+    participant_ids: Optional[List[int]] = None
+    concurrency: Optional[int] = Field(None, ge=1, le=100)
+
+
+# Progress and outcome of a bulk resend job
+class BulkResendJob(BaseModel):
+    job_id: str
+    status: str = "pending"  # pending, running, completed, failed
+    total: int = 0
+    processed: int = 0
+    resent: int = 0
+    failed: int = 0
+    skipped: int = 0
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
@@ -1,5 +1,5 @@
 from datetime import date, time, datetime
-from typing import Optional
+from typing import List, Optional
 
 from pydantic import BaseModel, Field, validator
 
@@ -58,3 +58,10 @@ class ParticipantResponse(ParticipantInDBBase):
 # Properties stored in DB but not returned to client
 class ParticipantInDB(ParticipantInDBBase):
     pass
+
+
+# Keyset-paginated list of participants
+class ParticipantPage(BaseModel):
+    items: List[ParticipantResponse]
+    next_cursor: Optional[str] = None  # Pass back as `cursor` to get the next page
+    estimated_total: Optional[int] = None  # Planner estimate, only when requested
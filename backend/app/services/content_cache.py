@@ -0,0 +1,133 @@
+"""
+Content Cache - In-process cache of active message templates per bucket
+"""
+import logging
+import time
+from typing import Dict, Iterable, NamedTuple, Tuple
+
+from sqlalchemy import String, select, and_, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models.message import MessageContent
+
+logger = logging.getLogger(__name__)
+
+
+class ContentRecord(NamedTuple):
+    """
+    Immutable snapshot of an active MessageContent row
+    """
+    id: int
+    bucket: str
+    content: str
+
+
+class BucketContentCache:
+    """
+    Cache of active templates keyed by bucket
+
+    Entries are invalidated by the message content API on every write and
+    expire after a TTL as a safety net for writes made by other processes.
+    """
+
+    def __init__(self, ttl_seconds: float):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Tuple[float, Tuple[ContentRecord, ...]]] = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    async def get_buckets(
+        self,
+        buckets: Iterable[str],
+        db: AsyncSession
+    ) -> Dict[str, Tuple[ContentRecord, ...]]:
+        """
+        Get active templates for several buckets, loading all misses in one query
+
+        Args:
+            buckets: Bucket names to look up
+            db: Database session used on a cache miss
+
+        Returns:
+            Mapping of bucket to its active templates (empty tuple if none)
+        """
+        now = time.monotonic()
+        found: Dict[str, Tuple[ContentRecord, ...]] = {}
+        missing = []
+
+        for bucket in set(buckets):
+            entry = self._entries.get(bucket)
+            if entry and now - entry[0] < self.ttl_seconds:
+                found[bucket] = entry[1]
+                self.hits += 1
+            else:
+                missing.append(bucket)
+                self.misses += 1
+
+        if missing:
+            generation = self._generation
+            result = await db.execute(
+                select(MessageContent.id, MessageContent.bucket, MessageContent.content)
+                .where(
+                    and_(
+                        MessageContent.bucket == any_(bindparam("buckets", missing, type_=ARRAY(String))),
+                        MessageContent.active == True
+                    )
+                )
+                .order_by(MessageContent.id)
+            )
+
+            loaded: Dict[str, list] = {bucket: [] for bucket in missing}
+            for row in result.all():
+                loaded[row.bucket].append(ContentRecord(row.id, row.bucket, row.content))
+
+            for bucket, records in loaded.items():
+                found[bucket] = tuple(records)
+                # Do not store results that raced with an invalidation
+                if generation == self._generation:
+                    self._entries[bucket] = (now, found[bucket])
+
+        return found
+
+    async def get_bucket(self, bucket: str, db: AsyncSession) -> Tuple[ContentRecord, ...]:
+        """
+        Get active templates for one bucket
+        """
+        return (await self.get_buckets([bucket], db))[bucket]
+
+    def invalidate(self, *buckets: str) -> None:
+        """
+        Drop cached templates for the given buckets, or for every bucket if none given
+        """
+        self._generation += 1
+        self.invalidations += 1
+
+        if not buckets:
+            self._entries.clear()
+            return
+
+        for bucket in buckets:
+            self._entries.pop(bucket, None)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get hit/miss counters and cache size
+        """
+        lookups = self.hits + self.misses
+        return {
+            "buckets": len(self._entries),
+            "templates": sum(len(entry[1]) for entry in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else None,
+            "invalidations": self.invalidations,
+            "ttl_seconds": self.ttl_seconds
+        }
+
+
+# Process-wide cache, invalidated by the message content API
+content_cache = BucketContentCache(settings.MESSAGE_CONTENT_CACHE_TTL)
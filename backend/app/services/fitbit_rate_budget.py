@@ -0,0 +1,163 @@
+"""
+Fitbit Rate Budget - Per-user request budgets tracked from Fitbit rate limit headers
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+import httpx
+
+from app.core.clock import utcnow
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class FitbitRateLimited(Exception):
+    """
+    Raised when Fitbit answers 429 for a user whose hourly budget is spent
+    """
+
+    def __init__(self, reset_at: datetime):
+        super().__init__(f"Fitbit rate limit reached until {reset_at:%H:%M:%S} UTC")
+        self.reset_at = reset_at
+
+
+class TokenRateBudget:
+    """
+    Request budget of one Fitbit user (token) in the current rate limit window
+
+    Fitbit reports the budget on every response; until the first response the
+    configured hourly limit is assumed. Requests are reserved before they are
+    sent so parallel fetches cannot overspend; after a 429 no requests are
+    granted until the window resets.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at: Optional[datetime] = None
+        self.deferred_until: Optional[datetime] = None
+        self.requests = 0
+        self.throttled = 0
+
+    def _roll_window(self, now: datetime) -> None:
+        if self.reset_at is not None and now >= self.reset_at:
+            self.remaining = self.limit
+            self.reset_at = None
+        if self.deferred_until is not None and now >= self.deferred_until:
+            self.deferred_until = None
+
+    def reserve(self, wanted: int, now: datetime) -> int:
+        """
+        Reserve up to `wanted` requests from the budget
+
+        Returns:
+            Number of requests that may be sent now
+        """
+        self._roll_window(now)
+        if self.deferred_until is not None:
+            return 0
+
+        # Assume a full window until Fitbit reports when the current one resets
+        if self.reset_at is None:
+            self.reset_at = now + timedelta(seconds=settings.FITBIT_RATE_LIMIT_DEFAULT_RESET_SECONDS)
+
+        granted = max(0, min(wanted, self.remaining))
+        self.remaining -= granted
+        self.requests += granted
+        return granted
+
+    def record_headers(self, headers: httpx.Headers, now: datetime) -> None:
+        """
+        Update the budget from Fitbit-Rate-Limit-* response headers
+        """
+        try:
+            if "Fitbit-Rate-Limit-Limit" in headers:
+                self.limit = int(headers["Fitbit-Rate-Limit-Limit"])
+            if "Fitbit-Rate-Limit-Remaining" in headers:
+                # Requests reserved but not yet answered are already deducted
+                self.remaining = min(self.remaining, int(headers["Fitbit-Rate-Limit-Remaining"]))
+            if "Fitbit-Rate-Limit-Reset" in headers:
+                self.reset_at = now + timedelta(seconds=int(headers["Fitbit-Rate-Limit-Reset"]))
+        except ValueError:
+            logger.warning("Ignoring malformed Fitbit rate limit headers")
+
+    def record_throttled(self, headers: httpx.Headers, now: datetime) -> datetime:
+        """
+        Mark the budget as spent after a 429 and get the time work may resume
+        """
+        self.record_headers(headers, now)
+        self.throttled += 1
+        self.remaining = 0
+
+        reset_at = self.reset_at
+        if reset_at is None or reset_at <= now:
+            retry_after = headers.get("Retry-After", "")
+            seconds = int(retry_after) if retry_after.isdigit() else settings.FITBIT_RATE_LIMIT_DEFAULT_RESET_SECONDS
+            reset_at = self.reset_at = now + timedelta(seconds=seconds)
+
+        self.deferred_until = reset_at
+        return reset_at
+
+    def resumes_at(self) -> Optional[datetime]:
+        """
+        Get when requests are granted again: the end of a 429 deferral, else the window reset
+        """
+        return self.deferred_until or self.reset_at
+
+    def stats(self, now: datetime) -> Dict[str, object]:
+        self._roll_window(now)
+        return {
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "reset_at": self.reset_at.isoformat() if self.reset_at else None,
+            "deferred_until": self.deferred_until.isoformat() if self.deferred_until else None,
+            "requests": self.requests,
+            "throttled": self.throttled,
+        }
+
+
+class FitbitRateBudgets:
+    """
+    Budgets of every Fitbit user seen by this process, keyed by token ID
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self._budgets: Dict[int, TokenRateBudget] = {}
+
+    def budget_for(self, token_id: int) -> TokenRateBudget:
+        if token_id not in self._budgets:
+            self._budgets[token_id] = TokenRateBudget(self.limit)
+        return self._budgets[token_id]
+
+    def record_response(self, token_id: int, response: httpx.Response) -> None:
+        """
+        Update a user's budget from a Fitbit API response
+
+        Raises:
+            FitbitRateLimited: If the response is a 429
+        """
+        now = utcnow()
+        budget = self.budget_for(token_id)
+        if response.status_code == 429:
+            reset_at = budget.record_throttled(response.headers, now)
+            logger.warning(f"Fitbit rate limit reached for token {token_id}, deferring until {reset_at:%H:%M:%S} UTC")
+            raise FitbitRateLimited(reset_at)
+        budget.record_headers(response.headers, now)
+
+    def stats_for(self, token_id: int) -> Dict[str, object]:
+        """
+        Get a user's budget; users not seen yet report the assumed full budget
+        """
+        budget = self._budgets.get(token_id) or TokenRateBudget(self.limit)
+        return budget.stats(utcnow())
+
+    def stats(self) -> Dict[int, Dict[str, object]]:
+        now = utcnow()
+        return {token_id: budget.stats(now) for token_id, budget in self._budgets.items()}
+
+
+# Process-wide budgets shared by every Fitbit request
+fitbit_rate_budgets = FitbitRateBudgets(settings.FITBIT_RATE_LIMIT_PER_HOUR)
@@ -1,10 +1,12 @@
 """
 Fitbit Service - Handles Fitbit OAuth and data synchronization
 """
+import asyncio
 import logging
 import json
-from datetime import datetime, timedelta
-from typing import Dict, List, Optional, Any
+from datetime import date, datetime, time, timedelta, timezone
+from time import perf_counter
+from typing import Callable, Dict, List, NamedTuple, Optional, Any, Tuple
 from urllib.parse import urlencode
 
 import httpx
@@ -17,9 +19,14 @@ try:
 except ImportError:
     DROPBOX_AVAILABLE = False
 
+from app.core.clock import utcnow
+from app.core.concurrency import run_worker_pool
 from app.core.config import settings
+from app.db import async_session_maker
 from app.models.participant import Participant
-from app.models.fitbit import FitbitToken, FitbitData
+from app.models.fitbit import FitbitToken, FitbitData, FitbitSyncWatermark
+from app.schemas.fitbit import FitbitParticipantSyncResult, FitbitSyncRun
+from app.services.fitbit_rate_budget import FitbitRateLimited, fitbit_rate_budgets
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +34,7 @@ logger = logging.getLogger(__name__)
 FITBIT_AUTH_URL = "https://www.fitbit.com/oauth2/authorize"
 FITBIT_TOKEN_URL = "https://api.fitbit.com/oauth2/token"
 FITBIT_API_BASE_URL = "https://api.fitbit.com/1"
+FITBIT_API_V1_2_BASE_URL = "https://api.fitbit.com/1.2"
 
 # Scopes needed for our application
 SCOPES = [
@@ -41,6 +49,58 @@ SCOPES = [
     "weight"
 ]
 
+# Access tokens this close to expiry are refreshed before use
+TOKEN_EXPIRY_MARGIN = timedelta(minutes=5)
+
+# Per-token locks making refreshes within this process single flight
+_refresh_locks: Dict[int, asyncio.Lock] = {}
+
+_client: Optional[httpx.AsyncClient] = None
+_transport: Optional[httpx.AsyncBaseTransport] = None
+
+
+def get_client() -> httpx.AsyncClient:
+    """
+    Get the process-wide Fitbit HTTP client, creating it on first use
+    
+    All Fitbit calls share one pool of keep-alive connections, so syncing many
+    participants does not pay a TLS handshake per request.
+    """
+    global _client
+    # Created lazily so the client binds to the running event loop
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=settings.FITBIT_HTTP_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.FITBIT_HTTP_MAX_CONNECTIONS,
+                keepalive_expiry=settings.FITBIT_HTTP_KEEPALIVE_SECONDS
+            ),
+            timeout=httpx.Timeout(settings.FITBIT_HTTP_TIMEOUT, connect=5.0),
+            transport=_transport
+        )
+    return _client
+
+
+def set_transport(transport: Optional[httpx.AsyncBaseTransport]) -> None:
+    """
+    Replace the HTTP transport used for Fitbit calls (e.g. httpx.MockTransport in tests)
+    
+    Takes effect for the next client created, so call it before the first
+    request or after close_client().
+    """
+    global _transport
+    _transport = transport
+
+
+async def close_client() -> None:
+    """
+    Close pooled connections held by the Fitbit HTTP client
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
 
 def get_fitbit_auth_url(state: str, redirect_base_url: str) -> str:
     """
@@ -69,7 +129,7 @@ def get_fitbit_auth_url(state: str, redirect_base_url: str) -> str:
     return auth_url
 
 
-def get_tokens_from_code(code: str, redirect_base_url: str = "http://localhost:8000/") -> Dict[str, Any]:
+async def get_tokens_from_code(code: str, redirect_base_url: str = "http://localhost:8000/") -> Dict[str, Any]:
     """
     Exchange authorization code for access and refresh tokens
     
@@ -97,10 +157,9 @@ def get_tokens_from_code(code: str, redirect_base_url: str = "http://localhost:8
         "redirect_uri": callback_url
     }
     
-    with httpx.Client() as client:
-        response = client.post(FITBIT_TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
+    response = await get_client().post(FITBIT_TOKEN_URL, headers=headers, data=data)
+    response.raise_for_status()
+    token_data = response.json()
     
     # Calculate expiration time
     expires_at = datetime.utcnow() + timedelta(seconds=token_data["expires_in"])
@@ -112,7 +171,7 @@ def get_tokens_from_code(code: str, redirect_base_url: str = "http://localhost:8
     }
 
 
-def refresh_access_token(refresh_token: str) -> Dict[str, Any]:
+async def refresh_access_token(refresh_token: str) -> Dict[str, Any]:
     """
     Refresh an expired access token
     
@@ -132,10 +191,9 @@ def refresh_access_token(refresh_token: str) -> Dict[str, Any]:
         "refresh_token": refresh_token
     }
     
-    with httpx.Client() as client:
-        response = client.post(FITBIT_TOKEN_URL, headers=headers, data=data)
-        response.raise_for_status()
-        token_data = response.json()
+    response = await get_client().post(FITBIT_TOKEN_URL, headers=headers, data=data)
+    response.raise_for_status()
+    token_data = response.json()
     
     # Calculate expiration time
     expires_at = datetime.utcnow() + timedelta(seconds=token_data["expires_in"])
@@ -162,6 +220,367 @@ def get_basic_auth_header() -> str:
     return encoded
 
 
+class FitbitFetch(NamedTuple):
+    """
+    One Fitbit API request: a data type over an inclusive range of days
+    """
+    data_type: str
+    start: date
+    end: date
+
+
+DaySplitter = Callable[[Dict[str, Any], FitbitFetch], Dict[date, Dict[str, Any]]]
+
+
+class FitbitResource(NamedTuple):
+    """
+    Fitbit Web API resource for one data type
+    """
+    url: str  # URL template with {start} and {end} (YYYY-MM-DD)
+    max_days: int  # Longest range one request may cover
+    split: DaySplitter  # Splits a response into one payload per day
+
+
+def fetch_days(fetch: FitbitFetch) -> List[date]:
+    return [fetch.start + timedelta(days=n) for n in range((fetch.end - fetch.start).days + 1)]
+
+
+def split_by_day(key: str, date_field: str) -> DaySplitter:
+    """
+    Splitter for range responses listing entries under `key`, each dated by `date_field`
+    
+    Every day of the range gets a payload shaped like the single-day response,
+    with an empty list for days without entries.
+    """
+    def split(payload: Dict[str, Any], fetch: FitbitFetch) -> Dict[date, Dict[str, Any]]:
+        days = {day: {key: []} for day in fetch_days(fetch)}
+        for entry in payload.get(key, []):
+            day = date.fromisoformat(entry[date_field])
+            if day in days:
+                days[day][key].append(entry)
+        return days
+    
+    return split
+
+
+# Sleep stages totalled in the single-day summary
+SLEEP_STAGES = ("deep", "light", "rem", "wake")
+
+
+def split_sleep_by_day(payload: Dict[str, Any], fetch: FitbitFetch) -> Dict[date, Dict[str, Any]]:
+    """
+    Splitter for sleep range responses, which carry no per-day summary
+    
+    Each day's summary is rebuilt from that day's sleep logs the way the
+    single-day endpoint reports it, so stored payloads keep their shape.
+    Stage totals are only included when a log of the day has sleep stages.
+    """
+    days = split_by_day("sleep", "dateOfSleep")(payload, fetch)
+    for day_payload in days.values():
+        logs = day_payload["sleep"]
+        summary = {
+            "totalMinutesAsleep": sum(log.get("minutesAsleep", 0) for log in logs),
+            "totalSleepRecords": len(logs),
+            "totalTimeInBed": sum(log.get("timeInBed", 0) for log in logs),
+        }
+        staged = [log for log in logs if log.get("type") == "stages"]
+        if staged:
+            summary["stages"] = {
+                stage: sum(log.get("levels", {}).get("summary", {}).get(stage, {}).get("minutes", 0) for log in staged)
+                for stage in SLEEP_STAGES
+            }
+        day_payload["summary"] = summary
+    return days
+
+
+def split_single_day(payload: Dict[str, Any], fetch: FitbitFetch) -> Dict[date, Dict[str, Any]]:
+    return {fetch.start: payload}
+
+
+FITBIT_DATA_RESOURCES = {
+    "steps": FitbitResource(
+        FITBIT_API_BASE_URL + "/user/-/activities/steps/date/{start}/{end}.json",
+        1095,
+        split_by_day("activities-steps", "dateTime")
+    ),
+    "heartrate": FitbitResource(
+        FITBIT_API_BASE_URL + "/user/-/activities/heart/date/{start}/{end}.json",
+        365,
+        split_by_day("activities-heart", "dateTime")
+    ),
+    "sleep": FitbitResource(
+        FITBIT_API_V1_2_BASE_URL + "/user/-/sleep/date/{start}/{end}.json",
+        100,
+        split_sleep_by_day
+    ),
+    # The daily activity summary has no range form, so it is fetched per day
+    "activities": FitbitResource(
+        FITBIT_API_BASE_URL + "/user/-/activities/date/{start}.json",
+        1,
+        split_single_day
+    ),
+}
+
+
+def plan_fetches(data_type: str, start: date, end: date) -> List[FitbitFetch]:
+    """
+    Split a range of days into as few requests as the data type's resource allows
+    """
+    max_days = FITBIT_DATA_RESOURCES[data_type].max_days
+    fetches = []
+    while start <= end:
+        chunk_end = min(end, start + timedelta(days=max_days - 1))
+        fetches.append(FitbitFetch(data_type, start, chunk_end))
+        start = chunk_end + timedelta(days=1)
+    return fetches
+
+
+def describe_fetch(fetch: FitbitFetch) -> str:
+    if fetch.start == fetch.end:
+        return f"{fetch.data_type} {fetch.start:%Y-%m-%d}"
+    return f"{fetch.data_type} {fetch.start:%Y-%m-%d}..{fetch.end:%Y-%m-%d}"
+
+
+async def fetch_range(token: FitbitToken, fetch: FitbitFetch) -> Dict[date, Dict[str, Any]]:
+    """
+    Fetch one data type over a range of days and split the response per day
+    
+    The response's rate limit headers update the user's request budget.
+    
+    Raises:
+        FitbitRateLimited: If Fitbit answers 429
+        httpx.HTTPError: If the request fails or Fitbit returns another error status
+    """
+    resource = FITBIT_DATA_RESOURCES[fetch.data_type]
+    url = resource.url.format(start=f"{fetch.start:%Y-%m-%d}", end=f"{fetch.end:%Y-%m-%d}")
+    response = await get_client().get(url, headers={"Authorization": f"Bearer {token.access_token}"})
+    fitbit_rate_budgets.record_response(token.id, response)
+    response.raise_for_status()
+    
+    return resource.split(response.json(), fetch)
+
+
+def data_rows(token_id: int, fetch: FitbitFetch, days: Dict[date, Dict[str, Any]]) -> List[FitbitData]:
+    """
+    Build one FitbitData row per fetched day
+    """
+    return [
+        FitbitData(
+            token_id=token_id,
+            data_type=fetch.data_type,
+            date=datetime.combine(day, time()),
+            data=payload
+        )
+        for day, payload in sorted(days.items())
+    ]
+
+
+async def save_fetched_days(
+    db: AsyncSession,
+    token_id: int,
+    fetch: FitbitFetch,
+    days: Dict[date, Dict[str, Any]]
+) -> None:
+    """
+    Store one row per fetched day, updating the row already stored for that day
+    
+    Rows whose payload did not change keep their exported flag, so refetching
+    the open days does not export them again; changed rows are exported anew.
+    """
+    existing = await db.execute(
+        select(FitbitData)
+        .where(
+            and_(
+                FitbitData.token_id == token_id,
+                FitbitData.data_type == fetch.data_type,
+                FitbitData.date >= datetime.combine(fetch.start, time()),
+                FitbitData.date < datetime.combine(fetch.end + timedelta(days=1), time())
+            )
+        )
+        .order_by(FitbitData.date, FitbitData.id)
+    )
+    stored: Dict[date, FitbitData] = {}
+    for row in existing.scalars().all():
+        if row.date.date() in stored:
+            # Duplicate day stored by an older sync
+            await db.delete(row)
+        else:
+            stored[row.date.date()] = row
+    
+    for row in data_rows(token_id, fetch, days):
+        current = stored.get(row.date.date())
+        if current is None:
+            db.add(row)
+        elif current.data != row.data:
+            current.data = row.data
+            current.exported = False
+
+
+def token_expires_within(token: FitbitToken, margin: timedelta) -> bool:
+    """
+    Check whether a token expires within the given time
+    """
+    expires_at = token.expires_at
+    if expires_at.tzinfo is None:
+        expires_at = expires_at.replace(tzinfo=timezone.utc)
+    return expires_at <= datetime.now(timezone.utc) + margin
+
+
+async def refresh_token_locked(token_id: int, db: AsyncSession, margin: timedelta) -> Optional[FitbitToken]:
+    """
+    Refresh a token if it expires within `margin`, as a single flight per token
+    
+    Fitbit refresh tokens are single-use, so two refreshes of the same token
+    would invalidate each other. Concurrent callers in this process wait on a
+    per-token lock, and callers in other processes on the token's row lock
+    (SELECT ... FOR UPDATE). Expiry is checked again once the lock is held, so
+    everyone who waited gets the token refreshed by the first caller.
+    
+    Args:
+        token_id: ID of the FitbitToken
+        db: Database session; committed to release the row lock
+        margin: Refresh when the token expires within this time
+        
+    Returns:
+        The current token, or None if it no longer exists
+        
+    Raises:
+        httpx.HTTPError: If Fitbit rejects the refresh
+    """
+    lock = _refresh_locks.setdefault(token_id, asyncio.Lock())
+    async with lock:
+        try:
+            result = await db.execute(
+                select(FitbitToken).where(FitbitToken.id == token_id).with_for_update()
+            )
+            token = result.scalars().first()
+            
+            if token is not None and token_expires_within(token, margin):
+                new_tokens = await refresh_access_token(token.refresh_token)
+                token.access_token = new_tokens["access_token"]
+                token.refresh_token = new_tokens["refresh_token"]
+                token.expires_at = new_tokens["expires_at"]
+                logger.info(f"Refreshed Fitbit token {token_id}")
+            
+            await db.commit()
+            return token
+        except Exception:
+            await db.rollback()
+            raise
+
+
+async def ensure_fresh_token(token: FitbitToken) -> None:
+    """
+    Make sure an access token is usable for the next few minutes
+    
+    Tokens are normally refreshed ahead of time by refresh_expiring_tokens, so
+    this only refreshes (single flight, in its own session) when that job has
+    fallen behind. The given token object is updated in place.
+    """
+    if not token_expires_within(token, TOKEN_EXPIRY_MARGIN):
+        return
+    
+    async with async_session_maker() as session:
+        fresh = await refresh_token_locked(token.id, session, TOKEN_EXPIRY_MARGIN)
+    
+    if fresh is not None:
+        token.access_token = fresh.access_token
+        token.refresh_token = fresh.refresh_token
+        token.expires_at = fresh.expires_at
+
+
+async def refresh_expiring_tokens(db: AsyncSession, ahead: timedelta, concurrency: Optional[int] = None) -> Dict[str, int]:
+    """
+    Refresh every Fitbit token that expires within `ahead`
+    
+    Run periodically so syncs find their tokens already fresh. Each token is
+    refreshed through refresh_token_locked, so this is safe to run alongside
+    syncs and on several workers.
+    
+    Args:
+        db: Database session used to find the expiring tokens
+        ahead: Refresh tokens expiring within this time
+        concurrency: Maximum number of refreshes in flight (defaults to settings)
+        
+    Returns:
+        Counts of tokens due, refreshed and failed
+    """
+    result = await db.execute(
+        select(FitbitToken.id).where(FitbitToken.expires_at <= datetime.now(timezone.utc) + ahead)
+    )
+    token_ids = list(result.scalars().all())
+    counts = {"due": len(token_ids), "refreshed": 0, "failed": 0}
+    
+    async def refresh(token_id: int, session: AsyncSession) -> None:
+        try:
+            await refresh_token_locked(token_id, session, ahead)
+        except Exception as e:
+            counts["failed"] += 1
+            logger.error(f"Failed to refresh Fitbit token {token_id}: {e}")
+            return
+        counts["refreshed"] += 1
+    
+    await run_worker_pool(token_ids, refresh, concurrency or settings.FITBIT_SYNC_CONCURRENCY)
+    return counts
+
+
+def participant_connection_share() -> int:
+    """
+    Get how many requests one participant may have in flight during a sync
+    """
+    return max(1, settings.FITBIT_HTTP_MAX_CONNECTIONS // max(1, settings.FITBIT_SYNC_CONCURRENCY))
+
+
+async def fetch_within_budget(
+    token: FitbitToken,
+    fetches: List[FitbitFetch]
+) -> Tuple[Dict[FitbitFetch, Dict[date, Dict[str, Any]]], Dict[str, str], List[FitbitFetch]]:
+    """
+    Send a participant's requests concurrently, within their rate budget
+    
+    Only as many requests as the user's remaining Fitbit budget allows are
+    sent; the rest, and any request answered with 429, is deferred. Deferred
+    days stay past the sync watermark, so the next sync after the reset
+    fetches them.
+    
+    Each participant gets an equal share of the HTTP connection pool across
+    the concurrent syncs, so a large backlog queues here rather than timing
+    out waiting for a pooled connection.
+    
+    Returns:
+        The per-day payloads of each successful request, an error message per
+        failed request and the deferred requests
+    """
+    budget = fitbit_rate_budgets.budget_for(token.id)
+    granted = budget.reserve(len(fetches), utcnow())
+    to_fetch, deferred = fetches[:granted], fetches[granted:]
+    
+    slots = asyncio.Semaphore(participant_connection_share())
+    
+    async def fetch_in_slot(fetch: FitbitFetch) -> Dict[date, Dict[str, Any]]:
+        async with slots:
+            return await fetch_range(token, fetch)
+    
+    outcomes = await asyncio.gather(
+        *(fetch_in_slot(fetch) for fetch in to_fetch),
+        return_exceptions=True
+    )
+    
+    results = {}
+    errors = {}
+    for fetch, outcome in zip(to_fetch, outcomes):
+        if isinstance(outcome, FitbitRateLimited):
+            deferred.append(fetch)
+        elif isinstance(outcome, httpx.HTTPStatusError):
+            errors[describe_fetch(fetch)] = f"HTTP {outcome.response.status_code}"
+        elif isinstance(outcome, BaseException):
+            errors[describe_fetch(fetch)] = str(outcome) or type(outcome).__name__
+        else:
+            results[fetch] = outcome
+    
+    return results, errors, deferred
+
+
 async def fetch_participant_data(token: FitbitToken, date: datetime = None, types: List[str] = None) -> List[FitbitData]:
     """
     Fetch data for a specific participant on a specific date
@@ -178,144 +597,220 @@ async def fetch_participant_data(token: FitbitToken, date: datetime = None, type
         date = datetime.utcnow().date()
         
     if types is None:
-        types = ["steps", "heartrate", "sleep", "activities"]
-    
-    data_points = []
+        types = list(FITBIT_DATA_RESOURCES)
     
     # Check if token is expired and refresh if needed
-    if token.expires_at <= datetime.utcnow() + timedelta(minutes=5):
-        try:
-            new_tokens = refresh_access_token(token.refresh_token)
-            token.access_token = new_tokens["access_token"]
-            token.refresh_token = new_tokens["refresh_token"]
-            token.expires_at = new_tokens["expires_at"]
-            # Token would be updated in the database by the caller
-        except Exception as e:
-            logger.error(f"Failed to refresh token: {e}")
-            return data_points
-    
-    # Prepare headers with access token
-    headers = {
-        "Authorization": f"Bearer {token.access_token}"
-    }
-    
-    formatted_date = date.strftime("%Y-%m-%d")
-    
     try:
-        with httpx.Client() as client:
-            for data_type in types:
-                if data_type == "steps":
-                    # Fetch steps data
-                    url = f"{FITBIT_API_BASE_URL}/user/-/activities/steps/date/{formatted_date}/1d.json"
-                    response = client.get(url, headers=headers)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    data_points.append(FitbitData(
-                        token_id=token.id,
-                        data_type="steps",
-                        date=date,
-                        data=data
-                    ))
-                
-                elif data_type == "heartrate":
-                    # Fetch heart rate data
-                    url = f"{FITBIT_API_BASE_URL}/user/-/activities/heart/date/{formatted_date}/1d.json"
-                    response = client.get(url, headers=headers)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    data_points.append(FitbitData(
-                        token_id=token.id,
-                        data_type="heartrate",
-                        date=date,
-                        data=data
-                    ))
-                
-                elif data_type == "sleep":
-                    # Fetch sleep data
-                    url = f"{FITBIT_API_BASE_URL}/user/-/sleep/date/{formatted_date}.json"
-                    response = client.get(url, headers=headers)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    data_points.append(FitbitData(
-                        token_id=token.id,
-                        data_type="sleep",
-                        date=date,
-                        data=data
-                    ))
-                
-                elif data_type == "activities":
-                    # Fetch activity summary
-                    url = f"{FITBIT_API_BASE_URL}/user/-/activities/date/{formatted_date}.json"
-                    response = client.get(url, headers=headers)
-                    response.raise_for_status()
-                    data = response.json()
-                    
-                    data_points.append(FitbitData(
-                        token_id=token.id,
-                        data_type="activities",
-                        date=date,
-                        data=data
-                    ))
-    
+        await ensure_fresh_token(token)
     except Exception as e:
-        logger.error(f"Error fetching Fitbit data: {e}")
+        logger.error(f"Failed to refresh token: {e}")
+        return []
+    
+    fetches = [FitbitFetch(data_type, date, date) for data_type in types]
+    results, errors, deferred = await fetch_within_budget(token, fetches)
+    for fetch, error in errors.items():
+        logger.error(f"Error fetching Fitbit {fetch} data: {error}")
+    if deferred:
+        logger.info(f"Deferred {len(deferred)} Fitbit requests for token {token.id} until its rate limit resets")
     
-    return data_points
+    return [row for fetch, days in results.items() for row in data_rows(token.id, fetch, days)]
 
 
-async def sync_all_participants_data(db: AsyncSession, date: datetime = None) -> int:
+def advanced_watermark(fetches: List[FitbitFetch], results: Dict[FitbitFetch, Any], final_through: date) -> Optional[date]:
     """
-    Sync data for all participants with Fitbit connections
+    Get the day a data type's watermark can move to after a sync
+    
+    The watermark only moves over the leading run of successful requests, so
+    a day after a failed or deferred request is never skipped, and never past
+    the last final day.
+    """
+    synced_through = None
+    for fetch in fetches:
+        if fetch not in results:
+            break
+        synced_through = min(fetch.end, final_through)
+    return synced_through
+
+
+async def sync_participant(
+    participant_id: int,
+    pid: str,
+    token: FitbitToken,
+    db: AsyncSession,
+    through: date
+) -> FitbitParticipantSyncResult:
+    """
+    Fetch and save one participant's data from their sync watermarks up to a day
+    
+    Each data type is fetched from the day after its watermark (or the last
+    FITBIT_SYNC_BACKFILL_DAYS days for a new participant) in as few date-range
+    requests as the API allows, all in parallel. The most recent
+    FITBIT_SYNC_OPEN_DAYS days are fetched on every sync because Fitbit can
+    still add data to them. Fetched days update any rows stored for them.
+    
+    Never raises: failures are recorded on the result, the requests that did
+    succeed are still saved, and whatever does not fit the rate budget is
+    left for the next sync.
     
     Args:
-        db: Database session
-        date: The date to fetch data for (defaults to today)
+        participant_id: Participant ID
+        pid: Participant PID, for reporting
+        token: The participant's FitbitToken (not attached to a session; only read)
+        db: Database session owned by the calling worker
+        through: Last day to sync
         
     Returns:
-        Number of data points synced
+        FitbitParticipantSyncResult for the participant
     """
-    if date is None:
-        date = datetime.utcnow().date()
+    started = perf_counter()
+    result = FitbitParticipantSyncResult(participant_id=participant_id, pid=pid)
     
-    # Get all active participants with Fitbit connections
-    query = select(Participant).where(
-        and_(
-            Participant.active == True,
-            Participant.fitbit_connected == True
+    try:
+        await ensure_fresh_token(token)
+        
+        watermark_result = await db.execute(
+            select(FitbitSyncWatermark).where(FitbitSyncWatermark.token_id == token.id)
         )
-    )
-    result = await db.execute(query)
-    participants = result.scalars().all()
-    
-    total_synced = 0
-    
-    for participant in participants:
-        # Get token for participant
-        token_query = select(FitbitToken).where(FitbitToken.participant_id == participant.id)
-        token_result = await db.execute(token_query)
-        token = token_result.scalars().first()
+        watermarks = {watermark.data_type: watermark for watermark in watermark_result.scalars().all()}
         
-        if not token:
-            logger.warning(f"Participant {participant.id} marked as connected but no token found")
-            continue
+        final_through = through - timedelta(days=settings.FITBIT_SYNC_OPEN_DAYS)
+        first_open_day = final_through + timedelta(days=1)
+        backfill_start = through - timedelta(days=settings.FITBIT_SYNC_BACKFILL_DAYS - 1)
         
-        # Fetch data for participant
-        data_points = await fetch_participant_data(token, date)
+        fetches_by_type: Dict[str, List[FitbitFetch]] = {}
+        for data_type in FITBIT_DATA_RESOURCES:
+            watermark = watermarks.get(data_type)
+            start = watermark.synced_through + timedelta(days=1) if watermark else backfill_start
+            fetches_by_type[data_type] = plan_fetches(data_type, min(start, first_open_day), through)
         
-        # Save data points to database
-        for data_point in data_points:
-            db.add(data_point)
-            total_synced += 1
+        fetches = [fetch for type_fetches in fetches_by_type.values() for fetch in type_fetches]
+        results, errors, deferred = await fetch_within_budget(token, fetches)
+        
+        for fetch, days in results.items():
+            await save_fetched_days(db, token.id, fetch, days)
+            result.fetched += len(days)
+        
+        for data_type, type_fetches in fetches_by_type.items():
+            synced_through = advanced_watermark(type_fetches, results, final_through)
+            watermark = watermarks.get(data_type)
+            if synced_through is None or (watermark and synced_through <= watermark.synced_through):
+                continue
+            if watermark:
+                watermark.synced_through = synced_through
+            else:
+                db.add(FitbitSyncWatermark(token_id=token.id, data_type=data_type, synced_through=synced_through))
         
-        # Update token if it was refreshed
-        db.add(token)
+        await db.commit()
+        
+        result.deferred = len(deferred)
+        if deferred:
+            result.deferred_until = fitbit_rate_budgets.budget_for(token.id).resumes_at()
+        result.errors = [f"{fetch}: {error}" for fetch, error in errors.items()]
+        if errors:
+            result.status = "partial" if results or deferred else "error"
+        elif deferred:
+            result.status = "partial" if results else "deferred"
+    except Exception as e:
+        logger.error(f"Fitbit sync failed for participant {participant_id}: {e}")
+        await db.rollback()
+        result.status = "error"
+        result.fetched = 0
+        result.errors.append(str(e) or type(e).__name__)
+    
+    result.duration_seconds = round(perf_counter() - started, 3)
+    return result
+
+
+async def sync_fitbit_participants(
+    db: AsyncSession,
+    through: date = None,
+    concurrency: Optional[int] = None
+) -> FitbitSyncRun:
+    """
+    Sync data for all participants with Fitbit connections concurrently
     
-    await db.commit()
+    Participants are drained by a bounded worker pool, each worker holding its
+    own database session, and each participant's requests are sent in
+    parallel. A failing participant does not affect the others.
     
-    return total_synced
+    Args:
+        db: Database session used to load the connected participants
+        through: Last day to sync (defaults to today)
+        concurrency: Maximum number of participants synced at once (defaults to settings)
+        
+    Returns:
+        FitbitSyncRun with totals and a result per participant
+    """
+    started = perf_counter()
+    concurrency = concurrency or settings.FITBIT_SYNC_CONCURRENCY
+    
+    if through is None:
+        through = datetime.utcnow().date()
+    
+    # Get all active participants with Fitbit connections, with their tokens
+    query = (
+        select(Participant.id, Participant.pid, FitbitToken)
+        .outerjoin(FitbitToken, FitbitToken.participant_id == Participant.id)
+        .where(
+            and_(
+                Participant.active == True,
+                Participant.fitbit_connected == True
+            )
+        )
+    )
+    rows = (await db.execute(query)).all()
+    
+    run = FitbitSyncRun(participants=len(rows))
+    work = []
+    for participant_id, pid, token in rows:
+        if token is None:
+            logger.warning(f"Participant {participant_id} marked as connected but no token found")
+            run.results.append(FitbitParticipantSyncResult(
+                participant_id=participant_id,
+                pid=pid,
+                status="skipped",
+                errors=["No Fitbit token"]
+            ))
+            continue
+        # Workers only read tokens and refresh them in sessions of their own,
+        # so detach them to keep this session from writing stale copies back
+        db.expunge(token)
+        work.append((participant_id, pid, token))
+    
+    async def sync(item: Tuple[int, str, FitbitToken], session: AsyncSession) -> None:
+        run.results.append(await sync_participant(*item, session, through))
+    
+    await run_worker_pool(work, sync, concurrency)
+    
+    run.fetched = sum(result.fetched for result in run.results)
+    run.skipped = sum(1 for result in run.results if result.status == "skipped")
+    run.deferred = sum(1 for result in run.results if result.deferred)
+    # Rate-limit deferral alone is not an error
+    run.errored = sum(1 for result in run.results if result.errors and result.status != "skipped")
+    resume_times = [result.deferred_until for result in run.results if result.deferred_until]
+    run.resume_at = min(resume_times) if resume_times else None
+    run.duration_seconds = round(perf_counter() - started, 3)
+    logger.info(
+        f"Fitbit sync finished in {run.duration_seconds}s: {run.fetched} data points for "
+        f"{run.participants} participants, {run.skipped} skipped, {run.deferred} deferred, {run.errored} with errors "
+        f"(concurrency {concurrency})"
+    )
+    return run
+
+
+async def sync_all_participants_data(db: AsyncSession, date: datetime = None) -> int:
+    """
+    Sync data for all participants with Fitbit connections
+    
+    Args:
+        db: Database session
+        date: Last day to sync (defaults to today)
+        
+    Returns:
+        Number of data points synced
+    """
+    run = await sync_fitbit_participants(db, date)
+    return run.fetched
 
 
 async def export_data_to_dropbox(db: AsyncSession) -> int:
@@ -345,6 +840,20 @@ async def export_data_to_dropbox(db: AsyncSession) -> int:
         logger.info("No new data to export")
         return 0
     
+    # Each day's file is rewritten whole, so read every stored type of the days to export
+    pending_days = {(data_point.token_id, data_point.date) for data_point in data_points}
+    day_query = select(FitbitData).where(
+        and_(
+            FitbitData.token_id.in_({token_id for token_id, _ in pending_days}),
+            FitbitData.date.in_({day for _, day in pending_days})
+        )
+    )
+    result = await db.execute(day_query)
+    data_points = [
+        data_point for data_point in result.scalars().all()
+        if (data_point.token_id, data_point.date) in pending_days
+    ]
+    
     try:
         # Connect to Dropbox
         dbx = Dropbox(settings.DROPBOX_ACCESS_TOKEN)
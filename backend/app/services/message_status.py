@@ -0,0 +1,143 @@
+"""
+Message Status - Monotonic state machine for SMS delivery statuses
+"""
+import logging
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import case, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.message import Message
+
+logger = logging.getLogger(__name__)
+
+# Position of each Twilio message status in the delivery lattice. A message
+# only ever moves to a strictly higher rank, so late, duplicate or
+# out-of-order callbacks ("sent" after "delivered") are no-ops.
+STATUS_RANK: Dict[str, int] = {
+    "accepted": 0,
+    "scheduled": 0,
+    "queued": 0,
+    "sending": 1,
+    # Local status after a send whose outcome was lost (e.g. a read timeout);
+    # the status callback moves it on if Twilio did accept the message
+    "unknown": 2,
+    "sent": 3,
+    "delivered": 4,
+    "undelivered": 4,
+    "failed": 4,
+    "canceled": 4,
+    "partially_delivered": 4,
+    "read": 5,
+}
+
+# Statuses set by this application only; callbacks reporting them are ignored
+LOCAL_STATUSES = {"unknown"}
+
+
+def status_rank_sql(status_column=Message.status):
+    """
+    SQL expression ranking a status column; unknown statuses rank lowest
+    """
+    return case(STATUS_RANK, value=status_column, else_=-1)
+
+
+def advanced_status(new_status: str):
+    """
+    SQL expression for the status column after attempting to move it to new_status
+
+    Used when other columns must be written unconditionally in the same UPDATE
+    (e.g. the Twilio SID after a send) while the status itself only moves forward.
+    """
+    return case(
+        (status_rank_sql() < STATUS_RANK[new_status], new_status),
+        else_=Message.status
+    )
+
+
+class TransitionCounters:
+    """
+    Counters of status callbacks applied to or discarded by the lattice
+    """
+
+    def __init__(self):
+        self.accepted = 0
+        self.discarded = 0
+        self.accepted_by_status: Dict[str, int] = {}
+
+    def record_accepted(self, status: str, count: int = 1) -> None:
+        self.accepted += count
+        self.accepted_by_status[status] = self.accepted_by_status.get(status, 0) + count
+
+    def record_discarded(self, count: int = 1) -> None:
+        self.discarded += count
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "accepted": self.accepted,
+            "discarded": self.discarded,
+            "accepted_by_status": dict(self.accepted_by_status),
+        }
+
+
+# Process-wide counters shared by the direct and buffered callback paths
+status_transitions = TransitionCounters()
+
+
+async def apply_status_transition(
+    message_id: int,
+    new_status: str,
+    db: AsyncSession,
+    error: Optional[str] = None,
+    delivered_at: Optional[datetime] = None
+) -> Tuple[Optional[Message], bool]:
+    """
+    Move a message to a new status in one conditional UPDATE ... RETURNING
+
+    The update only matches when the new status ranks strictly higher than the
+    stored one, so no read is needed on the accepted path. The message is
+    only read when nothing matched, to tell a discarded transition from an
+    unknown message.
+
+    Args:
+        message_id: ID of the message to update
+        new_status: Status reported by Twilio
+        db: Database session (committed on return)
+        error: Error message to record with the new status
+        delivered_at: Delivery time to record with the new status
+
+    Returns:
+        Tuple of (message or None if not found, whether the transition was applied)
+    """
+    new_rank = STATUS_RANK.get(new_status)
+    if new_rank is None:
+        logger.warning(f"Ignoring unknown status {new_status!r} for message {message_id}")
+        status_transitions.record_discarded()
+        return await db.get(Message, message_id), False
+
+    values: Dict[str, Any] = {"status": new_status}
+    if error is not None:
+        values["error"] = error
+    if delivered_at is not None:
+        values["delivered_datetime"] = delivered_at
+
+    result = await db.execute(
+        update(Message)
+        .where(Message.id == message_id, status_rank_sql() < new_rank)
+        .values(**values)
+        .returning(Message)
+        .execution_options(synchronize_session=False, populate_existing=True)
+    )
+    message = result.scalars().first()
+    await db.commit()
+
+    if message is not None:
+        status_transitions.record_accepted(new_status)
+        return message, True
+
+    message = await db.get(Message, message_id)
+    if message is not None:
+        status_transitions.record_discarded()
+        logger.debug(f"Discarded {new_status} for message {message_id}, already {message.status}")
+    return message, False
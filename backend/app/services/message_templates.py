@@ -0,0 +1,139 @@
+"""
+Message Templates - Compiled templates with placeholder rendering and SMS segment accounting
+"""
+import re
+from functools import lru_cache
+from typing import Dict, NamedTuple, Tuple
+
+from app.models.participant import Participant
+
+# Placeholders recognized in message content: token -> (participant attribute, fallback)
+PLACEHOLDERS: Dict[str, Tuple[str, str]] = {
+    "%F": ("friendly_name", ""),
+}
+
+_PLACEHOLDER_PATTERN = re.compile("|".join(re.escape(token) for token in PLACEHOLDERS))
+
+# GSM 03.38 basic character set (one septet each) and extension table (two septets each)
+GSM7_BASIC = set(
+    "@£$¥èéùìòÇ\nØø\rÅåΔ_ΦΓΛΩΠΨΣΘΞÆæßÉ !\"#¤%&'()*+,-./0123456789:;<=>?"
+    "¡ABCDEFGHIJKLMNOPQRSTUVWXYZÄÖÑÜ§¿abcdefghijklmnopqrstuvwxyzäöñüà"
+)
+GSM7_EXTENDED = set("^{}\\[~]|€\f")
+
+# Characters per segment: (single-segment message, each part of a concatenated message)
+SEGMENT_SIZES = {
+    "GSM-7": (160, 153),
+    "UCS-2": (70, 67),
+}
+
+
+class TextMeasure(NamedTuple):
+    """
+    Encoding of a piece of text and its length in that encoding's units
+    """
+    gsm7: bool
+    gsm7_units: int  # septets; only meaningful when gsm7
+    ucs2_units: int  # UTF-16 code units
+
+    def __add__(self, other: "TextMeasure") -> "TextMeasure":
+        return TextMeasure(
+            self.gsm7 and other.gsm7,
+            self.gsm7_units + other.gsm7_units,
+            self.ucs2_units + other.ucs2_units,
+        )
+
+
+def measure_text(text: str) -> TextMeasure:
+    """
+    Measure text in GSM-7 septets and UCS-2 code units
+    """
+    gsm7 = True
+    gsm7_units = 0
+    for char in text:
+        if char in GSM7_BASIC:
+            gsm7_units += 1
+        elif char in GSM7_EXTENDED:
+            gsm7_units += 2
+        else:
+            gsm7 = False
+            break
+
+    ucs2_units = len(text.encode("utf-16-le")) // 2
+    return TextMeasure(gsm7, gsm7_units if gsm7 else 0, ucs2_units)
+
+
+def count_segments(measure: TextMeasure) -> Tuple[str, int]:
+    """
+    Get the encoding Twilio will use and the number of billed SMS segments
+    """
+    encoding = "GSM-7" if measure.gsm7 else "UCS-2"
+    length = measure.gsm7_units if measure.gsm7 else measure.ucs2_units
+    single, multipart = SEGMENT_SIZES[encoding]
+
+    if length <= single:
+        return encoding, 1
+    return encoding, -(-length // multipart)
+
+
+class RenderedMessage(NamedTuple):
+    """
+    A template rendered for one participant
+    """
+    text: str
+    encoding: str  # "GSM-7" or "UCS-2"
+    segments: int
+
+
+class CompiledTemplate:
+    """
+    A message template split into literal parts and placeholders
+
+    Literal parts are measured once at compile time, so rendering is a join
+    plus measuring only the substituted values.
+    """
+
+    def __init__(self, content: str):
+        self.parts: Tuple[str, ...] = tuple(_PLACEHOLDER_PATTERN.split(content))
+        self.fields: Tuple[Tuple[str, str], ...] = tuple(
+            PLACEHOLDERS[token] for token in _PLACEHOLDER_PATTERN.findall(content)
+        )
+
+        literal_measure = TextMeasure(True, 0, 0)
+        for part in self.parts:
+            literal_measure = literal_measure + measure_text(part)
+        self.literal_measure = literal_measure
+
+        # Templates without placeholders render to the same message every time
+        self._static = None
+        if not self.fields:
+            self._static = RenderedMessage(content, *count_segments(literal_measure))
+
+    def render(self, participant: Participant) -> RenderedMessage:
+        """
+        Render the template for a participant, with encoding and segment count
+        """
+        if self._static is not None:
+            return self._static
+
+        values = [getattr(participant, attribute, None) or fallback for attribute, fallback in self.fields]
+
+        pieces = [self.parts[0]]
+        measure = self.literal_measure
+        for value, part in zip(values, self.parts[1:]):
+            pieces.append(value)
+            pieces.append(part)
+            measure = measure + measure_text(value)
+
+        return RenderedMessage("".join(pieces), *count_segments(measure))
+
+
+@lru_cache(maxsize=4096)
+def compile_template(content: str) -> CompiledTemplate:
+    """
+    Compile message content into a template, cached by content
+
+    Keyed on the text itself, so edited templates compile afresh and never
+    need explicit invalidation.
+    """
+    return CompiledTemplate(content)
@@ -0,0 +1,237 @@
+"""
+Outbox Service - Delivers queued SMS from the transactional outbox
+"""
+import asyncio
+import logging
+import os
+import socket
+from datetime import datetime, timedelta
+from typing import List, NamedTuple
+
+from sqlalchemy import select, update, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from twilio.base.exceptions import TwilioRestException
+
+from app.core.clock import utcnow
+from app.core.config import settings
+from app.db import async_session_maker
+from app.models.message import Message, SmsOutbox
+from app.services.message_status import advanced_status
+from app.services.twilio_service import TwilioOutcomeUnknown, deliver_message
+
+logger = logging.getLogger(__name__)
+
+# HTTP statuses worth retrying: transport errors (0), throttling and server errors
+RETRYABLE_STATUSES = {0, 429, 500, 502, 503, 504}
+
+
+class ClaimedOutboxRow(NamedTuple):
+    """
+    Values of a claimed outbox row, copied out of the claiming session
+    """
+    id: int
+    message_id: int
+    to_number: str
+    attempts: int
+
+
+async def fail_abandoned_rows(db: AsyncSession, stale_before: datetime) -> int:
+    """
+    Fail stale "processing" rows that already used up SMS_OUTBOX_MAX_ATTEMPTS
+
+    Such rows crashed their worker on every attempt, so they are not claimed
+    again; their messages are marked failed.
+
+    Returns:
+        Number of rows failed
+    """
+    error = f"Abandoned after {settings.SMS_OUTBOX_MAX_ATTEMPTS} attempts"
+    result = await db.execute(
+        update(SmsOutbox)
+        .where(
+            SmsOutbox.status == "processing",
+            SmsOutbox.locked_at < stale_before,
+            SmsOutbox.attempts >= settings.SMS_OUTBOX_MAX_ATTEMPTS
+        )
+        .values(status="failed", last_error=error)
+        .returning(SmsOutbox.message_id)
+        .execution_options(synchronize_session=False)
+    )
+    message_ids = result.scalars().all()
+
+    if message_ids:
+        await db.execute(
+            update(Message)
+            .where(Message.id.in_(message_ids))
+            .values(status=advanced_status("failed"), error=error)
+            .execution_options(synchronize_session=False)
+        )
+        logger.error(f"Failed {len(message_ids)} outbox rows that crashed every delivery attempt")
+    return len(message_ids)
+
+
+async def claim_batch(db: AsyncSession, worker_id: str, batch_size: int) -> List[ClaimedOutboxRow]:
+    """
+    Claim a batch of outbox rows for delivery
+
+    Rows are locked with FOR UPDATE SKIP LOCKED so concurrent workers, in this
+    or other processes, never claim the same row. Rows left in "processing"
+    longer than the visibility timeout (e.g. after a crash) are claimed again
+    until they reach SMS_OUTBOX_MAX_ATTEMPTS.
+
+    Args:
+        db: Database session
+        worker_id: Identifier recorded on claimed rows
+        batch_size: Maximum number of rows to claim
+
+    Returns:
+        Claimed rows, already committed as "processing"
+    """
+    now = utcnow()
+    stale_before = now - timedelta(seconds=settings.SMS_OUTBOX_VISIBILITY_TIMEOUT)
+
+    await fail_abandoned_rows(db, stale_before)
+
+    result = await db.execute(
+        select(SmsOutbox)
+        .where(
+            or_(
+                and_(SmsOutbox.status == "pending", SmsOutbox.available_at <= now),
+                and_(SmsOutbox.status == "processing", SmsOutbox.locked_at < stale_before)
+            )
+        )
+        .order_by(SmsOutbox.available_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = result.scalars().all()
+
+    for row in rows:
+        row.status = "processing"
+        row.locked_at = now
+        row.locked_by = worker_id
+        row.attempts += 1
+
+    # Copied before the commit expires the rows
+    claimed = [ClaimedOutboxRow(row.id, row.message_id, row.to_number, row.attempts) for row in rows]
+    await db.commit()
+    return claimed
+
+
+async def finish_row(db: AsyncSession, row_id: int, **values) -> None:
+    """
+    Record the outcome of a claimed row by ID
+    """
+    await db.execute(
+        update(SmsOutbox)
+        .where(SmsOutbox.id == row_id)
+        .values(**values)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def deliver_outbox_row(row: ClaimedOutboxRow, db: AsyncSession) -> None:
+    """
+    Deliver one claimed outbox row and record the outcome
+
+    Retryable Twilio errors put the row back to "pending" with exponential
+    backoff until SMS_OUTBOX_MAX_ATTEMPTS is reached; other errors fail the
+    message immediately.
+    """
+    message = await db.get(Message, row.message_id)
+    if not message:
+        await finish_row(db, row.id, status="failed", last_error="Message record not found")
+        await db.commit()
+        return
+
+    # A previous attempt reached Twilio but crashed before recording the outcome
+    if message.twilio_sid:
+        await finish_row(db, row.id, status="done")
+        await db.commit()
+        return
+
+    try:
+        twilio_sid = await deliver_message(message, row.to_number)
+    except TwilioRestException as e:
+        if e.status in RETRYABLE_STATUSES and row.attempts < settings.SMS_OUTBOX_MAX_ATTEMPTS:
+            backoff = settings.SMS_OUTBOX_RETRY_BASE_SECONDS * (2 ** (row.attempts - 1))
+            await finish_row(
+                db,
+                row.id,
+                status="pending",
+                available_at=utcnow() + timedelta(seconds=backoff),
+                last_error=str(e)
+            )
+            logger.warning(f"Retrying message {message.id} in {backoff}s after Twilio error: {e}")
+        else:
+            await finish_row(db, row.id, status="failed", last_error=str(e))
+            await db.execute(
+                update(Message)
+                .where(Message.id == message.id)
+                .values(status=advanced_status("failed"), error=str(e))
+                .execution_options(synchronize_session=False)
+            )
+            logger.error(f"Twilio error when delivering message {message.id}: {e}")
+
+        await db.commit()
+        return
+    except TwilioOutcomeUnknown as e:
+        # Not retried: Twilio may have accepted it, and its callback settles the status
+        await finish_row(db, row.id, status="unknown", last_error=str(e))
+        await db.execute(
+            update(Message)
+            .where(Message.id == message.id)
+            .values(status=advanced_status("unknown"), error=str(e))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        logger.warning(f"Outcome of message {message.id} unknown: {e}")
+        return
+
+    # A status callback may already have moved the message past "sent"
+    await db.execute(
+        update(Message)
+        .where(Message.id == message.id)
+        .values(twilio_sid=twilio_sid, status=advanced_status("sent"))
+        .execution_options(synchronize_session=False)
+    )
+    await finish_row(db, row.id, status="done", last_error=None)
+    await db.commit()
+
+    logger.info(f"Delivered message {message.id} from outbox, SID: {twilio_sid}")
+
+
+async def run_outbox_worker(worker_number: int, stop_event: asyncio.Event) -> None:
+    """
+    Claim and deliver outbox rows until stopped, polling while the outbox is empty
+
+    Each row is delivered in its own session, so an error on one row cannot
+    affect the rest of the batch.
+    """
+    worker_id = f"{socket.gethostname()}:{os.getpid()}:{worker_number}"
+
+    while not stop_event.is_set():
+        delivered = 0
+
+        try:
+            async with async_session_maker() as session:
+                rows = await claim_batch(session, worker_id, settings.SMS_OUTBOX_BATCH_SIZE)
+
+            for row in rows:
+                try:
+                    async with async_session_maker() as session:
+                        await deliver_outbox_row(row, session)
+                    delivered += 1
+                except Exception as e:
+                    # Left in "processing"; reclaimed after the visibility timeout
+                    logger.error(f"Outbox worker {worker_id} failed on row {row.id}: {e}")
+        except Exception as e:
+            logger.error(f"Outbox worker {worker_id} error: {e}")
+
+        if delivered:
+            continue
+
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=settings.SMS_OUTBOX_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
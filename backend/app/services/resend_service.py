@@ -0,0 +1,211 @@
+"""
+Resend Service - Bulk resend of failed messages as a background job
+"""
+import asyncio
+import logging
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from sqlalchemy import Date, Integer, String, cast, exists, func, insert, select, update, and_, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import aliased
+
+from app.core.clock import utcnow
+from app.core.concurrency import run_worker_pool
+from app.core.config import settings
+from app.db import async_session_maker
+from app.models.message import Message, MessageResendJob
+from app.models.participant import Participant
+from app.schemas.message import BulkResendJob, BulkResendRequest
+from app.services.twilio_service import resend_message
+
+logger = logging.getLogger(__name__)
+
+# Statuses of messages that did not reach the participant
+UNDELIVERED_STATUSES = ["failed", "undelivered", "canceled"]
+
+# Minimum seconds between progress writes of a running job
+PROGRESS_SAVE_SECONDS = 1.0
+
+# Running job tasks of this process, kept so they are not garbage collected
+_job_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _utc_day(message):
+    return cast(func.timezone("UTC", message.sent_datetime), Date)
+
+
+async def select_messages_to_resend(request: BulkResendRequest, db: AsyncSession) -> List[int]:
+    """
+    Find the messages a bulk resend should retry
+
+    Keeps one message per participant and UTC day (the latest matching one),
+    so a participant hit by an outage gets a single resend per day however
+    many of their messages failed. Participant-days that already have a
+    message that was not undelivered, or whose failure was already resent
+    (by an earlier job or manually), are left out, so running a job twice
+    texts nobody twice. Inactive participants are left out.
+
+    Args:
+        request: Bulk resend filter
+        db: Database session
+
+    Returns:
+        IDs of the messages to resend
+    """
+    day = _utc_day(Message)
+
+    # Another message reached (or may still reach) the participant that day
+    same_day = aliased(Message)
+    reached_that_day = exists().where(
+        same_day.participant_id == Message.participant_id,
+        _utc_day(same_day) == day,
+        same_day.status.notin_(UNDELIVERED_STATUSES)
+    )
+
+    # A failure of the participant that day was already resent
+    original = aliased(Message)
+    resend = aliased(Message)
+    resent_that_day = exists().where(
+        resend.resend_of_id == original.id,
+        original.participant_id == Message.participant_id,
+        _utc_day(original) == day
+    )
+
+    query = (
+        select(Message.id)
+        .join(Participant, Participant.id == Message.participant_id)
+        .where(
+            and_(
+                Participant.active == True,
+                Message.status == any_(bindparam("statuses", request.statuses, type_=ARRAY(String))),
+                ~reached_that_day,
+                ~resent_that_day
+            )
+        )
+        .distinct(Message.participant_id, day)
+        .order_by(Message.participant_id, day, Message.sent_datetime.desc())
+    )
+
+    if request.start_date:
+        query = query.where(Message.sent_datetime >= request.start_date)
+
+    if request.end_date:
+        query = query.where(Message.sent_datetime <= request.end_date)
+
+    if request.bucket:
+        query = query.where(Message.bucket == request.bucket)
+
+    if request.participant_ids is not None:
+        query = query.where(
+            Message.participant_id == any_(bindparam("participant_ids", request.participant_ids, type_=ARRAY(Integer)))
+        )
+
+    result = await db.execute(query)
+    return list(result.scalars().all())
+
+
+async def save_job(job: BulkResendJob) -> None:
+    """
+    Write a job's progress to the database, where every worker can read it
+    """
+    async with async_session_maker() as session:
+        await session.execute(
+            update(MessageResendJob)
+            .where(MessageResendJob.job_id == job.job_id)
+            .values(**job.model_dump(exclude={"job_id", "created_at"}))
+        )
+        await session.commit()
+
+
+async def run_bulk_resend(job: BulkResendJob, request: BulkResendRequest) -> None:
+    """
+    Resend the selected messages through a bounded worker pool, saving the job as it goes
+    """
+    job.status = "running"
+    job.started_at = utcnow()
+    saved_at = time.monotonic()
+
+    async def save_progress() -> None:
+        nonlocal saved_at
+        if time.monotonic() - saved_at >= PROGRESS_SAVE_SECONDS:
+            saved_at = time.monotonic()
+            await save_job(job)
+
+    try:
+        await save_job(job)
+
+        async with async_session_maker() as session:
+            message_ids = await select_messages_to_resend(request, session)
+        job.total = len(message_ids)
+        await save_job(job)
+        logger.info(f"Bulk resend {job.job_id}: {job.total} messages to resend")
+
+        async def resend(message_id: int, session: AsyncSession) -> None:
+            try:
+                new_message = await resend_message(message_id, session)
+            except Exception:
+                job.failed += 1
+                raise
+            finally:
+                job.processed += 1
+
+            if new_message is None:
+                job.skipped += 1
+            elif new_message.status == "failed":
+                job.failed += 1
+            else:
+                job.resent += 1
+            await save_progress()
+
+        await run_worker_pool(message_ids, resend, request.concurrency or settings.SMS_DISPATCH_CONCURRENCY)
+        job.status = "completed"
+    except Exception as e:
+        logger.error(f"Bulk resend {job.job_id} failed: {e}")
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.finished_at = utcnow()
+        _job_tasks.pop(job.job_id, None)
+        try:
+            await save_job(job)
+        except Exception as e:
+            logger.error(f"Could not save outcome of bulk resend {job.job_id}: {e}")
+
+    logger.info(
+        f"Bulk resend {job.job_id} {job.status}: {job.resent} resent, "
+        f"{job.failed} failed, {job.skipped} skipped"
+    )
+
+
+async def start_bulk_resend(request: BulkResendRequest, db: AsyncSession) -> BulkResendJob:
+    """
+    Record a bulk resend job and start it in the background on the running event loop
+
+    The job row is committed before this returns, so its progress can be
+    polled from any worker process.
+
+    Returns:
+        The new job, in "pending" state
+    """
+    job = BulkResendJob(job_id=uuid.uuid4().hex, created_at=utcnow())
+    await db.execute(
+        insert(MessageResendJob).values(**job.model_dump())
+    )
+    await db.commit()
+
+    _job_tasks[job.job_id] = asyncio.create_task(run_bulk_resend(job, request))
+    return job
+
+
+async def get_bulk_resend_job(job_id: str, db: AsyncSession) -> Optional[BulkResendJob]:
+    """
+    Get a bulk resend job started by any process
+    """
+    result = await db.execute(select(MessageResendJob).where(MessageResendJob.job_id == job_id))
+    record = result.scalars().first()
+    if record is None:
+        return None
+    return BulkResendJob.model_validate(record, from_attributes=True)
@@ -0,0 +1,320 @@
+"""
+Rotation Service - Per-participant template rotation with a persisted cursor
+"""
+import logging
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Set
+
+from sqlalchemy import Integer, select, and_, any_, bindparam, func
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.clock import utcnow
+from app.models.message import Message, MessageRotation
+from app.models.participant import Participant
+
+logger = logging.getLogger(__name__)
+
+NO_REPEAT_WINDOW = timedelta(days=7)
+
+
+def _shuffled(content_ids: Iterable[int]) -> List[int]:
+    content_ids = list(content_ids)
+    random.shuffle(content_ids)
+    return content_ids
+
+
+def _recent_ids(rotation: MessageRotation, now: datetime) -> Set[int]:
+    """
+    Drop sends older than the no-repeat window and return the ids still recent
+    """
+    cutoff = now - NO_REPEAT_WINDOW
+    recent = [
+        [content_id, sent_at]
+        for content_id, sent_at in rotation.recent
+        if datetime.fromisoformat(sent_at) >= cutoff
+    ]
+    if len(recent) != len(rotation.recent):
+        rotation.recent = recent
+    return {content_id for content_id, _ in recent}
+
+
+def sync_rotation(rotation: MessageRotation, active_ids: List[int]) -> None:
+    """
+    Adjust a rotation to the bucket's current active templates
+
+    Deactivated templates are removed (keeping the cursor on the same next
+    template) and new templates are inserted at the cursor, so they are sent
+    next; never-sent templates therefore always come first.
+    """
+    active = set(active_ids)
+    permutation = []
+    cursor = rotation.cursor
+
+    for index, content_id in enumerate(rotation.permutation):
+        if content_id in active:
+            permutation.append(content_id)
+        elif index < rotation.cursor:
+            cursor -= 1
+
+    known = set(permutation)
+    added = [content_id for content_id in active_ids if content_id not in known]
+    if added:
+        permutation[cursor:cursor] = _shuffled(added)
+
+    if permutation != rotation.permutation or cursor != rotation.cursor:
+        rotation.permutation = permutation
+        rotation.cursor = cursor
+
+
+def _start_cycle_if_exhausted(rotation: MessageRotation, recent: Set[int]) -> None:
+    """
+    Reshuffle a finished cycle, placing recently sent templates last
+    """
+    if rotation.cursor < len(rotation.permutation):
+        return
+    rotation.permutation = (
+        _shuffled(cid for cid in rotation.permutation if cid not in recent)
+        + _shuffled(cid for cid in rotation.permutation if cid in recent)
+    )
+    rotation.cursor = 0
+
+
+def next_in_rotation(rotation: MessageRotation, now: datetime) -> Optional[int]:
+    """
+    Get the next template of a rotation without consuming it
+
+    The first template at or after the cursor that was not sent in the last
+    7 days is chosen. When a cycle is exhausted the permutation is reshuffled
+    with recently sent templates placed last. If every remaining template was
+    sent in the last 7 days the next one is chosen anyway, matching the old
+    "reset and use all messages" fallback.
+
+    Returns:
+        The selected content id, or None if the bucket has no active templates
+    """
+    if not rotation.permutation:
+        return None
+
+    recent = _recent_ids(rotation, now)
+    _start_cycle_if_exhausted(rotation, recent)
+
+    for content_id in rotation.permutation[rotation.cursor:]:
+        if content_id not in recent:
+            return content_id
+
+    logger.warning(f"All messages have been sent in the last week to participant {rotation.participant_id}")
+    return rotation.permutation[rotation.cursor]
+
+
+def record_rotation_send(rotation: MessageRotation, content_id: int, now: datetime) -> None:
+    """
+    Consume a sent template: swap it to the cursor, advance the cursor and
+    remember it as recently sent
+
+    A template that is no longer ahead of the cursor (e.g. consumed by an
+    overlapping run) leaves the cursor where it is.
+    """
+    _start_cycle_if_exhausted(rotation, _recent_ids(rotation, now))
+
+    permutation = list(rotation.permutation)
+    cursor = rotation.cursor
+    if content_id in permutation[cursor:]:
+        index = permutation.index(content_id, cursor)
+        permutation[cursor], permutation[index] = permutation[index], permutation[cursor]
+        rotation.permutation = permutation
+        rotation.cursor = cursor + 1
+
+    rotation.recent = rotation.recent + [[content_id, now.isoformat()]]
+
+
+def advance_rotation(rotation: MessageRotation, now: datetime) -> Optional[int]:
+    """
+    Take the next template from a rotation and record it as sent
+
+    Returns:
+        The selected content id, or None if the bucket has no active templates
+    """
+    content_id = next_in_rotation(rotation, now)
+    if content_id is not None:
+        record_rotation_send(rotation, content_id, now)
+    return content_id
+
+
+async def bootstrap_rotations(
+    participants: List[Participant],
+    active_ids_by_bucket: Dict[str, List[int]],
+    db: AsyncSession,
+    now: datetime
+) -> List[MessageRotation]:
+    """
+    Build initial rotations from message history in a single query
+
+    Never-sent templates go first, then templates not sent in the last
+    7 days, then recently sent ones; the recent list is seeded from history.
+    """
+    participant_ids = [participant.id for participant in participants]
+    result = await db.execute(
+        select(
+            Message.participant_id,
+            Message.content_id,
+            func.max(Message.sent_datetime)
+        ).where(
+            and_(
+                Message.participant_id == any_(bindparam("participant_ids", participant_ids, type_=ARRAY(Integer))),
+                Message.content_id.isnot(None)
+            )
+        ).group_by(Message.participant_id, Message.content_id)
+    )
+
+    last_sent: Dict[int, Dict[int, datetime]] = defaultdict(dict)
+    for participant_id, content_id, sent_at in result.all():
+        last_sent[participant_id][content_id] = sent_at.replace(tzinfo=None)
+
+    cutoff = now - NO_REPEAT_WINDOW
+    rotations = []
+    for participant in participants:
+        history = last_sent[participant.id]
+        active_ids = active_ids_by_bucket.get(participant.study_group, [])
+
+        never_sent = [cid for cid in active_ids if cid not in history]
+        older = [cid for cid in active_ids if cid in history and history[cid] < cutoff]
+        recent = [cid for cid in active_ids if cid in history and history[cid] >= cutoff]
+
+        rotations.append(MessageRotation(
+            participant_id=participant.id,
+            bucket=participant.study_group,
+            permutation=_shuffled(never_sent) + _shuffled(older) + _shuffled(recent),
+            cursor=0,
+            recent=[
+                [cid, sent_at.isoformat()]
+                for cid, sent_at in sorted(history.items(), key=lambda item: item[1])
+                if sent_at >= cutoff
+            ]
+        ))
+
+    return rotations
+
+
+async def _lock_rotations(db: AsyncSession, participant_ids: List[int]) -> Dict[int, MessageRotation]:
+    """
+    Load rotation rows FOR UPDATE, in participant order so overlapping runs cannot deadlock
+    """
+    result = await db.execute(
+        select(MessageRotation)
+        .where(
+            MessageRotation.participant_id == any_(bindparam("participant_ids", participant_ids, type_=ARRAY(Integer)))
+        )
+        .order_by(MessageRotation.participant_id)
+        .with_for_update()
+        .execution_options(populate_existing=True)
+    )
+    return {rotation.participant_id: rotation for rotation in result.scalars().all()}
+
+
+async def select_from_rotations(
+    participants: List[Participant],
+    active_ids_by_bucket: Dict[str, List[int]],
+    db: AsyncSession,
+    now: Optional[datetime] = None
+) -> Dict[int, int]:
+    """
+    Choose the next template of every participant's rotation
+
+    Loads all rotation rows in one locked query; only participants without a
+    rotation for their current bucket touch the message history (once, to
+    bootstrap). New rotations are inserted with ON CONFLICT DO NOTHING and
+    re-read under the lock, so overlapping runs (the scheduler and a manual
+    send, or two workers) neither fail on the unique participant_id nor lose
+    updates. The chosen templates are not consumed here: call
+    record_sent_template once a send succeeded.
+
+    Args:
+        participants: Participants to select for
+        active_ids_by_bucket: Active template ids per bucket
+        db: Database session (committed on return)
+        now: Current UTC time
+
+    Returns:
+        Mapping of participant ID to selected content id; participants whose
+        bucket has no active templates are left out
+    """
+    if not participants:
+        return {}
+
+    now = now or utcnow()
+    participant_ids = [participant.id for participant in participants]
+
+    rotations = await _lock_rotations(db, participant_ids)
+
+    missing = [participant for participant in participants if participant.id not in rotations]
+    if missing:
+        new_rotations = await bootstrap_rotations(missing, active_ids_by_bucket, db, now)
+        await db.execute(
+            insert(MessageRotation)
+            .values([
+                {
+                    "participant_id": rotation.participant_id,
+                    "bucket": rotation.bucket,
+                    "permutation": rotation.permutation,
+                    "cursor": rotation.cursor,
+                    "recent": rotation.recent,
+                }
+                for rotation in new_rotations
+            ])
+            .on_conflict_do_nothing(index_elements=["participant_id"])
+        )
+        # Rows inserted by an overlapping run are kept as they are
+        rotations.update(await _lock_rotations(db, [participant.id for participant in missing]))
+
+    # Participants who changed study group start again from their history
+    moved = [participant for participant in participants if rotations[participant.id].bucket != participant.study_group]
+    if moved:
+        for rotation in await bootstrap_rotations(moved, active_ids_by_bucket, db, now):
+            existing = rotations[rotation.participant_id]
+            existing.bucket = rotation.bucket
+            existing.permutation = rotation.permutation
+            existing.cursor = rotation.cursor
+            existing.recent = rotation.recent
+
+    selections: Dict[int, int] = {}
+    for participant in participants:
+        rotation = rotations[participant.id]
+        sync_rotation(rotation, active_ids_by_bucket.get(participant.study_group, []))
+
+        content_id = next_in_rotation(rotation, now)
+        if content_id is not None:
+            selections[participant.id] = content_id
+
+    await db.commit()
+    return selections
+
+
+async def record_sent_template(
+    participant_id: int,
+    content_id: int,
+    db: AsyncSession,
+    now: Optional[datetime] = None
+) -> None:
+    """
+    Advance a participant's rotation past a template that was sent
+
+    The rotation row is locked for the read-modify-write, so concurrent sends
+    to the same participant cannot lose each other's advance.
+
+    Args:
+        participant_id: Participant the template was sent to
+        content_id: Template that was sent
+        db: Database session (committed on return)
+        now: Send time recorded in the no-repeat window
+    """
+    rotations = await _lock_rotations(db, [participant_id])
+    rotation = rotations.get(participant_id)
+    if rotation is None:
+        await db.commit()
+        return
+
+    record_rotation_send(rotation, content_id, now or utcnow())
+    await db.commit()
@@ -2,70 +2,102 @@
 Scheduler Service - Handles scheduling of SMS messages
 """
 import logging
-import random
-from datetime import datetime, timedelta, time
-from typing import List, Optional
+from datetime import datetime
+from time import perf_counter
+from typing import Dict, List, Optional, Tuple
 
-from sqlalchemy import select, and_, func
+from sqlalchemy import DateTime, Integer, select, and_, or_, any_, bindparam, exists, func
+from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.clock import utcnow
+from app.core.concurrency import run_worker_pool
+from app.core.config import settings
+from app.models.message import Message
 from app.models.participant import Participant
-from app.models.message import Message, MessageContent
-from app.services.twilio_service import send_sms
+from app.schemas.message import ScheduledRunResult
+from app.services.content_cache import ContentRecord, content_cache
+from app.services.message_templates import RenderedMessage, compile_template
+from app.services.rotation_service import record_sent_template, select_from_rotations
+from app.services.twilio_service import get_sender
 
 logger = logging.getLogger(__name__)
 
 
-async def get_participants_for_messaging(db: AsyncSession) -> List[Participant]:
+async def get_participants_for_messaging(
+    db: AsyncSession,
+    now: Optional[datetime] = None,
+    participant_ids: Optional[List[int]] = None,
+    skip_messaged_in_window: bool = False
+) -> List[Participant]:
     """
     Get all active participants who should receive a message based on their window time
     
+    The timezone-adjusted window check (including windows that cross midnight)
+    runs in SQL against the UTC-normalized window columns, so only participants
+    who are due are loaded.
+    
     Args:
         db: Database session
+        now: Current UTC time (defaults to the app clock)
+        participant_ids: Optional subset of participants to check
+        skip_messaged_in_window: Leave out participants already sent a message
+            since their current window opened (catch-up after a restart)
         
     Returns:
         List of participant model instances eligible for receiving messages now
     """
-    current_time = datetime.utcnow()
+    current_time = now or utcnow()
+    current_minute = current_time.hour * 60 + current_time.minute
+    
+    window_start = Participant.sms_window_start_utc
+    window_end = Participant.sms_window_end_utc
     
-    # Build a query to find participants who are active and have SMS window times set
     query = select(Participant).where(
         and_(
             Participant.active == True,
             Participant.sms_window_start.isnot(None),
             Participant.sms_window_end.isnot(None),
-            Participant.start_date.isnot(None)
+            Participant.start_date.isnot(None),
+            # Skip participants whose start date is in the future
+            Participant.start_date <= current_time.date(),
+            or_(
+                # Normal window, e.g., 09:00 to 17:00 UTC
+                and_(
+                    window_start <= window_end,
+                    window_start <= current_minute,
+                    window_end >= current_minute
+                ),
+                # Window wraps around midnight UTC, e.g., 23:00 to 01:00
+                and_(
+                    window_start > window_end,
+                    or_(window_start <= current_minute, window_end >= current_minute)
+                )
+            )
         )
     )
     
-    # Execute the query
-    result = await db.execute(query)
-    all_participants = result.scalars().all()
+    if participant_ids is not None:
+        query = query.where(
+            Participant.id == any_(bindparam("participant_ids", participant_ids, type_=ARRAY(Integer)))
+        )
     
-    # Filter participants based on their timezone-adjusted window time
-    eligible_participants = []
-    for participant in all_participants:
-        # Skip if participant's start date is in the future
-        if participant.start_date > current_time.date():
-            continue
-        
-        # Apply timezone offset to current time to get participant's local time
-        local_time = current_time
-        if participant.timezone_offset is not None:
-            local_time = current_time + timedelta(minutes=participant.timezone_offset)
-        
-        # Convert datetime to time for comparison
-        local_time_only = local_time.time()
-        
-        # Handle special case where window crosses midnight
-        if participant.sms_window_start > participant.sms_window_end:
-            # Window wraps around midnight, e.g., 23:00 to 01:00
-            if local_time_only >= participant.sms_window_start or local_time_only <= participant.sms_window_end:
-                eligible_participants.append(participant)
-        else:
-            # Normal window, e.g., 09:00 to 17:00
-            if participant.sms_window_start <= local_time_only <= participant.sms_window_end:
-                eligible_participants.append(participant)
+    if skip_messaged_in_window:
+        # The current occurrence of the window opened this many minutes ago
+        minutes_open = (current_minute - window_start + 1440) % 1440
+        window_opened_at = (
+            bindparam("window_minute", current_time.replace(second=0, microsecond=0), type_=DateTime(timezone=True))
+            - func.make_interval(0, 0, 0, 0, 0, minutes_open)
+        )
+        query = query.where(
+            ~exists().where(
+                Message.participant_id == Participant.id,
+                Message.sent_datetime >= window_opened_at
+            )
+        )
+    
+    result = await db.execute(query)
+    eligible_participants = result.scalars().all()
     
     logger.info(f"Found {len(eligible_participants)} participants eligible for messaging now")
     return eligible_participants
@@ -74,7 +106,7 @@ async def get_participants_for_messaging(db: AsyncSession) -> List[Participant]:
 async def select_message_for_participant(
     participant_id: int,
     db: AsyncSession
-) -> Optional[MessageContent]:
+) -> Optional[ContentRecord]:
     """
     Select a message for a participant, ensuring no repetition within a week
     and preferring messages that haven't been sent to this participant yet
@@ -84,73 +116,160 @@ async def select_message_for_participant(
         db: Database session
         
     Returns:
-        A MessageContent instance or None if no suitable message is found
+        A ContentRecord for the selected template or None if no suitable message is found
     """
     # Get participant to check study group/bucket
-    result = await db.execute(select(Participant).where(Participant.id == participant_id))
-    participant = result.scalars().first()
+    participant = await db.get(Participant, participant_id)
     
     if not participant:
         logger.warning(f"Participant ID {participant_id} not found")
         return None
     
-    # Get message content IDs sent to this participant in the last 7 days
-    one_week_ago = datetime.utcnow() - timedelta(days=7)
-    query = select(Message.content_id).where(
-        and_(
-            Message.participant_id == participant_id,
-            Message.sent_datetime >= one_week_ago,
-            Message.content_id.isnot(None)
-        )
-    )
-    result = await db.execute(query)
-    recent_content_ids = [row[0] for row in result.all()]
+    selections = await select_messages_for_participants([participant], db)
+    return selections.get(participant_id)
+
+
+async def select_messages_for_participants(
+    participants: List[Participant],
+    db: AsyncSession,
+    now: Optional[datetime] = None
+) -> Dict[int, ContentRecord]:
+    """
+    Select messages for a whole run of participants in a constant number of queries
     
-    # Get all message content IDs ever sent to this participant
-    query = select(Message.content_id).where(
-        and_(
-            Message.participant_id == participant_id,
-            Message.content_id.isnot(None)
-        )
+    Each participant walks a persisted rotation (a shuffled permutation of their
+    bucket's templates plus a cursor), so templates are never repeated within a
+    cycle, never-sent templates come first and nothing is repeated within
+    7 days when the bucket is large enough. Bucket content comes from the
+    template cache; message history is only read to bootstrap new rotations.
+    
+    Args:
+        participants: Participants eligible for this run
+        db: Database session (commits the locked rotations; templates are
+            consumed by record_sent_template after each send)
+        now: Current UTC time
+        
+    Returns:
+        Mapping of participant ID to the selected ContentRecord; participants
+        whose bucket has no active content are left out
+    """
+    if not participants:
+        return {}
+    
+    # Active content for every bucket used in this run, served from the template cache
+    messages_by_bucket = await content_cache.get_buckets(
+        {participant.study_group for participant in participants}, db
     )
-    result = await db.execute(query)
-    ever_sent_content_ids = [row[0] for row in result.all()]
+    active_ids_by_bucket = {
+        bucket: [record.id for record in records]
+        for bucket, records in messages_by_bucket.items()
+    }
+    records_by_id = {
+        record.id: record
+        for records in messages_by_bucket.values()
+        for record in records
+    }
     
-    # Get all active messages for this participant's study group
-    query = select(MessageContent).where(
-        and_(
-            MessageContent.bucket == participant.study_group,
-            MessageContent.active == True
-        )
+    content_ids = await select_from_rotations(participants, active_ids_by_bucket, db, now=now)
+    
+    selections: Dict[int, ContentRecord] = {}
+    for participant in participants:
+        content_id = content_ids.get(participant.id)
+        if content_id is None:
+            logger.warning(f"No active messages found for participant {participant.id} in group {participant.study_group}")
+            continue
+        selections[participant.id] = records_by_id[content_id]
+    
+    return selections
+
+
+async def dispatch_scheduled_messages(
+    db: AsyncSession,
+    concurrency: Optional[int] = None,
+    participant_ids: Optional[List[int]] = None,
+    now: Optional[datetime] = None,
+    skip_messaged_in_window: bool = False
+) -> ScheduledRunResult:
+    """
+    Send scheduled messages to all eligible participants with bounded fan-out
+    
+    Eligible participants are queued and drained by a fixed number of workers,
+    each holding its own database session, so one run scales with Twilio
+    throughput instead of the summed latency of every send. Templates are
+    rendered for each participant (e.g. %F) before sending, and the billed
+    SMS segments of the run are counted.
+    
+    Args:
+        db: Database session used to find eligible participants
+        concurrency: Maximum number of sends in flight (defaults to settings)
+        participant_ids: Optional subset of participants to consider (e.g. from the timing wheel)
+        now: Current UTC time used for the window check
+        skip_messaged_in_window: Leave out participants already messaged in their current window
+        
+    Returns:
+        ScheduledRunResult with sent/failed/skipped counts, segments and wall time
+    """
+    started = perf_counter()
+    concurrency = concurrency or settings.SMS_DISPATCH_CONCURRENCY
+    
+    participants = await get_participants_for_messaging(
+        db,
+        now=now,
+        participant_ids=participant_ids,
+        skip_messaged_in_window=skip_messaged_in_window
     )
-    result = await db.execute(query)
-    all_messages = result.scalars().all()
+    run_result = ScheduledRunResult(eligible=len(participants))
     
-    if not all_messages:
-        logger.warning(f"No active messages found for participant {participant_id} in group {participant.study_group}")
-        return None
+    selections = await select_messages_for_participants(participants, db, now=now)
     
-    # Create list of messages that haven't been sent in the last week
-    eligible_messages = [msg for msg in all_messages if msg.id not in recent_content_ids]
+    # Render every message up front; compiled templates are cached across runs
+    work = []
+    for participant in participants:
+        message_content = selections.get(participant.id)
+        if message_content:
+            rendered = compile_template(message_content.content).render(participant)
+            work.append((participant, message_content, rendered))
+        else:
+            logger.warning(f"No suitable message found for participant {participant.id} ({participant.pid})")
+            run_result.skipped += 1
     
-    if not eligible_messages:
-        logger.warning(f"All messages have been sent in the last week to participant {participant_id}")
-        # If we've sent all messages in the last week, reset and use all messages
-        eligible_messages = all_messages
+    send = get_sender()
     
-    # Prioritize messages that haven't been sent to this participant ever
-    never_sent_messages = [msg for msg in eligible_messages if msg.id not in ever_sent_content_ids]
+    async def send_to_participant(
+        item: Tuple[Participant, ContentRecord, RenderedMessage],
+        session: AsyncSession
+    ) -> None:
+        participant, message_content, rendered = item
+        
+        try:
+            message = await send(
+                participant=participant,
+                content=rendered.text,
+                bucket=message_content.bucket,
+                db=session,
+                content_id=message_content.id
+            )
+        except Exception:
+            run_result.failed += 1
+            raise
+        
+        if message.status == "failed":
+            run_result.failed += 1
+        else:
+            # Only consumed once sent, so a failed send offers the template again
+            await record_sent_template(participant.id, message_content.id, session, now=now)
+            run_result.sent += 1
+            run_result.segments += rendered.segments
     
-    if never_sent_messages:
-        # We have messages that haven't been sent to this participant yet
-        selected_message = random.choice(never_sent_messages)
-        logger.info(f"Selected new message ID {selected_message.id} for participant {participant_id}")
-    else:
-        # All messages have been sent before, pick randomly from eligible ones
-        selected_message = random.choice(eligible_messages)
-        logger.info(f"Selected repeat message ID {selected_message.id} for participant {participant_id}")
+    await run_worker_pool(work, send_to_participant, concurrency)
     
-    return selected_message
+    run_result.duration_seconds = round(perf_counter() - started, 3)
+    logger.info(
+        f"Scheduled run finished in {run_result.duration_seconds}s: "
+        f"{run_result.sent} sent ({run_result.segments} segments), {run_result.failed} failed, "
+        f"{run_result.skipped} skipped (concurrency {concurrency})"
+    )
+    return run_result
 
 
 async def send_scheduled_messages(db: AsyncSession) -> int:
@@ -163,33 +282,10 @@ async def send_scheduled_messages(db: AsyncSession) -> int:
     Returns:
         Number of messages sent
     """
-    message_count = 0
-    
     try:
-        # Get participants eligible for messages
-        participants = await get_participants_for_messaging(db)
-        
-        # For each participant, select and send a message
-        for participant in participants:
-            message_content = await select_message_for_participant(participant.id, db)
-            
-            if message_content:
-                # Send the message
-                await send_sms(
-                    participant=participant,
-                    content=message_content.content,
-                    bucket=message_content.bucket,
-                    db=db,
-                    content_id=message_content.id
-                )
-                message_count += 1
-            else:
-                # Log that no suitable message was found
-                logger.warning(f"No suitable message found for participant {participant.id} ({participant.pid})")
-                
-        logger.info(f"Sent {message_count} scheduled messages")
+        run_result = await dispatch_scheduled_messages(db)
     except Exception as e:
         logger.error(f"Error sending scheduled messages: {e}")
         raise
     
-    return message_count
\ No newline at end of file
+    return run_result.sent
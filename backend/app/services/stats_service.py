@@ -0,0 +1,254 @@
+"""
+Stats Service - Message statistics served from the daily rollup table
+"""
+import logging
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import Date, cast, delete, exists, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.clock import utcnow
+from app.models.message import Message, MessageDailyStat, MessageDailyStatDelta
+from app.models.participant import Participant
+
+logger = logging.getLogger(__name__)
+
+# Statuses counted in total_messages
+TOTAL_MESSAGE_STATUSES = ["delivered", "failed", "sent", "queued", "undelivered"]
+
+# Moves every pending delta into the rollup in one statement; rows are
+# upserted in key order so concurrent folds cannot deadlock
+FOLD_DELTAS_SQL = text(
+    """
+    WITH moved AS (
+        DELETE FROM messagedailystatdelta RETURNING day, status, bucket, delta
+    )
+    INSERT INTO messagedailystat (day, status, bucket, count, created_at, updated_at)
+    SELECT day, status, bucket, sum(delta), now(), now()
+    FROM moved
+    GROUP BY day, status, bucket
+    ORDER BY day, status, bucket
+    ON CONFLICT (day, status, bucket)
+    DO UPDATE SET count = messagedailystat.count + EXCLUDED.count, updated_at = now()
+    """
+)
+
+
+def _as_utc(value: Optional[datetime]) -> Optional[datetime]:
+    """
+    Treat naive datetimes as UTC, matching how message times are stored
+    """
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _midnight(day: date) -> datetime:
+    return datetime.combine(day, time.min, tzinfo=timezone.utc)
+
+
+async def _raw_counts(
+    db: AsyncSession,
+    lower: Optional[datetime],
+    upper: Optional[datetime],
+    upper_inclusive: bool
+) -> Dict[str, int]:
+    """
+    Count messages per status directly from the message table for a time slice
+    """
+    query = select(Message.status, func.count(Message.id)).group_by(Message.status)
+    if lower is not None:
+        query = query.where(Message.sent_datetime >= lower)
+    if upper is not None:
+        query = query.where(Message.sent_datetime <= upper if upper_inclusive else Message.sent_datetime < upper)
+
+    result = await db.execute(query)
+    return dict(result.all())
+
+
+async def _rollup_counts(
+    db: AsyncSession,
+    first_day: Optional[date],
+    end_day: Optional[date]
+) -> Dict[str, int]:
+    """
+    Sum rollup rows and not yet folded deltas per status for days in [first_day, end_day)
+    """
+    counts: Dict[str, int] = defaultdict(int)
+    for table, column in ((MessageDailyStat, MessageDailyStat.count), (MessageDailyStatDelta, MessageDailyStatDelta.delta)):
+        query = select(table.status, func.sum(column)).group_by(table.status)
+        if first_day is not None:
+            query = query.where(table.day >= first_day)
+        if end_day is not None:
+            query = query.where(table.day < end_day)
+
+        result = await db.execute(query)
+        for status, count in result.all():
+            counts[status] += int(count)
+    return dict(counts)
+
+
+async def fold_message_daily_stat_deltas(db: AsyncSession) -> int:
+    """
+    Fold pending count deltas into the rollup table
+
+    Deltas appended while the fold runs are left for the next one, and a
+    concurrent fold skips the rows this one deleted, so nothing is counted twice.
+
+    Args:
+        db: Database session (committed on return)
+
+    Returns:
+        Number of rollup rows updated
+    """
+    result = await db.execute(FOLD_DELTAS_SQL)
+    await db.commit()
+    return result.rowcount
+
+
+async def get_status_counts(
+    db: AsyncSession,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Count messages per status sent between start_date and end_date (inclusive)
+
+    Whole UTC days come from the rollup table. Only the partial days at either
+    end of the range are counted from the message table, so the cost does not
+    grow with the length of the range.
+
+    Args:
+        db: Database session
+        start_date: Optional lower bound on sent_datetime
+        end_date: Optional upper bound on sent_datetime (inclusive)
+
+    Returns:
+        Mapping of status to message count, leaving out statuses with no messages
+    """
+    start = _as_utc(start_date)
+    end = _as_utc(end_date)
+
+    # Days whose every instant falls inside the range: [first_day, end_day)
+    first_day = None
+    if start is not None:
+        first_day = start.date() if start == _midnight(start.date()) else start.date() + timedelta(days=1)
+    end_day = end.date() if end is not None else None
+
+    counts: Dict[str, int] = defaultdict(int)
+    slices: list = []
+
+    if first_day is not None and end_day is not None and first_day >= end_day:
+        # Less than one whole day in range
+        slices.append((start, end, True))
+    else:
+        for status, count in (await _rollup_counts(db, first_day, end_day)).items():
+            counts[status] += count
+        if start is not None and start < _midnight(first_day):
+            slices.append((start, _midnight(first_day), False))
+        if end is not None:
+            slices.append((_midnight(end_day), end, True))
+
+    for lower, upper, upper_inclusive in slices:
+        for status, count in (await _raw_counts(db, lower, upper, upper_inclusive)).items():
+            counts[status] += count
+
+    return {status: count for status, count in counts.items() if count}
+
+
+async def get_message_stats(
+    db: AsyncSession,
+    start_date: Optional[datetime] = None,
+    end_date: Optional[datetime] = None
+) -> Dict[str, int]:
+    """
+    Get message counts per status, distinct participants and total messages
+
+    Args:
+        db: Database session
+        start_date: Optional lower bound on sent_datetime
+        end_date: Optional upper bound on sent_datetime (inclusive)
+
+    Returns:
+        Stats dictionary in the shape returned by /sms/stats
+    """
+    stats = await get_status_counts(db, start_date, end_date)
+
+    # Probe each participant's (participant_id, sent_datetime) index instead of
+    # a COUNT(DISTINCT) over the whole message table
+    has_messages = exists().where(Message.participant_id == Participant.id)
+    if start_date:
+        has_messages = has_messages.where(Message.sent_datetime >= start_date)
+    if end_date:
+        has_messages = has_messages.where(Message.sent_datetime <= end_date)
+
+    result = await db.execute(select(func.count(Participant.id)).where(has_messages))
+    stats["distinct_participants"] = result.scalar()
+
+    stats["total_messages"] = sum(stats.get(status, 0) for status in TOTAL_MESSAGE_STATUSES)
+    return stats
+
+
+async def rebuild_message_daily_stats(db: AsyncSession) -> Dict[str, int]:
+    """
+    Reconcile the rollup table with the message table
+
+    Message writes are blocked (SHARE lock) while the rollups are recomputed
+    from scratch and pending deltas are discarded, so no trigger update can
+    be lost in between; reads continue.
+
+    Args:
+        db: Database session (committed on return)
+
+    Returns:
+        Number of rollup rows after the rebuild and how many rows were corrected
+    """
+    await db.execute(text("LOCK TABLE message IN SHARE MODE"))
+
+    previous = await db.execute(
+        select(MessageDailyStat.day, MessageDailyStat.status, MessageDailyStat.bucket, MessageDailyStat.count)
+    )
+    before: Dict[Tuple[date, str, str], int] = defaultdict(int)
+    for day, status, bucket, count in previous.all():
+        before[(day, status, bucket)] += count
+    pending = await db.execute(
+        select(MessageDailyStatDelta.day, MessageDailyStatDelta.status, MessageDailyStatDelta.bucket, MessageDailyStatDelta.delta)
+    )
+    for day, status, bucket, delta in pending.all():
+        before[(day, status, bucket)] += delta
+    before = {key: count for key, count in before.items() if count}
+
+    day = cast(func.timezone("UTC", Message.sent_datetime), Date)
+    recomputed = await db.execute(
+        select(day, Message.status, Message.bucket, func.count(Message.id))
+        .group_by(day, Message.status, Message.bucket)
+    )
+    after: Dict[Tuple[date, str, str], int] = {
+        (row_day, status, bucket): count for row_day, status, bucket, count in recomputed.all()
+    }
+
+    corrected = sum(1 for key in before.keys() | after.keys() if before.get(key) != after.get(key))
+
+    await db.execute(delete(MessageDailyStatDelta))
+    await db.execute(delete(MessageDailyStat))
+    if after:
+        now = utcnow()
+        await db.execute(
+            insert(MessageDailyStat),
+            [
+                {"day": row_day, "status": status, "bucket": bucket, "count": count, "created_at": now, "updated_at": now}
+                for (row_day, status, bucket), count in after.items()
+            ]
+        )
+    await db.commit()
+
+    if corrected:
+        logger.warning(f"Rebuilt message rollups: corrected {corrected} of {len(after)} rows")
+    else:
+        logger.info(f"Rebuilt message rollups: {len(after)} rows, no drift")
+
+    return {"rows": len(after), "corrected": corrected}
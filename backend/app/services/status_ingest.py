@@ -0,0 +1,332 @@
+"""
+Status Ingest - Buffered, batched ingestion of Twilio status callbacks
+"""
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import DateTime, Integer, String, Text, cast, column, func, select, update, values, any_, bindparam
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.core.clock import utcnow
+from app.core.config import settings
+from app.db import async_session_maker
+from app.models.message import Message
+from app.services.message_status import (
+    LOCAL_STATUSES,
+    STATUS_RANK,
+    apply_status_transition,
+    status_rank_sql,
+    status_transitions,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class StatusUpdate(NamedTuple):
+    """
+    A validated status callback waiting to be written
+    """
+    message_id: int
+    status: str
+    error: Optional[str]
+    received_at: datetime
+
+
+def parse_status_callback(message_id: int, status_data: Dict[str, Any]) -> Optional[StatusUpdate]:
+    """
+    Validate a Twilio status callback payload
+
+    Returns:
+        StatusUpdate, or None if the payload is not a usable status callback
+    """
+    message_status = status_data.get("MessageStatus")
+    if message_id <= 0 or message_status not in STATUS_RANK or message_status in LOCAL_STATUSES:
+        return None
+
+    error = None
+    if message_status in ["failed", "undelivered"]:
+        error = status_data.get("ErrorMessage", "Unknown error")
+
+    return StatusUpdate(message_id, message_status, error, utcnow())
+
+
+class StatusCallbackBuffer:
+    """
+    Bounded in-process queue of status callbacks drained by a batch flusher
+
+    The webhook only validates and enqueues, then returns. The flusher
+    collects up to `batch_size` callbacks (or whatever arrived within
+    `flush_interval`), coalesces them to the highest-ranked status per message
+    and writes them in a single UPDATE ... FROM (VALUES ...) statement that
+    respects the status lattice. When the queue is
+    full, offer() waits up to `enqueue_timeout` and then refuses, so callers
+    can fall back to a direct write instead of growing memory without bound.
+    Twilio has already been answered 200 for buffered callbacks and will not
+    retry them, so a failed batch write is retried with backoff and finally
+    applied message by message before anything is given up.
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        batch_size: int,
+        flush_interval: float,
+        enqueue_timeout: float,
+        flush_retries: int = 3,
+        retry_backoff: float = 0.5
+    ):
+        self.max_size = max_size
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self.flush_retries = flush_retries
+        self.retry_backoff = retry_backoff
+        self._queue: Optional[asyncio.Queue] = None
+        self.received = 0
+        self.refused = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.discarded = 0
+        self.unmatched = 0
+        self.batches = 0
+        self.retries = 0
+        self.fallbacks = 0
+        self.lost = 0
+
+    @property
+    def running(self) -> bool:
+        return self._queue is not None
+
+    async def offer(self, status_update: StatusUpdate) -> bool:
+        """
+        Enqueue a callback, applying backpressure when the buffer is full
+
+        Returns:
+            True if buffered, False if the caller should write it directly
+        """
+        if self._queue is None:
+            return False
+
+        try:
+            self._queue.put_nowait(status_update)
+        except asyncio.QueueFull:
+            try:
+                await asyncio.wait_for(self._queue.put(status_update), timeout=self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.refused += 1
+                return False
+
+        self.received += 1
+        return True
+
+    def coalesce(self, batch: List[StatusUpdate]) -> List[StatusUpdate]:
+        """
+        Reduce a batch to one update per message, keeping the highest-ranked status
+
+        Among callbacks of equal rank the first one wins, matching the lattice
+        in the database, which never moves between statuses of the same rank.
+        """
+        best: Dict[int, StatusUpdate] = {}
+        for status_update in batch:
+            current = best.get(status_update.message_id)
+            if current is None or STATUS_RANK[status_update.status] > STATUS_RANK[current.status]:
+                best[status_update.message_id] = status_update
+
+        self.coalesced += len(batch) - len(best)
+        status_transitions.record_discarded(len(batch) - len(best))
+        return list(best.values())
+
+    async def apply(self, updates: List[StatusUpdate]) -> Tuple[int, int]:
+        """
+        Write coalesced updates in one bulk UPDATE ... FROM (VALUES ...) statement
+
+        Rows only match when the new status ranks strictly higher than the
+        stored one, so stale callbacks in the batch cost nothing.
+
+        Returns:
+            Tuple of (messages updated, updates discarded by the lattice);
+            the remainder referenced unknown messages
+        """
+        rows = [
+            (
+                u.message_id,
+                u.status,
+                STATUS_RANK[u.status],
+                u.error,
+                u.received_at if u.status == "delivered" else None,
+            )
+            for u in updates
+        ]
+        v = values(
+            column("id", Integer),
+            column("status", String),
+            column("rank", Integer),
+            column("error", Text),
+            column("delivered_at", DateTime(timezone=True)),
+            name="v",
+        ).data(rows)
+
+        stmt = (
+            update(Message)
+            .where(Message.id == v.c.id, status_rank_sql() < v.c.rank)
+            .values(
+                status=v.c.status,
+                error=func.coalesce(cast(v.c.error, Text), Message.error),
+                delivered_datetime=func.coalesce(
+                    cast(v.c.delivered_at, DateTime(timezone=True)), Message.delivered_datetime
+                ),
+            )
+            .returning(Message.id, Message.status)
+            .execution_options(synchronize_session=False)
+        )
+
+        async with async_session_maker() as session:
+            result = await session.execute(stmt)
+            applied = result.all()
+
+            # Tell discarded transitions from unknown messages for the rest
+            applied_ids = {row.id for row in applied}
+            leftover = [u.message_id for u in updates if u.message_id not in applied_ids]
+            discarded = 0
+            if leftover:
+                discarded = len((await session.execute(
+                    select(Message.id).where(
+                        Message.id == any_(bindparam("message_ids", leftover, type_=ARRAY(Integer)))
+                    )
+                )).all())
+
+            await session.commit()
+
+        for row in applied:
+            status_transitions.record_accepted(row.status)
+        status_transitions.record_discarded(discarded)
+
+        return len(applied), discarded
+
+    async def apply_each(self, updates: List[StatusUpdate]) -> Tuple[int, int, int]:
+        """
+        Write updates one message at a time, each in its own session
+
+        Used when the bulk write keeps failing, so one bad row or a poisoned
+        batch cannot lose every status in it.
+
+        Returns:
+            Tuple of (messages updated, updates discarded by the lattice,
+            updates that could not be written)
+        """
+        updated = 0
+        discarded = 0
+        lost = 0
+        for u in updates:
+            try:
+                async with async_session_maker() as session:
+                    message, applied = await apply_status_transition(
+                        u.message_id,
+                        u.status,
+                        session,
+                        error=u.error,
+                        delivered_at=u.received_at if u.status == "delivered" else None
+                    )
+            except Exception as e:
+                lost += 1
+                logger.error(f"Lost status {u.status} for message {u.message_id}: {e}")
+                continue
+
+            if applied:
+                updated += 1
+            elif message is not None:
+                discarded += 1
+        return updated, discarded, lost
+
+    async def _flush(self, batch: List[StatusUpdate]) -> None:
+        # Sorted so concurrent writers touch message rows in the same order
+        updates = sorted(self.coalesce(batch), key=lambda u: u.message_id)
+        lost = 0
+
+        for attempt in range(self.flush_retries + 1):
+            try:
+                updated, discarded = await self.apply(updates)
+                break
+            except Exception as e:
+                if attempt == self.flush_retries:
+                    logger.error(
+                        f"Failed to apply {len(updates)} buffered status updates after "
+                        f"{attempt + 1} attempts, applying them one by one: {e}"
+                    )
+                    self.fallbacks += 1
+                    updated, discarded, lost = await self.apply_each(updates)
+                    break
+
+                self.retries += 1
+                backoff = self.retry_backoff * (2 ** attempt)
+                logger.warning(f"Retrying {len(updates)} buffered status updates in {backoff:.1f}s: {e}")
+                await asyncio.sleep(backoff)
+
+        unmatched = len(updates) - updated - discarded - lost
+        self.batches += 1
+        self.lost += lost
+        self.applied += updated
+        self.discarded += discarded
+        self.unmatched += unmatched
+        if unmatched:
+            logger.warning(f"{unmatched} status callbacks referenced unknown messages")
+
+    async def run(self, stop_event: asyncio.Event) -> None:
+        """
+        Drain the buffer in batches until stopped, then flush what is left
+        """
+        self._queue = asyncio.Queue(maxsize=self.max_size)
+        queue = self._queue
+        logger.info("Status callback buffer started")
+
+        while not stop_event.is_set() or not queue.empty():
+            batch: List[StatusUpdate] = []
+            try:
+                batch.append(await asyncio.wait_for(queue.get(), timeout=self.flush_interval))
+            except asyncio.TimeoutError:
+                continue
+
+            # Give the batch a short window to fill up
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - asyncio.get_running_loop().time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+
+            await self._flush(batch)
+
+        self._queue = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "max_size": self.max_size,
+            "received": self.received,
+            "refused": self.refused,
+            "coalesced": self.coalesced,
+            "applied": self.applied,
+            "discarded": self.discarded,
+            "unmatched": self.unmatched,
+            "batches": self.batches,
+            "retries": self.retries,
+            "fallbacks": self.fallbacks,
+            "lost": self.lost,
+        }
+
+
+# Process-wide buffer, started with the application when enabled
+status_callback_buffer = StatusCallbackBuffer(
+    max_size=settings.SMS_CALLBACK_BUFFER_SIZE,
+    batch_size=settings.SMS_CALLBACK_BATCH_SIZE,
+    flush_interval=settings.SMS_CALLBACK_FLUSH_SECONDS,
+    enqueue_timeout=settings.SMS_CALLBACK_ENQUEUE_TIMEOUT,
+    flush_retries=settings.SMS_CALLBACK_FLUSH_RETRIES,
+    retry_backoff=settings.SMS_CALLBACK_RETRY_BACKOFF_SECONDS,
+)
@@ -0,0 +1,175 @@
+"""
+SMS Timing Wheel - In-memory minute buckets of participants whose SMS window opens
+"""
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+from sqlalchemy import select, and_, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.clock import utcnow
+from app.models.participant import Participant
+
+logger = logging.getLogger(__name__)
+
+MINUTES_PER_DAY = 24 * 60
+
+# Participant changes are re-read for this long after the newest change seen,
+# since a transaction can commit after another one with a later updated_at
+CHANGE_OVERLAP = timedelta(minutes=2)
+
+
+class SmsTimingWheel:
+    """
+    Timing wheel with one slot per UTC minute of the day
+
+    Each active participant with an SMS window sits in the slot of the UTC
+    minute their window opens. Advancing the wheel returns only the
+    participants whose slot has arrived since the last advance, so a tick
+    costs O(due participants) instead of a roster scan.
+    """
+
+    def __init__(self):
+        self._slots: List[Set[int]] = [set() for _ in range(MINUTES_PER_DAY)]
+        self._slot_by_participant: Dict[int, int] = {}
+        self._cursor: Optional[datetime] = None
+        self._changed_through: Optional[datetime] = None
+        self._changes_seen: Dict[int, datetime] = {}
+        self.loaded_at: Optional[datetime] = None
+
+    @staticmethod
+    def slot_for(participant: Participant) -> Optional[int]:
+        """
+        Get the wheel slot for a participant, or None if they should not be scheduled
+        """
+        if not participant.active or participant.sms_window_start is None or participant.sms_window_end is None:
+            return None
+
+        # Same normalization as the sms_window_start_utc column; computed here
+        # because objects updated through bulk UPDATEs may hold a stale value
+        start = participant.sms_window_start
+        return (start.hour * 60 + start.minute - (participant.timezone_offset or 0)) % MINUTES_PER_DAY
+
+    def upsert(self, participant: Participant) -> None:
+        """
+        Add a participant to the wheel or move them to their current slot
+        """
+        self.remove(participant.id)
+        slot = self.slot_for(participant)
+        if slot is None:
+            return
+        self._slots[slot].add(participant.id)
+        self._slot_by_participant[participant.id] = slot
+
+    def remove(self, participant_id: int) -> None:
+        """
+        Remove a participant from the wheel if present
+        """
+        slot = self._slot_by_participant.pop(participant_id, None)
+        if slot is not None:
+            self._slots[slot].discard(participant_id)
+
+    async def load(self, db: AsyncSession) -> None:
+        """
+        Rebuild the wheel from every active participant with an SMS window
+        """
+        # Read before the roster so changes committed meanwhile are applied later
+        changed_through = (await db.execute(select(func.max(Participant.updated_at)))).scalar()
+
+        result = await db.execute(
+            select(Participant).where(
+                and_(
+                    Participant.active == True,
+                    Participant.sms_window_start_utc.isnot(None),
+                    Participant.sms_window_end_utc.isnot(None)
+                )
+            )
+        )
+
+        self._slots = [set() for _ in range(MINUTES_PER_DAY)]
+        self._slot_by_participant = {}
+        for participant in result.scalars().all():
+            self.upsert(participant)
+
+        self._changed_through = changed_through
+        self._changes_seen = {}
+        self.loaded_at = utcnow()
+        logger.info(f"Loaded {len(self._slot_by_participant)} participants into the SMS timing wheel")
+
+    async def apply_changes(self, db: AsyncSession) -> List[int]:
+        """
+        Move participants changed by any process since the last check to their current slot
+
+        Changes are found by updated_at, so participants created or edited
+        through another worker reach this wheel within a tick. Deleted
+        participants stay until the next load; dispatching them finds nothing.
+
+        Returns:
+            IDs of participants that changed
+        """
+        query = select(Participant)
+        if self._changed_through is not None:
+            query = query.where(Participant.updated_at > self._changed_through - CHANGE_OVERLAP)
+        result = await db.execute(query)
+
+        changed = []
+        for participant in result.scalars().all():
+            if self._changes_seen.get(participant.id) == participant.updated_at:
+                continue
+            self._changes_seen[participant.id] = participant.updated_at
+            self.upsert(participant)
+            changed.append(participant.id)
+            if self._changed_through is None or participant.updated_at > self._changed_through:
+                self._changed_through = participant.updated_at
+
+        # Changes older than the overlap are never read again
+        if self._changed_through is not None:
+            horizon = self._changed_through - CHANGE_OVERLAP
+            self._changes_seen = {pid: at for pid, at in self._changes_seen.items() if at > horizon}
+        return sorted(changed)
+
+    def advance(self, now: datetime) -> List[int]:
+        """
+        Move the wheel to the given UTC time and collect participants that became due
+
+        Every minute between the previous advance (exclusive) and now (inclusive)
+        is visited once, so ticks that arrive late do not skip slots. A gap of
+        more than a day visits each slot once.
+
+        Args:
+            now: Current UTC time
+
+        Returns:
+            IDs of participants whose window opened since the last advance
+        """
+        minute = now.replace(second=0, microsecond=0)
+        if self._cursor is None:
+            self._cursor = minute - timedelta(minutes=1)
+
+        steps = int((minute - self._cursor).total_seconds() // 60)
+        steps = min(steps, MINUTES_PER_DAY)
+
+        due: Set[int] = set()
+        for step in range(steps - 1, -1, -1):
+            slot_time = minute - timedelta(minutes=step)
+            due.update(self._slots[slot_time.hour * 60 + slot_time.minute])
+
+        if steps > 0:
+            self._cursor = minute
+        return sorted(due)
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Get a summary of the wheel contents
+        """
+        return {
+            "participants": len(self._slot_by_participant),
+            "occupied_slots": sum(1 for slot in self._slots if slot),
+            "cursor": self._cursor.isoformat() if self._cursor else None,
+            "loaded_at": self.loaded_at.isoformat() if self.loaded_at else None
+        }
+
+
+# Process-wide wheel, read by the elected scheduler leader
+sms_timing_wheel = SmsTimingWheel()
@@ -1,22 +1,487 @@
 """
 Twilio Service - Handles SMS message sending and delivery status updates
 """
+import asyncio
+import hashlib
 import logging
-from datetime import datetime
-from typing import Optional, Dict, Any
+import random
+import time
+from abc import ABC, abstractmethod
+from itertools import count
+from typing import Optional, Dict, Any, List, Awaitable, Callable
 
+import httpx
+from sqlalchemy import update
 from sqlalchemy.ext.asyncio import AsyncSession
-from twilio.rest import Client
 from twilio.base.exceptions import TwilioRestException
 
+from app.core.clock import utcnow
 from app.core.config import settings
-from app.models.message import Message
+from app.models.message import Message, SmsOutbox
 from app.models.participant import Participant
+from app.services.message_status import LOCAL_STATUSES, advanced_status, apply_status_transition
 
 logger = logging.getLogger(__name__)
 
-# Initialize Twilio client
-client = Client(settings.TWILIO_ACCOUNT_SID, settings.TWILIO_AUTH_TOKEN)
+# Twilio REST API constants
+TWILIO_API_BASE_URL = "https://api.twilio.com/2010-04-01"
+
+# Transport errors raised after the request may have reached Twilio
+AMBIGUOUS_TRANSPORT_ERRORS = (httpx.ReadTimeout, httpx.WriteTimeout, httpx.ReadError, httpx.RemoteProtocolError)
+
+
+class TwilioOutcomeUnknown(Exception):
+    """
+    Raised when a send may or may not have been accepted by Twilio
+
+    The message must not be marked failed, since resending it could deliver
+    the SMS twice; its status callback settles the outcome if Twilio accepted it.
+    """
+
+
+class TwilioTransport(ABC):
+    """
+    Interface for delivering a single SMS through the Twilio Messages API
+    """
+    
+    @abstractmethod
+    async def create_message(
+        self,
+        to: str,
+        body: str,
+        from_: Optional[str] = None,
+        status_callback: Optional[str] = None,
+        messaging_service_sid: Optional[str] = None
+    ) -> str:
+        """
+        Create an outbound message and return its Twilio SID
+        
+        The message is sent from `from_`, or through the Messaging Service
+        when `messaging_service_sid` is given.
+        
+        Raises:
+            TwilioRestException: If Twilio rejects the message
+            TwilioOutcomeUnknown: If the outcome of the request is not known
+        """
+    
+    async def aclose(self) -> None:
+        """Release any resources held by the transport"""
+        return None
+
+
+class HttpxTwilioTransport(TwilioTransport):
+    """
+    Non-blocking Twilio transport that reuses one pooled keep-alive connection set
+    """
+    
+    def __init__(
+        self,
+        account_sid: str,
+        auth_token: str,
+        max_connections: int = 20,
+        timeout: float = 15.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None
+    ):
+        self.account_sid = account_sid
+        self.auth_token = auth_token
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    def _get_client(self) -> httpx.AsyncClient:
+        # Created lazily so the client binds to the running event loop
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                base_url=TWILIO_API_BASE_URL,
+                auth=(self.account_sid, self.auth_token),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=5.0),
+                transport=self._transport
+            )
+        return self._client
+    
+    async def create_message(
+        self,
+        to: str,
+        body: str,
+        from_: Optional[str] = None,
+        status_callback: Optional[str] = None,
+        messaging_service_sid: Optional[str] = None
+    ) -> str:
+        uri = f"/Accounts/{self.account_sid}/Messages.json"
+        data = {"To": to, "Body": body}
+        if messaging_service_sid:
+            data["MessagingServiceSid"] = messaging_service_sid
+        else:
+            data["From"] = from_
+        if status_callback:
+            data["StatusCallback"] = status_callback
+        
+        try:
+            response = await self._get_client().post(uri, data=data)
+        except AMBIGUOUS_TRANSPORT_ERRORS as e:
+            raise TwilioOutcomeUnknown(f"No response from Twilio: {e!r}") from e
+        except httpx.HTTPError as e:
+            # Surface network failures the same way as API errors so callers
+            # record the message as failed instead of leaving it in "sending"
+            raise TwilioRestException(status=0, uri=uri, msg=f"Transport error: {e}", method="POST") from e
+        
+        if response.status_code >= 400:
+            try:
+                payload = response.json()
+            except ValueError:
+                payload = {}
+            raise TwilioRestException(
+                status=response.status_code,
+                uri=uri,
+                msg=payload.get("message", response.text),
+                code=payload.get("code"),
+                method="POST",
+                details=payload.get("more_info")
+            )
+        
+        return response.json()["sid"]
+    
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+class FakeTwilioTransport(TwilioTransport):
+    """
+    In-memory transport for tests; records every message instead of sending it
+    """
+    
+    def __init__(self, failing_numbers: Optional[List[str]] = None, timeout_numbers: Optional[List[str]] = None):
+        self.failing_numbers = set(failing_numbers or [])
+        self.timeout_numbers = set(timeout_numbers or [])
+        self.sent: List[Dict[str, Any]] = []
+        self._sid_counter = count(1)
+    
+    async def create_message(
+        self,
+        to: str,
+        body: str,
+        from_: Optional[str] = None,
+        status_callback: Optional[str] = None,
+        messaging_service_sid: Optional[str] = None
+    ) -> str:
+        if to in self.failing_numbers:
+            raise TwilioRestException(
+                status=400,
+                uri="/Messages.json",
+                msg=f"The 'To' number {to} is not a valid phone number.",
+                code=21211,
+                method="POST"
+            )
+        if to in self.timeout_numbers:
+            raise TwilioOutcomeUnknown(f"No response from Twilio for {to}")
+        
+        sid = f"SM{next(self._sid_counter):032d}"
+        self.sent.append({
+            "sid": sid,
+            "to": to,
+            "from": from_,
+            "messaging_service_sid": messaging_service_sid,
+            "body": body,
+            "status_callback": status_callback
+        })
+        return sid
+
+
+class TokenBucket:
+    """
+    Adaptive token bucket limiting the send rate of one sender
+    
+    The rate is halved whenever Twilio throttles us and recovers additively on
+    every successful send, up to the configured maximum. The clock and sleep
+    can be replaced, e.g. by a fake clock in tests.
+    """
+    
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        min_rate: float = 0.1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ):
+        self.clock = clock
+        self.sleep = sleep
+        self.max_rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = clock()
+        self.throttled_wait_seconds = 0.0
+        self.throttle_events = 0
+        self._lock = asyncio.Lock()
+    
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+    
+    async def acquire(self) -> None:
+        """Wait until a token is available and take it; waiters are served in order"""
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                wait = (1 - self.tokens) / self.rate
+                self.throttled_wait_seconds += wait
+                await self.sleep(wait)
+                self._refill()
+            self.tokens -= 1
+    
+    def on_success(self) -> None:
+        self.rate = min(self.max_rate, self.rate + self.max_rate * 0.05)
+    
+    def on_throttled(self) -> None:
+        self._refill()
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0
+        self.throttle_events += 1
+    
+    def stats(self) -> Dict[str, float]:
+        self._refill()
+        return {
+            "rate_per_second": round(self.rate, 3),
+            "max_rate_per_second": self.max_rate,
+            "tokens": round(self.tokens, 3),
+            "fill_level": round(self.tokens / self.capacity, 3),
+            "throttle_events": self.throttle_events,
+            "throttled_wait_seconds": round(self.throttled_wait_seconds, 3)
+        }
+
+
+class SenderRateLimiter:
+    """
+    Per-sender token buckets with retry and backoff on Twilio throttling errors
+    """
+    
+    # HTTP 429, 20429 Too Many Requests, 14107 SMS send rate limit exceeded
+    THROTTLE_ERROR_CODES = {20429, 14107}
+    
+    def __init__(
+        self,
+        rate: float,
+        capacity: float,
+        max_retries: int,
+        backoff_seconds: float,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep
+    ):
+        self.rate = rate
+        self.capacity = capacity
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.clock = clock
+        self.sleep = sleep
+        self._buckets: Dict[str, TokenBucket] = {}
+    
+    def bucket_for(self, sender: str) -> TokenBucket:
+        if sender not in self._buckets:
+            self._buckets[sender] = TokenBucket(self.rate, self.capacity, clock=self.clock, sleep=self.sleep)
+        return self._buckets[sender]
+    
+    def is_throttled(self, error: TwilioRestException) -> bool:
+        return error.status == 429 or error.code in self.THROTTLE_ERROR_CODES
+    
+    async def send(self, sender: str, send: Callable[[], Awaitable[str]]) -> str:
+        """
+        Run a send under the sender's rate limit, backing off and retrying when throttled
+        
+        Raises:
+            TwilioRestException: If the send fails for another reason or keeps
+                being throttled after max_retries retries
+        """
+        bucket = self.bucket_for(sender)
+        
+        for attempt in range(self.max_retries + 1):
+            await bucket.acquire()
+            try:
+                result = await send()
+            except TwilioRestException as e:
+                if not self.is_throttled(e) or attempt == self.max_retries:
+                    raise
+                
+                bucket.on_throttled()
+                backoff = self.backoff_seconds * (2 ** attempt) * random.uniform(0.5, 1.5)
+                bucket.throttled_wait_seconds += backoff
+                logger.warning(f"Twilio throttled sender {sender}, retrying in {backoff:.2f}s")
+                await self.sleep(backoff)
+                continue
+            
+            bucket.on_success()
+            return result
+    
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        return {sender: bucket.stats() for sender, bucket in self._buckets.items()}
+
+
+# Process-wide rate limiter shared by all sends
+rate_limiter = SenderRateLimiter(
+    rate=settings.TWILIO_SEND_RATE_PER_SECOND,
+    capacity=settings.TWILIO_SEND_BURST,
+    max_retries=settings.TWILIO_THROTTLE_MAX_RETRIES,
+    backoff_seconds=settings.TWILIO_THROTTLE_BACKOFF_SECONDS
+)
+
+
+class SenderPool:
+    """
+    Pool of Twilio sender numbers with sticky, balanced participant assignment
+    
+    Each participant is mapped to one number by rendezvous hashing, so their
+    conversation thread stays on the same number, participants spread evenly
+    across the pool, and changing the pool only moves the participants of the
+    added or removed numbers. When a Messaging Service SID is configured, all
+    sends go through the service, which applies its own sticky sender.
+    """
+    
+    def __init__(self, numbers: List[str], messaging_service_sid: str = ""):
+        self.numbers = numbers
+        self.messaging_service_sid = messaging_service_sid
+        self.sent: Dict[str, int] = {}
+        self.failed: Dict[str, int] = {}
+    
+    @classmethod
+    def from_settings(cls) -> "SenderPool":
+        numbers = [n.strip() for n in settings.TWILIO_PHONE_NUMBERS.split(",") if n.strip()]
+        if not numbers and settings.TWILIO_PHONE_NUMBER:
+            numbers = [settings.TWILIO_PHONE_NUMBER]
+        if not numbers and not settings.TWILIO_MESSAGING_SERVICE_SID:
+            logger.warning("No Twilio sender configured; every SMS send will fail")
+        return cls(numbers, settings.TWILIO_MESSAGING_SERVICE_SID)
+    
+    def sender_for(self, participant_id: int) -> str:
+        """
+        Get the sender (phone number or Messaging Service SID) for a participant
+        
+        Raises:
+            TwilioRestException: If no sender is configured, so the send is
+                recorded as failed like any other rejected message
+        """
+        if self.messaging_service_sid:
+            return self.messaging_service_sid
+        if not self.numbers:
+            raise TwilioRestException(
+                status=400,
+                uri="/Messages.json",
+                msg="No Twilio sender configured: set TWILIO_PHONE_NUMBERS, TWILIO_PHONE_NUMBER or TWILIO_MESSAGING_SERVICE_SID",
+                method="POST"
+            )
+        if len(self.numbers) == 1:
+            return self.numbers[0]
+        return max(
+            self.numbers,
+            key=lambda number: hashlib.sha1(f"{number}:{participant_id}".encode()).digest()
+        )
+    
+    def record(self, sender: str, success: bool) -> None:
+        counts = self.sent if success else self.failed
+        counts[sender] = counts.get(sender, 0) + 1
+    
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        senders = [self.messaging_service_sid] if self.messaging_service_sid else self.numbers
+        throttle_stats = rate_limiter.stats()
+        return {
+            sender: {
+                "sent": self.sent.get(sender, 0),
+                "failed": self.failed.get(sender, 0),
+                **throttle_stats.get(sender, {})
+            }
+            for sender in senders
+        }
+
+
+# Process-wide sender pool
+sender_pool = SenderPool.from_settings()
+
+
+_transport: Optional[TwilioTransport] = None
+
+
+def get_transport() -> TwilioTransport:
+    """
+    Get the process-wide Twilio transport, creating the pooled client on first use
+    """
+    global _transport
+    if _transport is None:
+        _transport = HttpxTwilioTransport(
+            settings.TWILIO_ACCOUNT_SID,
+            settings.TWILIO_AUTH_TOKEN,
+            max_connections=settings.TWILIO_HTTP_MAX_CONNECTIONS,
+            timeout=settings.TWILIO_HTTP_TIMEOUT
+        )
+    return _transport
+
+
+def set_transport(transport: Optional[TwilioTransport]) -> None:
+    """
+    Replace the process-wide Twilio transport (e.g. with FakeTwilioTransport in tests)
+    """
+    global _transport
+    _transport = transport
+
+
+async def close_transport() -> None:
+    """
+    Close pooled connections held by the current transport
+    """
+    if _transport is not None:
+        await _transport.aclose()
+
+
+def get_status_callback_url(message_id: int) -> str:
+    """
+    Get the status callback URL Twilio should post delivery updates to
+    """
+    return f"{settings.EXTERNAL_BASE_URL}/api/sms/status-callback/{message_id}"
+
+
+async def deliver_message(message: Message, to_number: str) -> str:
+    """
+    Hand an existing Message record to Twilio from the participant's pooled sender,
+    within that sender's rate limit
+    
+    Args:
+        message: Persisted Message model instance
+        to_number: Destination phone number
+        
+    Returns:
+        The Twilio message SID
+        
+    Raises:
+        TwilioRestException: If Twilio rejects the message
+        TwilioOutcomeUnknown: If it is not known whether Twilio accepted the message
+    """
+    sender = sender_pool.sender_for(message.participant_id)
+    use_service = sender == sender_pool.messaging_service_sid
+    
+    try:
+        twilio_sid = await rate_limiter.send(
+            sender,
+            lambda: get_transport().create_message(
+                to=to_number,
+                body=message.content,
+                from_=None if use_service else sender,
+                status_callback=get_status_callback_url(message.id),
+                messaging_service_sid=sender if use_service else None
+            )
+        )
+    except TwilioRestException:
+        sender_pool.record(sender, success=False)
+        raise
+    
+    sender_pool.record(sender, success=True)
+    return twilio_sid
 
 
 async def send_sms(
@@ -24,7 +489,8 @@ async def send_sms(
     content: str,
     bucket: str,
     db: AsyncSession,
-    content_id: Optional[int] = None
+    content_id: Optional[int] = None,
+    resend_of_id: Optional[int] = None
 ) -> Message:
     """
     Send SMS message to a participant and create a Message record
@@ -35,6 +501,7 @@ async def send_sms(
         bucket: Message bucket/category
         db: Database session
         content_id: Optional ID of the MessageContent record
+        resend_of_id: Optional ID of the failed message this one resends
         
     Returns:
         Message model instance with the message details
@@ -49,35 +516,40 @@ async def send_sms(
             content=content,
             bucket=bucket,
             status="sending",
-            sent_datetime=datetime.utcnow(),
-            content_id=content_id
+            sent_datetime=utcnow(),
+            content_id=content_id,
+            resend_of_id=resend_of_id
         )
         db.add(message)
         await db.commit()
         await db.refresh(message)
         
         # Actually send the message via Twilio
-        twilio_message = client.messages.create(
-            body=content,
-            from_=settings.TWILIO_PHONE_NUMBER,
-            to=participant.phone_number,
-            status_callback=f"{settings.EXTERNAL_BASE_URL}/api/sms/status-callback/{message.id}"
-        )
+        twilio_sid = await deliver_message(message, participant.phone_number)
         
-        # Update message with Twilio SID
-        message.twilio_sid = twilio_message.sid
-        message.status = "sent"
+        # Record the Twilio SID; the status only moves forward, since a
+        # status callback may already have reported a later state
+        await db.execute(
+            update(Message)
+            .where(Message.id == message.id)
+            .values(twilio_sid=twilio_sid, status=advanced_status("sent"))
+            .execution_options(synchronize_session=False)
+        )
         await db.commit()
         await db.refresh(message)
         
-        logger.info(f"SMS sent to {participant.pid}, SID: {twilio_message.sid}")
+        logger.info(f"SMS sent to {participant.pid}, SID: {twilio_sid}")
         return message
         
     except TwilioRestException as e:
         if message and hasattr(message, 'id'):
             # Update existing message with error
-            message.status = "failed"
-            message.error = str(e)
+            await db.execute(
+                update(Message)
+                .where(Message.id == message.id)
+                .values(status=advanced_status("failed"), error=str(e))
+                .execution_options(synchronize_session=False)
+            )
             await db.commit()
             await db.refresh(message)
             logger.error(f"Twilio error when sending to {participant.pid}: {e}")
@@ -86,6 +558,68 @@ async def send_sms(
             # Handle case where message record wasn't created
             logger.error(f"Twilio error before message record creation: {e}")
             raise
+    
+    except TwilioOutcomeUnknown as e:
+        # Not failed: Twilio may have accepted it, and a resend would duplicate the SMS
+        await db.execute(
+            update(Message)
+            .where(Message.id == message.id)
+            .values(status=advanced_status("unknown"), error=str(e))
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+        await db.refresh(message)
+        logger.warning(f"Outcome of SMS to {participant.pid} unknown: {e}")
+        return message
+
+
+async def enqueue_sms(
+    participant: Participant,
+    content: str,
+    bucket: str,
+    db: AsyncSession,
+    content_id: Optional[int] = None,
+    resend_of_id: Optional[int] = None
+) -> Message:
+    """
+    Create a queued Message record and its outbox entry in one transaction
+    
+    The message is delivered later by an outbox worker, so this returns as soon
+    as the transaction commits. Takes the same arguments as send_sms.
+    
+    Returns:
+        Message model instance with status "queued"
+    """
+    message = Message(
+        participant_id=participant.id,
+        content=content,
+        bucket=bucket,
+        status="queued",
+        sent_datetime=utcnow(),
+        content_id=content_id,
+        resend_of_id=resend_of_id
+    )
+    db.add(message)
+    await db.flush()
+    
+    db.add(SmsOutbox(
+        message_id=message.id,
+        to_number=participant.phone_number,
+        status="pending",
+        available_at=utcnow()
+    ))
+    await db.commit()
+    await db.refresh(message)
+    
+    logger.info(f"SMS queued for {participant.pid}, message ID: {message.id}")
+    return message
+
+
+def get_sender():
+    """
+    Get the function used to send an SMS: enqueue_sms when the outbox is enabled, else send_sms
+    """
+    return enqueue_sms if settings.SMS_OUTBOX_ENABLED else send_sms
 
 
 async def update_message_status(
@@ -96,35 +630,38 @@ async def update_message_status(
     """
     Update message status based on Twilio callback
     
+    Statuses only move forward through the delivery lattice, so late or
+    duplicate callbacks leave the message unchanged.
+    
     Args:
         message_id: ID of the message to update
         status_data: Status data from Twilio callback
         db: Database session
         
     Returns:
-        Updated Message model instance or None if not found
+        Message model instance (updated or unchanged) or None if not found
     """
-    # Get the message from database
-    message = await db.get(Message, message_id)
+    new_status = status_data.get("MessageStatus", "")
+    if new_status in LOCAL_STATUSES:
+        new_status = ""
+    
+    error = None
+    if new_status in ["failed", "undelivered"]:
+        error = status_data.get("ErrorMessage", "Unknown error")
+    
+    message, applied = await apply_status_transition(
+        message_id,
+        new_status,
+        db,
+        error=error,
+        delivered_at=utcnow() if new_status == "delivered" else None
+    )
     if not message:
         logger.warning(f"Received status update for unknown message ID: {message_id}")
         return None
     
-    # Update status from Twilio data
-    message.status = status_data.get("MessageStatus", "unknown")
-    
-    # If the message is delivered, update the delivered timestamp
-    if message.status == "delivered":
-        message.delivered_datetime = datetime.utcnow()
-    
-    # If the message failed, save the error message
-    if message.status in ["failed", "undelivered"]:
-        message.error = status_data.get("ErrorMessage", "Unknown error")
-    
-    await db.commit()
-    await db.refresh(message)
-    
-    logger.info(f"Updated message {message_id} status to {message.status}")
+    if applied:
+        logger.info(f"Updated message {message_id} status to {message.status}")
     return message
 
 
@@ -152,10 +689,12 @@ async def resend_message(message_id: int, db: AsyncSession) -> Optional[Message]
         return None
     
     # Create a new message with the same content
-    return await send_sms(
+    send = get_sender()
+    return await send(
         participant=participant,
         content=orig_message.content,
         bucket=orig_message.bucket,
         db=db,
-        content_id=orig_message.content_id
+        content_id=orig_message.content_id,
+        resend_of_id=orig_message.id
     )
\ No newline at end of file
@@ -0,0 +1,199 @@
+"""
+Check that the hot scheduler, history and export queries use their indexes
+
+Builds a synthetic dataset in a scratch schema, runs EXPLAIN (FORMAT JSON) on
+each query and asserts the expected index appears in the plan. Everything
+runs in one transaction that is rolled back, so the database is left untouched.
+
+Usage:
+    python check_query_plans.py
+"""
+import asyncio
+import json
+import sys
+from datetime import datetime, timedelta
+
+from sqlalchemy import Integer, String, select, text, func, tuple_, and_, or_, any_, bindparam
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import ARRAY
+
+from app.db import Base, engine
+from app.models.fitbit import FitbitData
+from app.models.message import Message, MessageContent
+from app.models.participant import Participant
+
+SCRATCH_SCHEMA = "query_plan_check"
+
+SYNTHETIC_DATA = [
+    """
+    INSERT INTO participant (pid, phone_number, study_group, start_date, sms_window_start, sms_window_end,
+                             timezone_offset, active, fitbit_connected, fitbit_registration_requested,
+                             created_at, updated_at)
+    SELECT 'QP' || g, '+1555' || lpad(g::text, 7, '0'), 'group_' || (g % 20), current_date - 30,
+           make_time(g % 24, (g * 7) % 60, 0), make_time(g % 24, (g * 7) % 60, 0) + interval '30 minutes',
+           0, g % 10 <> 0, false, false, now(), now()
+    FROM generate_series(1, 5000) AS g
+    """,
+    """
+    INSERT INTO messagecontent (content, bucket, active, created_at, updated_at)
+    SELECT 'Template ' || g, 'group_' || (g % 200), g % 10 <> 0, now(), now()
+    FROM generate_series(1, 4000) AS g
+    """,
+    """
+    INSERT INTO message (participant_id, content_id, content, bucket, status, sent_datetime,
+                         twilio_sid, created_at, updated_at)
+    SELECT (g % 5000) + 1, (g % 4000) + 1, 'Template', 'group_' || (g % 20), 'delivered',
+           now() - make_interval(mins => g), 'SM' || md5(g::text), now(), now()
+    FROM generate_series(1, 300000) AS g
+    """,
+    """
+    INSERT INTO fitbittoken (participant_id, access_token, refresh_token, expires_at, created_at, updated_at)
+    SELECT g, 'access', 'refresh', now() + interval '8 hours', now(), now()
+    FROM generate_series(1, 1000) AS g
+    """,
+    """
+    INSERT INTO fitbitdata (token_id, data_type, date, data, exported, created_at, updated_at)
+    SELECT (g % 1000) + 1, (ARRAY['steps', 'heartrate', 'sleep', 'activities'])[(g % 4) + 1],
+           current_date - (g / 4000), '{}', g % 100 <> 0, now(), now()
+    FROM generate_series(1, 200000) AS g
+    """,
+]
+
+
+def hot_queries():
+    """
+    The queries to check, mirroring the statements issued by the app, with the
+    index each one is expected to use
+    """
+    now = datetime.utcnow()
+    current_minute = 9 * 60 + 10
+    window_start = Participant.sms_window_start_utc
+    window_end = Participant.sms_window_end_utc
+
+    return [
+        (
+            "scheduler: participants due now",
+            select(Participant).where(
+                and_(
+                    Participant.active == True,
+                    Participant.start_date <= now.date(),
+                    or_(
+                        and_(window_start <= window_end, window_start <= current_minute, window_end >= current_minute),
+                        and_(window_start > window_end, or_(window_start <= current_minute, window_end >= current_minute))
+                    )
+                )
+            ),
+            {"ix_participant_sms_window_utc"},
+        ),
+        (
+            "scheduler: active templates per bucket",
+            select(MessageContent.id, MessageContent.bucket, MessageContent.content).where(
+                and_(
+                    MessageContent.bucket == any_(bindparam("buckets", ["group_1", "group_2"], type_=ARRAY(String))),
+                    MessageContent.active == True
+                )
+            ),
+            {"ix_messagecontent_bucket_active"},
+        ),
+        (
+            "scheduler: rotation bootstrap history",
+            select(Message.participant_id, Message.content_id, func.max(Message.sent_datetime)).where(
+                and_(
+                    Message.participant_id == any_(bindparam("participant_ids", [11, 12, 13], type_=ARRAY(Integer))),
+                    Message.content_id.isnot(None)
+                )
+            ).group_by(Message.participant_id, Message.content_id),
+            {"ix_message_participant_id_content_id", "ix_message_participant_id_sent_datetime"},
+        ),
+        (
+            "history: one participant, newest first",
+            select(Message)
+            .where(Message.participant_id == 42, Message.sent_datetime >= now - timedelta(days=30))
+            .order_by(Message.sent_datetime.desc())
+            .limit(100),
+            {"ix_message_participant_id_sent_datetime"},
+        ),
+        (
+            "history: keyset page, newest first",
+            select(Message)
+            .where(tuple_(Message.sent_datetime, Message.id) < tuple_(now - timedelta(days=60), 150000))
+            .order_by(Message.sent_datetime.desc(), Message.id.desc())
+            .limit(101),
+            {"ix_message_sent_datetime_id"},
+        ),
+        (
+            "history: lookup by Twilio SID",
+            select(Message).where(Message.twilio_sid == "SMc4ca4238a0b923820dcc509a6f75849b"),
+            {"ix_message_twilio_sid"},
+        ),
+        (
+            "fitbit: existing data point",
+            select(FitbitData.id).where(
+                FitbitData.token_id == 7,
+                FitbitData.data_type == "steps",
+                FitbitData.date == now.replace(hour=0, minute=0, second=0, microsecond=0)
+            ),
+            {"ix_fitbitdata_token_id_data_type_date"},
+        ),
+        (
+            "export: unexported Fitbit data",
+            select(FitbitData).where(FitbitData.exported == False),
+            {"ix_fitbitdata_unexported"},
+        ),
+    ]
+
+
+def plan_indexes(plan: dict) -> set:
+    """
+    Collect every index name used anywhere in an EXPLAIN plan tree
+    """
+    found = set()
+    if "Index Name" in plan:
+        found.add(plan["Index Name"])
+    for child in plan.get("Plans", []):
+        found |= plan_indexes(child)
+    return found
+
+
+async def check_query_plans() -> bool:
+    """
+    Build the synthetic dataset, explain each hot query and report the indexes used
+    """
+    dialect = postgresql.dialect()
+    all_passed = True
+
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        try:
+            await conn.execute(text(f"CREATE SCHEMA {SCRATCH_SCHEMA}"))
+            await conn.execute(text(f"SET LOCAL search_path TO {SCRATCH_SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+
+            print("Creating synthetic dataset...")
+            for statement in SYNTHETIC_DATA:
+                await conn.execute(text(statement))
+            await conn.execute(text("ANALYZE participant, messagecontent, message, fitbittoken, fitbitdata"))
+
+            for name, query, expected in hot_queries():
+                sql = str(query.compile(dialect=dialect, compile_kwargs={"literal_binds": True}))
+                result = await conn.execute(text(f"EXPLAIN (FORMAT JSON) {sql}"))
+                explained = result.scalar()
+                if isinstance(explained, str):
+                    explained = json.loads(explained)
+                plan = explained[0]["Plan"]
+                used = plan_indexes(plan)
+
+                passed = bool(used & expected)
+                all_passed = all_passed and passed
+                print(f"{'PASS' if passed else 'FAIL'} {name}: uses {sorted(used) or 'no index'}")
+                if not passed:
+                    print(f"     expected one of {sorted(expected)}")
+        finally:
+            await transaction.rollback()
+
+    await engine.dispose()
+    return all_passed
+
+
+if __name__ == "__main__":
+    sys.exit(0 if asyncio.run(check_query_plans()) else 1)
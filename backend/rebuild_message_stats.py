@@ -0,0 +1,16 @@
+import asyncio
+
+from app.db import async_session_maker
+from app.services.stats_service import rebuild_message_daily_stats
+
+
+async def rebuild_message_stats():
+    """Recompute the daily message statistics rollup from the message table"""
+
+    async with async_session_maker() as db:
+        print("Rebuilding message statistics rollup...")
+        result = await rebuild_message_daily_stats(db)
+        print(f"Rollup has {result['rows']} rows, {result['corrected']} corrected")
+
+if __name__ == "__main__":
+    asyncio.run(rebuild_message_stats())
@@ -0,0 +1,478 @@
+"""
+Simulate the SMS scheduler over a day (or more) on an accelerated virtual clock
+
+Builds a synthetic roster in a scratch schema, then steps a virtual clock
+through every minute of the simulated period, firing participants from the
+timing wheel through send_scheduled_messages exactly as the leader's scheduler
+loop does. Messages go to an in-process fake Twilio with configurable latency,
+error and throttle rates, whose delivery callbacks arrive after a simulated
+delay. Idle minutes are skipped instantly; sends, rate limiting and database
+work take their real time, so a slow run pushes sent_datetime past the tick
+the same way it would in production.
+
+Prints a JSON report with per-minute send rates, run times, window misses and
+repeat violations. The scratch schema is dropped afterwards unless --keep.
+
+Usage:
+    python simulate_scheduler.py --participants 2000 --days 7 --latency-ms 120 --error-rate 0.01
+"""
+import argparse
+import asyncio
+import heapq
+import json
+import random
+import sys
+from collections import Counter
+from datetime import date, datetime, time, timedelta
+from itertools import count
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import Integer, and_, case, cast, extract, func, not_, or_, select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.orm import aliased
+from twilio.base.exceptions import TwilioRestException
+
+from app.core import tasks
+from app.core.clock import VirtualClock, set_clock
+from app.core.config import settings
+from app.db import Base, async_session_maker
+from app.models.message import Message, MessageContent
+from app.models.participant import Participant
+from app.services.rotation_service import NO_REPEAT_WINDOW
+from app.services.timing_wheel import MINUTES_PER_DAY, SmsTimingWheel
+from app.services.twilio_service import TwilioTransport, set_transport, update_message_status
+
+SCRATCH_SCHEMA = "scheduler_simulation"
+
+# Participant timezones, in minutes from UTC
+TIMEZONE_OFFSETS = [-480, -420, -360, -300, -240, 0, 60, 120]
+
+
+class SimulatedTwilioTransport(TwilioTransport):
+    """
+    Fake Twilio with latency, rejections, throttling and delayed status callbacks
+
+    Callbacks are queued against the virtual clock and applied through
+    update_message_status, as the status-callback webhook would.
+    """
+
+    def __init__(
+        self,
+        clock: VirtualClock,
+        rng: random.Random,
+        latency_ms: float,
+        error_rate: float,
+        throttle_rate: float,
+        undelivered_rate: float,
+        callback_delay_seconds: float
+    ):
+        self.clock = clock
+        self.rng = rng
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.undelivered_rate = undelivered_rate
+        self.callback_delay_seconds = callback_delay_seconds
+
+        self.counts: Counter = Counter()
+        self._callbacks: List[Tuple[datetime, int, int, str]] = []
+        self._callback_seq = count()
+        self._sid_counter = count(1)
+        self._deliver_lock = asyncio.Lock()
+
+    async def create_message(
+        self,
+        to: str,
+        body: str,
+        from_: Optional[str] = None,
+        status_callback: Optional[str] = None,
+        messaging_service_sid: Optional[str] = None
+    ) -> str:
+        await asyncio.sleep(self.latency_ms / 1000 * self.rng.uniform(0.5, 1.5))
+
+        roll = self.rng.random()
+        if roll < self.throttle_rate:
+            self.counts["throttled"] += 1
+            raise TwilioRestException(status=429, uri="/Messages.json", msg="Too Many Requests", code=20429, method="POST")
+        if roll < self.throttle_rate + self.error_rate:
+            self.counts["rejected"] += 1
+            raise TwilioRestException(
+                status=400,
+                uri="/Messages.json",
+                msg="Attempt to send to unsubscribed recipient",
+                code=21610,
+                method="POST"
+            )
+
+        self.counts["accepted"] += 1
+        if status_callback:
+            message_id = int(status_callback.rsplit("/", 1)[1])
+            now = self.clock.now()
+            delay = self.rng.expovariate(1 / self.callback_delay_seconds) if self.callback_delay_seconds > 0 else 0
+            final_status = "undelivered" if self.rng.random() < self.undelivered_rate else "delivered"
+            self._schedule_callback(now + timedelta(seconds=min(delay, 1.0)), message_id, "sent")
+            self._schedule_callback(now + timedelta(seconds=delay), message_id, final_status)
+
+        return f"SM{next(self._sid_counter):032d}"
+
+    def _schedule_callback(self, due: datetime, message_id: int, status: str) -> None:
+        heapq.heappush(self._callbacks, (due, next(self._callback_seq), message_id, status))
+
+    def next_callback_at(self) -> Optional[datetime]:
+        return self._callbacks[0][0] if self._callbacks else None
+
+    @property
+    def pending_callbacks(self) -> int:
+        return len(self._callbacks)
+
+    async def deliver_due(self) -> int:
+        """
+        Apply every callback that is due on the virtual clock
+
+        Returns:
+            Number of callbacks applied
+        """
+        async with self._deliver_lock:
+            now = self.clock.now()
+            due = []
+            while self._callbacks and self._callbacks[0][0] <= now:
+                due.append(heapq.heappop(self._callbacks))
+            if not due:
+                return 0
+
+            async with async_session_maker() as session:
+                for _, _, message_id, status in due:
+                    status_data = {"MessageStatus": status}
+                    if status == "undelivered":
+                        status_data["ErrorMessage"] = "Unknown destination handset"
+                    await update_message_status(message_id, status_data, session)
+
+            self.counts["callbacks"] += len(due)
+            return len(due)
+
+
+async def pump_callbacks(transport: SimulatedTwilioTransport, stop_event: asyncio.Event) -> None:
+    """
+    Deliver callbacks that fall due while a scheduler run is in progress
+    """
+    while not stop_event.is_set():
+        await transport.deliver_due()
+        try:
+            await asyncio.wait_for(stop_event.wait(), timeout=0.01)
+        except asyncio.TimeoutError:
+            pass
+
+
+def synthetic_roster(size: int, buckets: int, start: datetime, rng: random.Random) -> List[Participant]:
+    """
+    Build participants with windows clustered on quarter hours across timezones,
+    some inactive and some starting during the simulation
+    """
+    participants = []
+    for n in range(1, size + 1):
+        window_start = rng.randrange(7 * 4, 20 * 4) * 15
+        window_length = rng.choice([30, 60, 120, 240])
+        window_end = (window_start + window_length) % MINUTES_PER_DAY
+        participants.append(Participant(
+            pid=f"SIM{n:06d}",
+            friendly_name=rng.choice(["Alex", "Sam", "Zoë", None]),
+            phone_number=f"+1555{n:07d}",
+            study_group=f"group_{n % buckets}",
+            start_date=start.date() + timedelta(days=rng.randint(-14, 2)),
+            sms_window_start=time(window_start // 60, window_start % 60),
+            sms_window_end=time(window_end // 60, window_end % 60),
+            timezone_offset=rng.choice(TIMEZONE_OFFSETS),
+            active=rng.random() >= 0.05
+        ))
+    return participants
+
+
+def synthetic_templates(buckets: int, per_bucket: int) -> List[MessageContent]:
+    """
+    Build templates for every bucket, including personalized and non-GSM ones
+    """
+    templates = []
+    for bucket in range(buckets):
+        for n in range(per_bucket):
+            content = f"Group {bucket} tip {n}: take a short walk after lunch today."
+            if n % 3 == 0:
+                content = f"Hi %F! {content}"
+            if n % 7 == 0:
+                content += " 🚶"
+            templates.append(MessageContent(content=content, bucket=f"group_{bucket}", active=True))
+    return templates
+
+
+def expected_sends(participants: List[Participant], start: datetime, end: datetime) -> Dict[int, int]:
+    """
+    Count how many times each participant's window opens during the simulation
+    while they are active and past their start date
+    """
+    expected = {}
+    first_day = datetime.combine(start.date(), time())
+    days = (end - first_day).days + 1
+    for participant in participants:
+        slot = SmsTimingWheel.slot_for(participant)
+        if slot is None:
+            continue
+        opens = [first_day + timedelta(days=day, minutes=slot) for day in range(days)]
+        expected[participant.id] = sum(
+            1 for opened in opens
+            if start <= opened < end and opened.date() >= participant.start_date
+        )
+    return expected
+
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+
+    def at(fraction: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(fraction * len(ordered)))], 3)
+
+    return {
+        "count": len(ordered),
+        "total": round(sum(ordered), 3),
+        "p50": at(0.50),
+        "p95": at(0.95),
+        "max": round(ordered[-1], 3),
+    }
+
+
+async def collect_report(
+    participants: List[Participant],
+    start: datetime,
+    end: datetime,
+    runs: List[Dict[str, Any]],
+    transport: SimulatedTwilioTransport
+) -> Dict[str, Any]:
+    """
+    Measure the simulated period from the message table and the run log
+    """
+    sent_at = func.timezone("UTC", Message.sent_datetime)
+    minute_of_day = cast(extract("hour", sent_at) * 60 + extract("minute", sent_at), Integer)
+    window_start = Participant.sms_window_start_utc
+    window_end = Participant.sms_window_end_utc
+    in_window = case(
+        (window_start <= window_end, and_(minute_of_day >= window_start, minute_of_day <= window_end)),
+        else_=or_(minute_of_day >= window_start, minute_of_day <= window_end)
+    )
+
+    earlier = aliased(Message)
+
+    async with async_session_maker() as session:
+        per_minute = (await session.execute(
+            select(func.date_trunc("minute", sent_at).label("minute"), func.count())
+            .group_by(text("minute"))
+            .order_by(text("minute"))
+        )).all()
+
+        window_counts = (await session.execute(
+            select(
+                Message.participant_id,
+                func.count().filter(in_window),
+                func.count().filter(not_(in_window))
+            )
+            .join(Participant, Participant.id == Message.participant_id)
+            .group_by(Message.participant_id)
+        )).all()
+
+        repeat_violations = (await session.execute(
+            select(func.count(func.distinct(Message.id)))
+            .select_from(Message)
+            .join(earlier, and_(
+                earlier.participant_id == Message.participant_id,
+                earlier.content_id == Message.content_id,
+                earlier.id < Message.id,
+                Message.sent_datetime - earlier.sent_datetime < NO_REPEAT_WINDOW
+            ))
+        )).scalar()
+
+        statuses = dict((await session.execute(
+            select(Message.status, func.count()).group_by(Message.status)
+        )).all())
+
+    in_window_by_participant = {participant_id: inside for participant_id, inside, _ in window_counts}
+    expected = expected_sends(participants, start, end)
+    misses = sum(max(0, due - in_window_by_participant.get(pid, 0)) for pid, due in expected.items())
+
+    rates = [sends for _, sends in per_minute]
+    return {
+        "simulated": {
+            "start": start.isoformat(),
+            "end": end.isoformat(),
+            "participants": len(participants),
+            "active_participants": sum(1 for p in participants if p.active),
+        },
+        "runs": {
+            "count": len(runs),
+            "due": sum(run["due"] for run in runs),
+            "sent": sum(run["sent"] for run in runs),
+            "failed": sum(run["failed"] for run in runs),
+            "skipped": sum(run["skipped"] for run in runs),
+            "segments": sum(run["segments"] for run in runs),
+            "errors": sum(1 for run in runs if run["error"]),
+            "wall_seconds": percentiles([run["wall_seconds"] for run in runs]),
+            "virtual_overrun_seconds": percentiles([run["overrun_seconds"] for run in runs]),
+        },
+        "send_rate_per_minute": {
+            "peak": max(rates, default=0),
+            "mean_active": round(sum(rates) / len(rates), 2) if rates else 0,
+            "active_minutes": len(rates),
+            "minutes": [{"minute": minute.isoformat(), "sends": sends} for minute, sends in per_minute],
+        },
+        "window": {
+            "expected": sum(expected.values()),
+            "sent_in_window": sum(min(due, in_window_by_participant.get(pid, 0)) for pid, due in expected.items()),
+            "misses": misses,
+            "sent_outside_window": sum(outside for _, _, outside in window_counts),
+        },
+        "repeat_violations": repeat_violations,
+        "statuses": statuses,
+        "twilio": {
+            "accepted": transport.counts["accepted"],
+            "rejected": transport.counts["rejected"],
+            "throttled": transport.counts["throttled"],
+            "callbacks_applied": transport.counts["callbacks"],
+            "callbacks_pending": transport.pending_callbacks,
+        },
+    }
+
+
+async def simulate(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Build the scratch database, run the virtual scheduler and measure the outcome
+    """
+    rng = random.Random(args.seed)
+    start = datetime.combine(args.start_date, time())
+    end = start + timedelta(days=args.days)
+
+    clock = VirtualClock(start)
+    transport = SimulatedTwilioTransport(
+        clock,
+        rng,
+        latency_ms=args.latency_ms,
+        error_rate=args.error_rate,
+        throttle_rate=args.throttle_rate,
+        undelivered_rate=args.undelivered_rate,
+        callback_delay_seconds=args.callback_delay
+    )
+
+    # Every session the app opens lands in the scratch schema
+    sim_engine = create_async_engine(
+        str(settings.DATABASE_URI),
+        connect_args={"server_settings": {"search_path": SCRATCH_SCHEMA}}
+    )
+    original_engine = async_session_maker.kw["bind"]
+    async_session_maker.configure(bind=sim_engine)
+
+    # Send directly so every message goes through the fake transport in the run
+    settings.SMS_OUTBOX_ENABLED = False
+    if args.concurrency:
+        settings.SMS_DISPATCH_CONCURRENCY = args.concurrency
+
+    set_clock(clock.now)
+    set_transport(transport)
+    stop_event = asyncio.Event()
+    pump = None
+
+    try:
+        async with sim_engine.begin() as conn:
+            await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE"))
+            await conn.execute(text(f"CREATE SCHEMA {SCRATCH_SCHEMA}"))
+            await conn.run_sync(Base.metadata.create_all)
+
+        participants = synthetic_roster(args.participants, args.buckets, start, rng)
+        async with async_session_maker() as session:
+            session.add_all(synthetic_templates(args.buckets, args.templates_per_bucket))
+            session.add_all(participants)
+            await session.commit()
+
+        wheel = SmsTimingWheel()
+        async with async_session_maker() as session:
+            await wheel.load(session)
+
+        print(f"Simulating {args.days} day(s) for {args.participants} participants...", file=sys.stderr)
+        pump = asyncio.create_task(pump_callbacks(transport, stop_event))
+
+        runs = []
+        tick = start
+        while tick < end:
+            # Callbacks due before this tick arrive at their own virtual time
+            while transport.next_callback_at() and transport.next_callback_at() <= tick:
+                clock.jump_to(transport.next_callback_at())
+                await transport.deliver_due()
+
+            now = clock.jump_to(tick)
+            due = wheel.advance(now)
+            if due:
+                started = perf_counter()
+                run_result = await tasks.send_scheduled_messages(participant_ids=due, now=now)
+                runs.append({
+                    "tick": now.isoformat(),
+                    "due": len(due),
+                    "wall_seconds": perf_counter() - started,
+                    "overrun_seconds": (clock.now() - now).total_seconds(),
+                    "error": run_result is None,
+                    **(run_result.model_dump() if run_result else {
+                        "eligible": 0, "sent": 0, "failed": 0, "skipped": 0, "segments": 0
+                    }),
+                })
+
+            tick = now.replace(second=0, microsecond=0) + timedelta(minutes=1)
+
+        # Let callbacks due within the simulated period land
+        while transport.next_callback_at() and transport.next_callback_at() < end:
+            clock.jump_to(transport.next_callback_at())
+            await transport.deliver_due()
+
+        stop_event.set()
+        await pump
+
+        report = await collect_report(participants, start, end, runs, transport)
+        report["config"] = {key: str(value) if isinstance(value, date) else value for key, value in vars(args).items()}
+        return report
+    finally:
+        stop_event.set()
+        if pump and not pump.done():
+            pump.cancel()
+        set_transport(None)
+        set_clock(None)
+        if not args.keep:
+            async with sim_engine.begin() as conn:
+                await conn.execute(text(f"DROP SCHEMA IF EXISTS {SCRATCH_SCHEMA} CASCADE"))
+        await sim_engine.dispose()
+        async_session_maker.configure(bind=original_engine)
+
+
+def parse_args() -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description="Simulate the SMS scheduler on a virtual clock")
+    parser.add_argument("--participants", type=int, default=500, help="Size of the synthetic roster")
+    parser.add_argument("--buckets", type=int, default=5, help="Number of study groups")
+    parser.add_argument("--templates-per-bucket", type=int, default=10, help="Active templates per study group")
+    parser.add_argument("--days", type=int, default=1, help="Length of the simulated period")
+    parser.add_argument("--start-date", type=date.fromisoformat, default=date.today(), help="First simulated UTC day")
+    parser.add_argument("--concurrency", type=int, default=None, help="Dispatch concurrency (defaults to settings)")
+    parser.add_argument("--latency-ms", type=float, default=100.0, help="Mean Twilio API latency")
+    parser.add_argument("--error-rate", type=float, default=0.01, help="Fraction of sends Twilio rejects")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of sends answered with 429")
+    parser.add_argument("--undelivered-rate", type=float, default=0.02, help="Fraction of accepted messages reported undelivered")
+    parser.add_argument("--callback-delay", type=float, default=30.0, help="Mean delay of the final status callback, in seconds")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the roster and the fake Twilio")
+    parser.add_argument("--output", help="Write the JSON report to this file instead of stdout")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCRATCH_SCHEMA} schema for inspection")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    arguments = parse_args()
+    simulation_report = asyncio.run(simulate(arguments))
+
+    output = json.dumps(simulation_report, indent=2, default=str)
+    if arguments.output:
+        with open(arguments.output, "w") as report_file:
+            report_file.write(output)
+    else:
+        print(output)
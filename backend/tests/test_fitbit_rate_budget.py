@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.services.fitbit_rate_budget import FitbitRateBudgets, FitbitRateLimited, TokenRateBudget
+
+NOW = datetime(2026, 3, 2, 9, 0)
+
+
+def _headers(limit=150, remaining=None, reset=None, retry_after=None) -> httpx.Headers:
+    headers = {"Fitbit-Rate-Limit-Limit": str(limit)}
+    if remaining is not None:
+        headers["Fitbit-Rate-Limit-Remaining"] = str(remaining)
+    if reset is not None:
+        headers["Fitbit-Rate-Limit-Reset"] = str(reset)
+    if retry_after is not None:
+        headers["Retry-After"] = str(retry_after)
+    return httpx.Headers(headers)
+
+
+def test_reserve_never_grants_more_than_remaining():
+    budget = TokenRateBudget(limit=10)
+
+    assert budget.reserve(6, NOW) == 6
+    assert budget.reserve(6, NOW) == 4
+    assert budget.reserve(1, NOW) == 0
+    assert budget.requests == 10
+
+
+def test_headers_never_give_back_reserved_requests():
+    budget = TokenRateBudget(limit=150)
+    budget.reserve(10, NOW)
+
+    # Answered before the other reserved requests, so Fitbit still counts them as unsent
+    budget.record_headers(_headers(remaining=149, reset=600), NOW)
+
+    assert budget.remaining == 140
+    assert budget.reserve(200, NOW) == 140
+
+
+def test_budget_refills_when_the_window_rolls_over():
+    budget = TokenRateBudget(limit=150)
+    budget.reserve(5, NOW)
+    budget.record_headers(_headers(remaining=0, reset=600), NOW)
+
+    assert budget.reserve(1, NOW + timedelta(seconds=599)) == 0
+    assert budget.reserve(1, NOW + timedelta(seconds=600)) == 1
+    assert budget.remaining == 149
+
+
+def test_first_reservation_assumes_a_default_window():
+    budget = TokenRateBudget(limit=150)
+    budget.reserve(1, NOW)
+
+    assert budget.reset_at == NOW + timedelta(seconds=settings.FITBIT_RATE_LIMIT_DEFAULT_RESET_SECONDS)
+
+
+def test_throttled_defers_until_reset_header():
+    budget = TokenRateBudget(limit=150)
+
+    resumes = budget.record_throttled(_headers(remaining=0, reset=300, retry_after=60), NOW)
+
+    assert resumes == NOW + timedelta(seconds=300)
+    assert budget.reserve(1, NOW + timedelta(seconds=299)) == 0
+    assert budget.reserve(1, NOW + timedelta(seconds=300)) == 1
+
+
+def test_throttled_falls_back_to_retry_after_without_reset_header():
+    budget = TokenRateBudget(limit=150)
+
+    resumes = budget.record_throttled(_headers(retry_after=120), NOW)
+
+    assert resumes == NOW + timedelta(seconds=120)
+    assert budget.resumes_at() == resumes
+    assert budget.throttled == 1
+
+
+def test_throttled_falls_back_to_default_window_without_any_hint():
+    budget = TokenRateBudget(limit=150)
+
+    resumes = budget.record_throttled(_headers(retry_after="soon"), NOW)
+
+    assert resumes == NOW + timedelta(seconds=settings.FITBIT_RATE_LIMIT_DEFAULT_RESET_SECONDS)
+
+
+def test_malformed_headers_are_ignored():
+    budget = TokenRateBudget(limit=150)
+
+    budget.record_headers(httpx.Headers({"Fitbit-Rate-Limit-Remaining": "lots"}), NOW)
+
+    assert budget.remaining == 150
+
+
+def test_budgets_raise_on_429_and_track_tokens_separately():
+    budgets = FitbitRateBudgets(limit=150)
+    throttled = httpx.Response(429, headers=_headers(remaining=0, reset=300))
+
+    with pytest.raises(FitbitRateLimited):
+        budgets.record_response(1, throttled)
+
+    assert budgets.budget_for(1).deferred_until is not None
+    assert budgets.budget_for(2).deferred_until is None
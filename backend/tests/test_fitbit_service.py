@@ -0,0 +1,123 @@
+import asyncio
+from datetime import date, datetime, time
+
+from app.core.config import settings
+from app.models.fitbit import FitbitData, FitbitToken
+from app.services import fitbit_service
+from app.services.fitbit_rate_budget import FitbitRateBudgets
+from app.services.fitbit_service import FitbitFetch, split_sleep_by_day
+
+
+def _log(day, minutes_asleep, time_in_bed, stages=None):
+    log = {"dateOfSleep": day, "minutesAsleep": minutes_asleep, "timeInBed": time_in_bed, "type": "classic"}
+    if stages is not None:
+        log["type"] = "stages"
+        log["levels"] = {"summary": {stage: {"minutes": minutes} for stage, minutes in stages.items()}}
+    return log
+
+
+def test_split_sleep_rebuilds_each_days_summary():
+    fetch = FitbitFetch("sleep", date(2026, 3, 1), date(2026, 3, 3))
+    payload = {"sleep": [
+        _log("2026-03-01", 400, 450, {"deep": 60, "light": 250, "rem": 90, "wake": 50}),
+        _log("2026-03-01", 30, 35),
+        _log("2026-03-02", 380, 410),
+    ]}
+
+    days = split_sleep_by_day(payload, fetch)
+
+    assert days[date(2026, 3, 1)]["summary"] == {
+        "totalMinutesAsleep": 430,
+        "totalSleepRecords": 2,
+        "totalTimeInBed": 485,
+        "stages": {"deep": 60, "light": 250, "rem": 90, "wake": 50},
+    }
+    assert days[date(2026, 3, 2)]["summary"] == {"totalMinutesAsleep": 380, "totalSleepRecords": 1, "totalTimeInBed": 410}
+    assert days[date(2026, 3, 3)] == {
+        "sleep": [],
+        "summary": {"totalMinutesAsleep": 0, "totalSleepRecords": 0, "totalTimeInBed": 0},
+    }
+
+
+def test_fetch_within_budget_bounds_requests_in_flight(monkeypatch):
+    in_flight = 0
+    peak = 0
+
+    async def fake_fetch_range(token, fetch):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0)
+        in_flight -= 1
+        return {fetch.start: {}}
+
+    monkeypatch.setattr(fitbit_service, "fetch_range", fake_fetch_range)
+    monkeypatch.setattr(fitbit_service, "fitbit_rate_budgets", FitbitRateBudgets(150))
+    monkeypatch.setattr(settings, "FITBIT_HTTP_MAX_CONNECTIONS", 10)
+    monkeypatch.setattr(settings, "FITBIT_SYNC_CONCURRENCY", 5)
+    fetches = [FitbitFetch("activities", date(2026, 3, day), date(2026, 3, day)) for day in range(1, 21)]
+    token = FitbitToken(id=1, access_token="token")
+
+    results, errors, deferred = asyncio.run(fitbit_service.fetch_within_budget(token, fetches))
+
+    assert len(results) == 20 and not errors and not deferred
+    assert peak == 2
+
+
+class _StoredRows:
+    """Session holding a participant's stored rows for save_fetched_days"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.added = []
+        self.deleted = []
+
+    async def execute(self, query):
+        rows = self.rows
+
+        class Result:
+            def scalars(self):
+                return self
+
+            def all(self):
+                return rows
+
+        return Result()
+
+    def add(self, row):
+        self.added.append(row)
+
+    async def delete(self, row):
+        self.deleted.append(row)
+
+
+def _stored(row_id, day, steps, exported=True) -> FitbitData:
+    return FitbitData(
+        id=row_id,
+        token_id=1,
+        data_type="steps",
+        date=datetime.combine(day, time()),
+        data={"activities-steps": [{"dateTime": f"{day}", "value": steps}]},
+        exported=exported
+    )
+
+
+def test_save_fetched_days_only_reexports_changed_days():
+    unchanged = _stored(1, date(2026, 3, 1), "100")
+    changed = _stored(2, date(2026, 3, 2), "200")
+    duplicate = _stored(3, date(2026, 3, 2), "150")
+    session = _StoredRows([unchanged, changed, duplicate])
+    fetch = FitbitFetch("steps", date(2026, 3, 1), date(2026, 3, 3))
+    days = {
+        date(2026, 3, 1): {"activities-steps": [{"dateTime": "2026-03-01", "value": "100"}]},
+        date(2026, 3, 2): {"activities-steps": [{"dateTime": "2026-03-02", "value": "250"}]},
+        date(2026, 3, 3): {"activities-steps": [{"dateTime": "2026-03-03", "value": "10"}]},
+    }
+
+    asyncio.run(fitbit_service.save_fetched_days(session, 1, fetch, days))
+
+    assert unchanged.exported
+    assert not changed.exported
+    assert changed.data == days[date(2026, 3, 2)]
+    assert session.deleted == [duplicate]
+    assert [row.date.date() for row in session.added] == [date(2026, 3, 3)]
@@ -0,0 +1,54 @@
+import asyncio
+
+from app.core.leader import LeaderElector
+
+
+class _FakeLockConnection:
+    """Lock connection whose heartbeat and unlock queries fail once the session breaks"""
+
+    def __init__(self):
+        self.broken = False
+        self.invalidated = False
+
+    async def execute(self, statement, params=None):
+        if self.broken and not str(statement).startswith("SET"):
+            raise ConnectionError("server closed the connection unexpectedly")
+
+    async def commit(self):
+        pass
+
+    async def rollback(self):
+        pass
+
+    async def invalidate(self):
+        self.invalidated = True
+
+
+def test_lost_leadership_cancels_jobs_and_discards_the_connection():
+    conn = _FakeLockConnection()
+    job_started = asyncio.Event()
+    job_cancelled = False
+
+    async def sending_job(leadership_ended: asyncio.Event) -> None:
+        nonlocal job_cancelled
+        job_started.set()
+        try:
+            # A long send that ignores the leadership event
+            await asyncio.sleep(3600)
+        except asyncio.CancelledError:
+            job_cancelled = True
+            raise
+
+    async def scenario():
+        elector = LeaderElector(lock_key=1, heartbeat_seconds=0.01)
+        lead = asyncio.create_task(elector._lead(conn, asyncio.Event(), [sending_job]))
+        await job_started.wait()
+        conn.broken = True
+        await asyncio.wait_for(lead, timeout=1)
+        return elector
+
+    elector = asyncio.run(scenario())
+
+    assert job_cancelled
+    assert conn.invalidated
+    assert not elector.is_leader
@@ -0,0 +1,131 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, select, text, update
+
+from app.models.message import Message
+from app.services.message_status import STATUS_RANK, advanced_status, status_rank_sql
+from app.services.status_ingest import StatusCallbackBuffer, StatusUpdate, parse_status_callback
+
+RECEIVED_AT = datetime(2026, 3, 2, 9, 0)
+
+
+@pytest.fixture
+def message_table():
+    """SQLite stand-in for the message table, enough to evaluate the lattice expressions"""
+    engine = create_engine("sqlite://")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE message (id INTEGER PRIMARY KEY, status TEXT, updated_at TIMESTAMP)"))
+    yield engine
+    engine.dispose()
+
+
+def _transition(engine, stored: str, new_status: str) -> str:
+    """Run the conditional UPDATE used for status callbacks and return the stored status"""
+    with engine.begin() as conn:
+        conn.execute(text("DELETE FROM message"))
+        conn.execute(text("INSERT INTO message (id, status) VALUES (1, :status)"), {"status": stored})
+        conn.execute(
+            update(Message)
+            .where(Message.id == 1, status_rank_sql() < STATUS_RANK[new_status])
+            .values(status=new_status)
+        )
+        return conn.execute(select(Message.status).where(Message.id == 1)).scalar()
+
+
+def _update(message_id: int, status: str) -> StatusUpdate:
+    return StatusUpdate(message_id, status, None, RECEIVED_AT)
+
+
+@pytest.mark.parametrize("stored, late", [("delivered", "sent"), ("sent", "queued"), ("read", "delivered")])
+def test_out_of_order_callback_does_not_move_status_back(message_table, stored, late):
+    assert _transition(message_table, stored, late) == stored
+
+
+@pytest.mark.parametrize("stored, new_status", [("queued", "sent"), ("sent", "delivered"), ("delivered", "read")])
+def test_callback_moves_status_forward(message_table, stored, new_status):
+    assert _transition(message_table, stored, new_status) == new_status
+
+
+def test_terminal_statuses_of_equal_rank_do_not_replace_each_other(message_table):
+    assert _transition(message_table, "failed", "delivered") == "failed"
+
+
+@pytest.mark.parametrize("new_status", ["sent", "delivered", "failed"])
+def test_unknown_outcome_is_superseded_by_twilio_status(message_table, new_status):
+    assert _transition(message_table, "unknown", new_status) == new_status
+
+
+def test_unknown_outcome_is_not_moved_back_to_sending(message_table):
+    assert _transition(message_table, "unknown", "sending") == "unknown"
+
+
+def test_advanced_status_keeps_higher_stored_status(message_table):
+    with message_table.begin() as conn:
+        conn.execute(text("INSERT INTO message (id, status) VALUES (1, 'delivered'), (2, 'sending')"))
+        rows = conn.execute(select(Message.id, advanced_status("sent")).order_by(Message.id)).all()
+
+    assert [tuple(row) for row in rows] == [(1, "delivered"), (2, "sent")]
+
+
+def test_callbacks_reporting_local_or_unknown_statuses_are_rejected():
+    assert parse_status_callback(1, {"MessageStatus": "unknown"}) is None
+    assert parse_status_callback(1, {"MessageStatus": "exploded"}) is None
+    assert parse_status_callback(1, {}) is None
+    assert parse_status_callback(1, {"MessageStatus": "undelivered"}).error == "Unknown error"
+
+
+def _buffer(**kwargs) -> StatusCallbackBuffer:
+    options = {"max_size": 10, "batch_size": 10, "flush_interval": 0.01, "enqueue_timeout": 0.01}
+    options.update(kwargs)
+    return StatusCallbackBuffer(**options)
+
+
+def test_coalesce_keeps_highest_ranked_status_per_message():
+    buffer = _buffer()
+    batch = [_update(1, "sent"), _update(1, "delivered"), _update(2, "failed"), _update(1, "queued")]
+
+    coalesced = sorted(buffer.coalesce(batch))
+
+    assert [(u.message_id, u.status) for u in coalesced] == [(1, "delivered"), (2, "failed")]
+    assert buffer.coalesced == 2
+
+
+def test_coalesce_keeps_first_of_equal_rank():
+    buffer = _buffer()
+
+    coalesced = buffer.coalesce([_update(1, "failed"), _update(1, "undelivered")])
+
+    assert [u.status for u in coalesced] == ["failed"]
+
+
+def test_flush_writes_coalesced_callbacks_in_one_update(monkeypatch):
+    buffer = _buffer()
+    writes = []
+
+    async def fake_apply(updates):
+        writes.append(updates)
+        return len(updates), 0
+
+    monkeypatch.setattr(buffer, "apply", fake_apply)
+    batch = [_update(2, "sent"), _update(1, "sent"), _update(2, "delivered"), _update(1, "undelivered")]
+
+    asyncio.run(buffer._flush(batch))
+
+    assert [[(u.message_id, u.status) for u in updates] for updates in writes] == [[(1, "undelivered"), (2, "delivered")]]
+    assert buffer.stats()["applied"] == 2
+
+
+def test_offer_refuses_when_not_running_or_full():
+    buffer = _buffer(max_size=1)
+
+    async def scenario():
+        assert not await buffer.offer(_update(1, "sent"))
+        buffer._queue = asyncio.Queue(maxsize=buffer.max_size)
+        assert await buffer.offer(_update(1, "sent"))
+        assert not await buffer.offer(_update(1, "delivered"))
+
+    asyncio.run(scenario())
+    assert buffer.received == 1
+    assert buffer.refused == 1
@@ -0,0 +1,62 @@
+import pytest
+
+from app.models.participant import Participant
+from app.services.message_templates import CompiledTemplate, count_segments, measure_text
+
+
+def _segments(text: str):
+    return count_segments(measure_text(text))
+
+
+@pytest.mark.parametrize("length, segments", [(160, 1), (161, 2), (306, 2), (307, 3)])
+def test_gsm7_segment_boundaries(length, segments):
+    assert _segments("a" * length) == ("GSM-7", segments)
+
+
+@pytest.mark.parametrize("length, segments", [(70, 1), (71, 2), (134, 2), (135, 3)])
+def test_ucs2_segment_boundaries(length, segments):
+    assert _segments("ж" * length) == ("UCS-2", segments)
+
+
+@pytest.mark.parametrize("char", ["{", "€", "[", "~"])
+def test_gsm7_extension_characters_count_double(char):
+    assert measure_text(char).gsm7_units == 2
+    assert _segments("a" * 158 + char) == ("GSM-7", 1)
+    assert _segments("a" * 159 + char) == ("GSM-7", 2)
+
+
+def test_one_non_gsm_character_switches_the_whole_message_to_ucs2():
+    assert _segments("a" * 70 + "😀") == ("UCS-2", 2)
+    # Characters outside the BMP take two UTF-16 code units
+    assert measure_text("😀").ucs2_units == 2
+
+
+def test_template_without_placeholders_renders_static_message():
+    template = CompiledTemplate("Time for a walk!")
+
+    rendered = template.render(Participant(friendly_name="Sam"))
+
+    assert rendered.text == "Time for a walk!"
+    assert (rendered.encoding, rendered.segments) == ("GSM-7", 1)
+
+
+def test_template_substitutes_friendly_name():
+    template = CompiledTemplate("Hi %F, time for a walk!")
+
+    assert template.render(Participant(friendly_name="Sam")).text == "Hi Sam, time for a walk!"
+
+
+def test_template_falls_back_when_friendly_name_is_missing():
+    template = CompiledTemplate("Hi %F, time for a walk!")
+
+    assert template.render(Participant(friendly_name=None)).text == "Hi , time for a walk!"
+
+
+def test_substituted_value_decides_encoding_and_segments():
+    template = CompiledTemplate("%F" + "a" * 158)
+
+    assert template.render(Participant(friendly_name="ab")).segments == 1
+    assert template.render(Participant(friendly_name="abc")).segments == 2
+    # "É" is in the GSM-7 basic set, "ë" is not
+    assert template.render(Participant(friendly_name="É")).encoding == "GSM-7"
+    assert template.render(Participant(friendly_name="Zoë"))[1:] == ("UCS-2", 3)
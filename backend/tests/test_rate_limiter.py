@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from twilio.base.exceptions import TwilioRestException
+
+from app.services.twilio_service import SenderRateLimiter, TokenBucket
+
+
+class FakeClock:
+    """Monotonic clock that only moves when something sleeps on it"""
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+def _throttled(status=400, code=None) -> TwilioRestException:
+    return TwilioRestException(status=status, uri="/Messages.json", msg="Too Many Requests", code=code, method="POST")
+
+
+def _take(bucket: TokenBucket, count: int) -> None:
+    async def take():
+        for _ in range(count):
+            await bucket.acquire()
+
+    asyncio.run(take())
+
+
+def test_bucket_allows_a_burst_up_to_capacity_without_waiting():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+
+    _take(bucket, 5)
+
+    assert clock.sleeps == []
+    assert bucket.tokens == pytest.approx(0)
+
+
+def test_bucket_waits_for_refill_at_its_rate():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+
+    _take(bucket, 7)
+
+    assert clock.sleeps == [pytest.approx(0.1), pytest.approx(0.1)]
+    assert bucket.throttled_wait_seconds == pytest.approx(0.2)
+
+
+def test_bucket_refill_is_capped_at_capacity():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+    _take(bucket, 5)
+
+    clock.now += 60
+
+    assert bucket.stats()["tokens"] == 5
+
+
+def test_throttling_halves_the_rate_and_success_recovers_it():
+    clock = FakeClock()
+    bucket = TokenBucket(rate=10, capacity=5, clock=clock, sleep=clock.sleep)
+
+    bucket.on_throttled()
+    assert bucket.rate == 5
+    assert bucket.tokens == 0
+
+    for _ in range(20):
+        bucket.on_success()
+    assert bucket.rate == 10
+
+
+@pytest.mark.parametrize("error", [_throttled(status=429), _throttled(code=20429), _throttled(code=14107)])
+def test_limiter_backs_off_and_retries_on_throttle_codes(monkeypatch, error):
+    monkeypatch.setattr("app.services.twilio_service.random.uniform", lambda low, high: 1.0)
+    clock = FakeClock()
+    limiter = SenderRateLimiter(rate=10, capacity=5, max_retries=3, backoff_seconds=1, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    async def send() -> str:
+        attempts.append(clock.now)
+        if len(attempts) < 3:
+            raise error
+        return "SM1"
+
+    assert asyncio.run(limiter.send("+15551110001", send)) == "SM1"
+    assert len(attempts) == 3
+    # Exponential backoff of 1s then 2s, plus the wait for the emptied bucket to refill
+    assert [s for s in clock.sleeps if s >= 1] == [1, 2]
+    assert limiter.bucket_for("+15551110001").throttle_events == 2
+
+
+def test_limiter_gives_up_after_max_retries():
+    clock = FakeClock()
+    limiter = SenderRateLimiter(rate=10, capacity=5, max_retries=2, backoff_seconds=1, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    async def send() -> str:
+        attempts.append(clock.now)
+        raise _throttled(status=429)
+
+    with pytest.raises(TwilioRestException):
+        asyncio.run(limiter.send("+15551110001", send))
+    assert len(attempts) == 3
+
+
+def test_limiter_does_not_retry_other_errors():
+    clock = FakeClock()
+    limiter = SenderRateLimiter(rate=10, capacity=5, max_retries=3, backoff_seconds=1, clock=clock, sleep=clock.sleep)
+    attempts = []
+
+    async def send() -> str:
+        attempts.append(clock.now)
+        raise _throttled(status=400, code=21211)
+
+    with pytest.raises(TwilioRestException):
+        asyncio.run(limiter.send("+15551110001", send))
+    assert len(attempts) == 1
+    assert clock.sleeps == []
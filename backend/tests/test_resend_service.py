@@ -0,0 +1,24 @@
+import pytest
+from pydantic import ValidationError
+
+from app.schemas.message import BulkResendRequest
+from app.services.resend_service import UNDELIVERED_STATUSES
+
+
+def test_bulk_resend_defaults_to_failed_and_undelivered():
+    assert BulkResendRequest().statuses == ["failed", "undelivered"]
+
+
+def test_bulk_resend_accepts_every_undelivered_status():
+    assert BulkResendRequest(statuses=UNDELIVERED_STATUSES).statuses == UNDELIVERED_STATUSES
+
+
+@pytest.mark.parametrize("status", ["delivered", "sent", "read", "queued", "unknown"])
+def test_bulk_resend_rejects_statuses_that_may_have_reached_the_participant(status):
+    with pytest.raises(ValidationError):
+        BulkResendRequest(statuses=["failed", status])
+
+
+def test_bulk_resend_requires_a_status():
+    with pytest.raises(ValidationError):
+        BulkResendRequest(statuses=[])
@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+
+from app.models.message import MessageRotation
+from app.services.rotation_service import next_in_rotation, record_rotation_send
+
+NOW = datetime(2026, 3, 2, 9, 0)
+
+
+def _rotation(permutation, cursor=0, recent=None) -> MessageRotation:
+    return MessageRotation(participant_id=1, bucket="general", permutation=permutation, cursor=cursor, recent=recent or [])
+
+
+def test_next_in_rotation_does_not_consume_template():
+    rotation = _rotation([3, 1, 2])
+
+    assert next_in_rotation(rotation, NOW) == 3
+    assert next_in_rotation(rotation, NOW) == 3
+    assert rotation.cursor == 0
+
+
+def test_record_rotation_send_walks_a_full_cycle():
+    rotation = _rotation([3, 1, 2])
+    sent = []
+    for _ in range(3):
+        content_id = next_in_rotation(rotation, NOW)
+        record_rotation_send(rotation, content_id, NOW)
+        sent.append(content_id)
+
+    assert sent == [3, 1, 2]
+    assert rotation.cursor == 3
+
+
+def test_next_in_rotation_skips_recently_sent_templates():
+    recent = [[3, (NOW - timedelta(days=1)).isoformat()]]
+    rotation = _rotation([3, 1, 2], recent=recent)
+
+    assert next_in_rotation(rotation, NOW) == 1
+
+
+def test_recording_the_same_template_twice_advances_once():
+    rotation = _rotation([3, 1, 2])
+
+    record_rotation_send(rotation, 3, NOW)
+    record_rotation_send(rotation, 3, NOW)
+
+    assert rotation.cursor == 1
+    assert rotation.permutation[0] == 3
@@ -0,0 +1,71 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+from app.services import stats_service
+from app.services.stats_service import get_status_counts
+
+
+def _utc(*args) -> datetime:
+    return datetime(*args, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def counted(monkeypatch):
+    """Record which rollup days and raw slices get_status_counts reads"""
+    calls = {"rollup": [], "raw": []}
+
+    async def fake_rollup_counts(db, first_day, end_day):
+        calls["rollup"].append((first_day, end_day))
+        return {"delivered": 100, "failed": 5}
+
+    async def fake_raw_counts(db, lower, upper, upper_inclusive):
+        calls["raw"].append((lower, upper, upper_inclusive))
+        return {"delivered": 2, "sent": 1}
+
+    monkeypatch.setattr(stats_service, "_rollup_counts", fake_rollup_counts)
+    monkeypatch.setattr(stats_service, "_raw_counts", fake_raw_counts)
+    return calls
+
+
+def test_range_starting_and_ending_mid_day_counts_partial_days_raw(counted):
+    counts = asyncio.run(get_status_counts(None, _utc(2026, 3, 1, 10), _utc(2026, 3, 4, 15)))
+
+    assert counted["rollup"] == [(date(2026, 3, 2), date(2026, 3, 4))]
+    assert counted["raw"] == [
+        (_utc(2026, 3, 1, 10), _utc(2026, 3, 2), False),
+        (_utc(2026, 3, 4), _utc(2026, 3, 4, 15), True),
+    ]
+    assert counts == {"delivered": 104, "failed": 5, "sent": 2}
+
+
+def test_range_inside_one_day_is_counted_raw_only(counted):
+    counts = asyncio.run(get_status_counts(None, _utc(2026, 3, 1, 10), _utc(2026, 3, 1, 15)))
+
+    assert counted["rollup"] == []
+    assert counted["raw"] == [(_utc(2026, 3, 1, 10), _utc(2026, 3, 1, 15), True)]
+    assert counts == {"delivered": 2, "sent": 1}
+
+
+def test_range_of_whole_days_reads_the_rollup(counted):
+    counts = asyncio.run(get_status_counts(None, _utc(2026, 3, 1), _utc(2026, 3, 4)))
+
+    assert counted["rollup"] == [(date(2026, 3, 1), date(2026, 3, 4))]
+    # The end bound is inclusive, so only the instant at midnight is read raw
+    assert counted["raw"] == [(_utc(2026, 3, 4), _utc(2026, 3, 4), True)]
+    assert counts == {"delivered": 102, "failed": 5, "sent": 1}
+
+
+def test_naive_bounds_are_treated_as_utc(counted):
+    asyncio.run(get_status_counts(None, datetime(2026, 3, 1, 10), datetime(2026, 3, 1, 15)))
+
+    assert counted["raw"] == [(_utc(2026, 3, 1, 10), _utc(2026, 3, 1, 15), True)]
+
+
+def test_unbounded_range_reads_only_the_rollup(counted):
+    counts = asyncio.run(get_status_counts(None))
+
+    assert counted["rollup"] == [(None, None)]
+    assert counted["raw"] == []
+    assert counts == {"delivered": 100, "failed": 5}
@@ -0,0 +1,116 @@
+import asyncio
+from datetime import datetime, time, timedelta, timezone
+
+from app.models.participant import Participant
+from app.services.timing_wheel import SmsTimingWheel
+
+NOW = datetime(2026, 3, 2, 9, 0)
+CHANGED_AT = datetime(2026, 3, 2, 8, 0, tzinfo=timezone.utc)
+
+
+def _participant(participant_id, start, offset=0, active=True, updated_at=CHANGED_AT) -> Participant:
+    return Participant(
+        id=participant_id,
+        active=active,
+        sms_window_start=start,
+        sms_window_end=time(23, 59),
+        timezone_offset=offset,
+        updated_at=updated_at
+    )
+
+
+class _Result:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def scalar(self):
+        return self.rows
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class _FakeSession:
+    """Answers each execute with the next queued result"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+
+    async def execute(self, query):
+        return _Result(self.results.pop(0))
+
+
+def test_slot_for_normalizes_to_utc_and_wraps_midnight():
+    assert SmsTimingWheel.slot_for(_participant(1, time(9, 30))) == 9 * 60 + 30
+    assert SmsTimingWheel.slot_for(_participant(1, time(0, 30), offset=60)) == 23 * 60 + 30
+    assert SmsTimingWheel.slot_for(_participant(1, time(23, 30), offset=-60)) == 30
+    assert SmsTimingWheel.slot_for(_participant(1, time(9, 30), active=False)) is None
+
+
+def test_advance_fires_the_current_minute_once():
+    wheel = SmsTimingWheel()
+    wheel.upsert(_participant(1, time(9, 0)))
+
+    assert wheel.advance(NOW) == [1]
+    assert wheel.advance(NOW + timedelta(seconds=30)) == []
+
+
+def test_advance_catches_up_on_skipped_minutes():
+    wheel = SmsTimingWheel()
+    wheel.upsert(_participant(1, time(9, 1)))
+    wheel.upsert(_participant(2, time(9, 3)))
+    wheel.upsert(_participant(3, time(9, 5)))
+    wheel.advance(NOW)
+
+    assert wheel.advance(NOW + timedelta(minutes=4)) == [1, 2]
+    assert wheel.advance(NOW + timedelta(minutes=5)) == [3]
+
+
+def test_advance_wraps_across_midnight():
+    wheel = SmsTimingWheel()
+    wheel.upsert(_participant(1, time(23, 59)))
+    wheel.upsert(_participant(2, time(0, 0)))
+    wheel.upsert(_participant(3, time(0, 1)))
+    wheel.advance(datetime(2026, 3, 2, 23, 58))
+
+    assert wheel.advance(datetime(2026, 3, 3, 0, 0)) == [1, 2]
+    assert wheel.advance(datetime(2026, 3, 3, 0, 1)) == [3]
+
+
+def test_upsert_moves_participant_between_slots():
+    wheel = SmsTimingWheel()
+    participant = _participant(1, time(9, 1))
+    wheel.upsert(participant)
+    wheel.advance(NOW)
+
+    participant.sms_window_start = time(9, 2)
+    wheel.upsert(participant)
+
+    assert wheel.advance(NOW + timedelta(minutes=1)) == []
+    assert wheel.advance(NOW + timedelta(minutes=2)) == [1]
+    assert wheel.stats()["occupied_slots"] == 1
+
+
+def test_upsert_of_inactive_participant_removes_them():
+    wheel = SmsTimingWheel()
+    wheel.upsert(_participant(1, time(9, 1)))
+    wheel.upsert(_participant(1, time(9, 1), active=False))
+
+    assert wheel.stats()["participants"] == 0
+
+
+def test_apply_changes_picks_up_each_change_once():
+    wheel = SmsTimingWheel()
+    asyncio.run(wheel.load(_FakeSession(CHANGED_AT, [_participant(1, time(9, 1))])))
+    moved = _participant(1, time(9, 2), updated_at=CHANGED_AT + timedelta(minutes=1))
+    created = _participant(2, time(9, 1), updated_at=CHANGED_AT + timedelta(minutes=1))
+
+    assert asyncio.run(wheel.apply_changes(_FakeSession([moved, created]))) == [1, 2]
+    assert asyncio.run(wheel.apply_changes(_FakeSession([moved, created]))) == []
+
+    wheel.advance(NOW)
+    assert wheel.advance(NOW + timedelta(minutes=1)) == [2]
+    assert wheel.advance(NOW + timedelta(minutes=2)) == [1]
@@ -0,0 +1,112 @@
+import asyncio
+
+import httpx
+import pytest
+from twilio.base.exceptions import TwilioRestException
+
+from app.models.message import Message
+from app.services import twilio_service
+from app.services.twilio_service import (
+    FakeTwilioTransport,
+    HttpxTwilioTransport,
+    SenderPool,
+    TwilioOutcomeUnknown,
+    deliver_message,
+)
+
+
+@pytest.fixture
+def fake_transport(monkeypatch):
+    transport = FakeTwilioTransport(failing_numbers=["+15550000400"], timeout_numbers=["+15550000408"])
+    monkeypatch.setattr(twilio_service, "sender_pool", SenderPool(["+15551110001", "+15551110002"]))
+    twilio_service.set_transport(transport)
+    yield transport
+    twilio_service.set_transport(None)
+
+
+def test_deliver_message_sends_through_fake_transport(fake_transport):
+    message = Message(id=42, participant_id=7, content="Time for a walk!", bucket="general")
+
+    sid = asyncio.run(deliver_message(message, "+15550000001"))
+
+    assert sid == fake_transport.sent[0]["sid"]
+    sent = fake_transport.sent[0]
+    assert sent["to"] == "+15550000001"
+    assert sent["body"] == "Time for a walk!"
+    assert sent["from"] == twilio_service.sender_pool.sender_for(7)
+    assert sent["status_callback"].endswith("/api/sms/status-callback/42")
+
+
+def test_deliver_message_keeps_participant_on_one_sender(fake_transport):
+    for message_id in range(1, 4):
+        message = Message(id=message_id, participant_id=7, content="Hello", bucket="general")
+        asyncio.run(deliver_message(message, "+15550000001"))
+
+    assert len({sent["from"] for sent in fake_transport.sent}) == 1
+
+
+def test_deliver_message_raises_on_rejected_number(fake_transport):
+    message = Message(id=1, participant_id=7, content="Hello", bucket="general")
+
+    with pytest.raises(TwilioRestException):
+        asyncio.run(deliver_message(message, "+15550000400"))
+    assert fake_transport.sent == []
+
+
+def test_deliver_message_reports_unknown_outcome(fake_transport):
+    message = Message(id=1, participant_id=7, content="Hello", bucket="general")
+
+    with pytest.raises(TwilioOutcomeUnknown):
+        asyncio.run(deliver_message(message, "+15550000408"))
+
+
+def _httpx_transport(handler) -> HttpxTwilioTransport:
+    return HttpxTwilioTransport("AC123", "secret", transport=httpx.MockTransport(handler))
+
+
+def test_httpx_transport_returns_sid():
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/2010-04-01/Accounts/AC123/Messages.json"
+        return httpx.Response(201, json={"sid": "SM123"})
+
+    sid = asyncio.run(_httpx_transport(handler).create_message(to="+15550000001", body="Hi", from_="+15551110001"))
+
+    assert sid == "SM123"
+
+
+def test_httpx_transport_read_timeout_is_unknown():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ReadTimeout("timed out", request=request)
+
+    with pytest.raises(TwilioOutcomeUnknown):
+        asyncio.run(_httpx_transport(handler).create_message(to="+15550000001", body="Hi", from_="+15551110001"))
+
+
+def test_httpx_transport_connect_error_fails():
+    def handler(request: httpx.Request) -> httpx.Response:
+        raise httpx.ConnectError("connection refused", request=request)
+
+    with pytest.raises(TwilioRestException) as exc_info:
+        asyncio.run(_httpx_transport(handler).create_message(to="+15550000001", body="Hi", from_="+15551110001"))
+    assert exc_info.value.status == 0
+    assert isinstance(exc_info.value.__cause__, httpx.ConnectError)
+
+
+def test_deliver_message_fails_without_configured_sender(monkeypatch):
+    transport = FakeTwilioTransport()
+    monkeypatch.setattr(twilio_service, "sender_pool", SenderPool([]))
+    twilio_service.set_transport(transport)
+    message = Message(id=1, participant_id=7, content="Hello", bucket="general")
+
+    try:
+        with pytest.raises(TwilioRestException) as exc_info:
+            asyncio.run(deliver_message(message, "+15550000001"))
+    finally:
+        twilio_service.set_transport(None)
+    assert "No Twilio sender configured" in exc_info.value.msg
+    assert transport.sent == []
+
+
+def test_transport_interface_cannot_be_instantiated():
+    with pytest.raises(TypeError):
+        twilio_service.TwilioTransport()
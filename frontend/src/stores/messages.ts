@@ -1,34 +1,34 @@
 import { defineStore } from 'pinia'
 import { ref } from 'vue'
 import apiClient from '../plugins/axios'
-import { Message, MessageQueryParams, MessageStatsQueryParams } from '../types/message'
+import { Message, MessagePage, MessageQueryParams, MessageStatsQueryParams } from '../types/message'
 
 export const useMessagesStore = defineStore('messages', () => {
   const messages = ref<Message[]>([])
   const totalCount = ref(0)
+  const nextCursor = ref<string | null>(null)
   const stats = ref<Record<string, number>>({})
   const loading = ref(false)
   const error = ref<string | null>(null)
   
-  // Fetch message history with optional filters
+  // Fetch one page of message history with optional filters
+  // Pass the previous page's nextCursor as `cursor` to get the following page
   const fetchMessages = async (params: MessageQueryParams = {}) => {
     loading.value = true
     error.value = null
     
     try {
-      const response = await apiClient.get('/sms/history', {
-        params
+      const response = await apiClient.get<MessagePage>('/sms/history/page', {
+        params: { include_total: true, ...params }
       })
       
-      messages.value = response.data
+      messages.value = response.data.items
+      nextCursor.value = response.data.next_cursor
       
-      // Estimate total count based on response
-      // In a real implementation, this would come from pagination metadata
-      totalCount.value = response.data.length >= (params.limit || 100) ? 
-        (params.skip || 0) + response.data.length + 1 : 
-        (params.skip || 0) + response.data.length
+      // Planner estimate from the server; fall back to what has been seen so far
+      totalCount.value = response.data.estimated_total ?? response.data.items.length
       
-      return response.data
+      return response.data.items
     } catch (err: any) {
       console.error('Error fetching message history:', err)
       error.value = err.response?.data?.detail || 'Failed to fetch message history'
@@ -104,6 +104,7 @@ export const useMessagesStore = defineStore('messages', () => {
   return {
     messages,
     totalCount,
+    nextCursor,
     stats,
     loading,
     error,
@@ -13,6 +13,12 @@ export interface Message {
   updated_at: string;
 }
 
+export interface MessagePage {
+  items: Message[];
+  next_cursor: string | null;
+  estimated_total: number | null;
+}
+
 export interface MessageContent {
   id: number;
   content: string;
@@ -23,8 +29,9 @@ export interface MessageContent {
 }
 
 export interface MessageQueryParams {
-  skip?: number;
+  cursor?: string | null;
   limit?: number;
+  include_total?: boolean;
   participant_id?: number;
   pid?: string;
   start_date?: string;
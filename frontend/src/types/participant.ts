@@ -20,4 +20,10 @@ export interface ParticipantQueryParams {
   limit?: number;
   active?: boolean;
   study_group?: string;
-}
\ No newline at end of file
+}
+
+export interface ParticipantPage {
+  items: Participant[];
+  next_cursor: string | null;
+  estimated_total: number | null;
+}